@@ -1,34 +1,251 @@
 import streamlit as st
 import pandas as pd
 import io
+import os
+import tempfile
+import time
+
+from catalog import EXCEL_FILE
+from catalog_watcher import CatalogWatcher
+from draft_store import line_item, new_draft_id, open_draft_store, with_item_ids
+from explorer import get_explorer
+from instrumentation import ENABLED as METRICS_ENABLED
+from instrumentation import METRICS, METRICS_FILE, count, gauge, is_admin, section, state_size, timed
+from money import money_sum
+from pricing import (DEFAULT_ALCOA_RIMS_ADD, DEFAULT_GRAIN_SOCK_ADD, PRICE_ITEMS, IncrementalPricer, itemized_table,
+                     preset_config, preset_prices, summary_metrics)
+from quote_export import export_quotes, quote_workbook
+from quote_config import QuoteConfig
+from quote_fields import FIELD_LABELS, FIELDS, OPTIONS
+from quote_import import import_quotes, template_csv
+from quote_pdf import render_quote_pdf, render_zip
+from quote_store import QuoteStore, diff_quotes
+from reprice import DEFAULT_THRESHOLD, RepriceRunner
+
+# QUOTE_LAZY_TABS=1 builds only the selected tab's widgets on each run
+LAZY_TABS = os.environ.get('QUOTE_LAZY_TABS', '').lower() in ('1', 'true', 'yes')
 
 # Page configuration
 st.set_page_config(page_title="Trailer Quotation System", layout="wide")
+run_start = time.perf_counter()
+
+# Load the price catalog from Excel; the watcher rebuilds it in the background
+# when the workbook changes, so live sessions pick up new prices on their next rerun
+@st.cache_resource
+def get_catalog_watcher():
+    count("catalog.cache_miss")
+    return CatalogWatcher(EXCEL_FILE).start()
 
-# Load Excel data
-@st.cache_data
-def load_data():
-    excel_file = 'Quote-Tempelate.xlsx'
-    
-    # Load all sheets
-    lights_df = pd.read_excel(excel_file, sheet_name='LIGHTS')
-    axles_df = pd.read_excel(excel_file, sheet_name='AXLES')
-    tires_df = pd.read_excel(excel_file, sheet_name='TIRES')
-    specoptions_df = pd.read_excel(excel_file, sheet_name='SPECOPTIONS')
-    chassis_df = pd.read_excel(excel_file, sheet_name='CHASSIS')
-    
-    return lights_df, axles_df, tires_df, specoptions_df, chassis_df
-
-try:
-    lights_df, axles_df, tires_df, specoptions_df, chassis_df = load_data()
-    data_loaded = True
-except:
-    data_loaded = False
+with section("catalog.load"):
+    catalog_watcher = get_catalog_watcher()
+    catalog = catalog_watcher.catalog
+count("catalog.reads")
+if not catalog_watcher.loaded:
     st.warning("Excel file not found. Using default values.")
 
+# Saved quotes, shared by all sessions
+@st.cache_resource
+def get_quote_store():
+    return QuoteStore()
+
+quote_store = get_quote_store()
+
+# Repricing of the saved quotes after a catalog change, one job at a time
+@st.cache_resource
+def get_reprice_runner():
+    return RepriceRunner(quote_store.path)
+
+reprice_runner = get_reprice_runner()
+
+# In-progress quotes, kept across reloads, restarts and instances
+@st.cache_resource
+def get_draft_store():
+    return open_draft_store()
+
+draft_store = get_draft_store()
+
 # Initialize session state for prices
-if 'line_items' not in st.session_state:
-    st.session_state.line_items = []
+if 'draft_id' not in st.session_state:
+    # A new session reopens the draft named in the URL, or starts one
+    # (read past the cache: another instance may have saved it since). The
+    # line items stay in the draft store, read from it on every run.
+    draft = draft_store.get(st.query_params['draft'], refresh=True) if 'draft' in st.query_params else None
+    if draft is None:
+        st.session_state.draft_id = new_draft_id()
+        st.query_params['draft'] = st.session_state.draft_id
+    else:
+        st.session_state.draft_id = st.query_params['draft']
+        for key, value in draft['config'].items():
+            st.session_state[key] = value
+        draft_store.save(st.session_state.draft_id, draft['config'], with_item_ids(draft['line_items']))
+if 'pricer' not in st.session_state:
+    st.session_state.pricer = IncrementalPricer()
+if LAZY_TABS:
+    # Widgets not built this run would drop their values; set through the
+    # Session State API they keep them until their tab is shown again
+    for field in FIELDS:
+        if field in st.session_state:
+            st.session_state[field] = st.session_state[field]
+
+# Cleared at the end of the script; only fragment reruns see it False
+st.session_state.full_run_active = True
+
+XLSX_MIME = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+
+# Exports are timed when they run, i.e. when a download is clicked
+quote_pdf_bytes = timed("export.pdf")(render_quote_pdf)
+quote_xlsx_bytes = timed("export.xlsx")(quote_workbook)
+
+@timed("export.search_xlsx")
+def export_search_results(quote_number, dealer):
+    # Quotes are streamed from the store into a write-only workbook
+    buffer = io.BytesIO()
+    export_quotes(quote_store.iter_quotes(quote_number=quote_number, dealer=dealer), buffer)
+    return buffer.getvalue()
+
+@timed("export.search_pdf_zip")
+def pdf_search_results(quote_ids):
+    # Only the listed results (at most SEARCH_LIMIT): an empty search matches
+    # every stored quote, and the zip is built in memory for the download
+    return render_zip(quote_store.iter_quotes(quote_ids))
+
+# Quotes listed by a sidebar search, and so at most in a PDF zip
+SEARCH_LIMIT = 100
+
+BULK_FORMATS = {"CSV": ('csv', "text/csv"), "Excel": ('xlsx', XLSX_MIME)}
+
+def run_bulk_import(upload, result_format):
+    # Results stream to a temp file chunk by chunk, only the download reads it whole
+    extension, mime = BULK_FORMATS[result_format]
+    previous = st.session_state.pop('bulk_result', None)
+    if previous and os.path.exists(previous['path']):
+        os.remove(previous['path'])
+    fd, path = tempfile.mkstemp(suffix=f".{extension}")
+    status = st.empty()
+    try:
+        with os.fdopen(fd, 'wb') as out:
+            summary = import_quotes(upload, upload.name, out, extension, catalog,
+                                    progress=lambda rows: status.caption(f"{rows:,} rows priced..."))
+    except Exception as e:
+        os.remove(path)
+        status.error(f"Could not import {upload.name}: {e}")
+        return
+    status.empty()
+    st.session_state.bulk_result = {
+        'path': path,
+        'file_name': f"{os.path.splitext(upload.name)[0]}-priced.{extension}",
+        'mime': mime,
+        'summary': summary,
+    }
+
+# Progress refresh while a repricing job runs
+REPRICE_POLL_SECONDS = 2
+# Largest changes listed in the sidebar
+REPRICE_REPORT_ROWS = 200
+
+reprice_polling = reprice_runner.running
+
+@st.fragment(run_every=REPRICE_POLL_SECONDS if reprice_polling else None)
+def reprice_panel():
+    if reprice_polling and not reprice_runner.running:
+        # The job ended: a full rerun redefines this fragment without the refresh
+        st.rerun()
+    job = reprice_runner.latest()
+    if job is not None:
+        st.progress(job['done'] / job['total'] if job['total'] else 1.0,
+                    text=f"Job {job['id']} ({job['status']}): {job['done']:,} of {job['total']:,} quotes, "
+                         f"{job['changed']:,} changed")
+        if job['error']:
+            st.error(job['error'])
+    if reprice_polling:
+        st.button("Cancel Repricing", on_click=reprice_runner.cancel)
+        return
+    if job is not None and job['done'] and job['catalog_digest'] == catalog.digest:
+        reprice_threshold = st.number_input("Report changes over ($)", min_value=0.0, value=DEFAULT_THRESHOLD,
+                                            step=50.0, key="reprice_threshold")
+        changed = reprice_runner.count_changes(job['id'], reprice_threshold)
+        changes = reprice_runner.changes(job['id'], reprice_threshold, limit=REPRICE_REPORT_ROWS)
+        st.caption(f"{changed:,} quotes changed by more than ${reprice_threshold:,.2f}")
+        if changes:
+            st.dataframe(pd.DataFrame(changes)[['quote_number', 'dealer', 'old_total', 'new_total', 'change']]
+                         .rename(columns={'quote_number': "Quote #", 'dealer': "Dealer", 'old_total': "Old Total",
+                                          'new_total': "New Total", 'change': "Change"}),
+                         hide_index=True)
+        # Every quote whose total changed is updated, however small the change
+        if job['status'] == 'done' and job['changed'] and st.button(f"Apply New Prices ({job['changed']:,} quotes)"):
+            with st.spinner("Saving repriced quotes..."):
+                applied = reprice_runner.apply(job['id'], quote_store)
+            st.success(f"{applied:,} quotes updated")
+    resumable = (job is not None and job['status'] in ('interrupted', 'cancelled')
+                 and job['catalog_digest'] == catalog.digest)
+    if st.button("Resume Repricing" if resumable else f"Reprice All Quotes (Catalog v{catalog.version})"):
+        reprice_runner.start(catalog)
+        st.rerun()
+
+def read_file(path):
+    with open(path, 'rb') as f:
+        return f.read()
+
+def open_quote(quote_id):
+    # Runs as a button callback, before the widgets are created, so the
+    # saved values can be written straight into their widget keys
+    quote = quote_store.get(quote_id)
+    if quote is None:
+        return
+    for key, value in quote['config'].items():
+        if key in FIELDS:
+            st.session_state[key] = value
+    save_line_items(with_item_ids(quote['line_items']))
+
+def load_configuration(values):
+    # Button callback, like open_quote: the widgets pick the values up on the rerun
+    for key, value in values.items():
+        st.session_state[key] = value
+
+def apply_preset(name):
+    # Button callback, like load_configuration: the whole build lands in the
+    # widget keys before the one rerun, and the pricer takes the preset's
+    # prices (priced once per catalog) so that rerun reprices nothing
+    load_configuration(preset_config(name, catalog))
+    st.session_state.pricer.start_from(catalog, *preset_prices(catalog)[name])
+
+def line_items():
+    return draft_store.line_items(st.session_state.draft_id)
+
+def save_line_items(items):
+    draft_store.save(st.session_state.draft_id, priced_config(), items)
+
+def remove_line_item(item_id):
+    save_line_items([item for item in line_items() if item['id'] != item_id])
+
+def priced_config():
+    return QuoteConfig.from_state(st.session_state)
+
+def save_draft():
+    # The store writes only when the form changed since the last save
+    save_line_items(line_items())
+
+def rule_inputs():
+    return [st.session_state.get(field) for field in catalog.rules.fields]
+
+def rule_options(field, options, index=0):
+    # The options the compatibility rules allow with the rest of the form,
+    # and where the widget's default sits among them
+    allowed = catalog.rules.options(field, options, st.session_state)
+    default = options[index]
+    return allowed, allowed.index(default) if default in allowed else 0
+
+def refresh_if_changed():
+    # Each spec tab is a fragment, so editing it reruns only that tab. When the
+    # edit changed a priced input or a field the compatibility rules read, a
+    # full rerun refreshes the Summary, the footer and the other tabs' options;
+    # notes, colors and other fields stay a fragment-only rerun.
+    if st.session_state.full_run_active:
+        return
+    save_draft()
+    if (st.session_state.pricer.is_stale(priced_config(), catalog)
+            or rule_inputs() != st.session_state.get('rule_inputs')):
+        st.rerun()
 
 # Title
 st.title("🚛 Trailer Quotation System")
@@ -36,249 +253,263 @@ st.title("🚛 Trailer Quotation System")
 # Sidebar for quote information
 with st.sidebar:
     st.header("Quote Information")
-    quote_number = st.text_input("Quote #")
-    quote_date = st.date_input("Date")
-    dealer = st.text_input("Dealer")
-    contact = st.text_input("Contact")
-    model = st.selectbox("Model", ["End Dump 4x", "End Dump 3x", "End Dump 5x"])
+    quote_number = st.text_input("Quote #", key="quote_number")
+    quote_date = st.date_input("Date", key="quote_date")
+    dealer = st.text_input("Dealer", key="dealer")
+    contact = st.text_input("Contact", key="contact")
+    model = st.selectbox("Model", OPTIONS['model'], key="model")
+    st.divider()
+    discount_percent = st.number_input("Discount %", min_value=0.0, max_value=100.0, value=4.0, step=0.5, key="discount_percent")
+    
+    if catalog.presets:
+        st.divider()
+        st.header("Presets")
+        preset = st.selectbox("Standard Build", list(catalog.presets), key="preset")
+        # The preset's total with this quote's discount and additions, before applying it
+        preset_totals, _ = summary_metrics(
+            preset_prices(catalog)[preset][0], discount_percent,
+            st.session_state.get('alcoa_rims_add', DEFAULT_ALCOA_RIMS_ADD),
+            st.session_state.get('grain_sock_add', DEFAULT_GRAIN_SOCK_ADD), line_items())
+        st.caption(f"Base ${preset_totals['subtotal']:,.2f} | Total ${preset_totals['final_total']:,.2f}")
+        st.button("Apply Preset", on_click=apply_preset, args=(preset,))
+    
+    st.divider()
+    st.header("Saved Quotes")
+    search_number = st.text_input("Search Quote #")
+    search_dealer = st.text_input("Search Dealer")
+    found_quotes = quote_store.search(quote_number=search_number, dealer=search_dealer, limit=SEARCH_LIMIT)
+    if found_quotes:
+        selected_quote = st.selectbox(
+            "Results", found_quotes,
+            format_func=lambda q: f"{q['quote_number']} | {q['dealer'] or '-'} | {q['quote_date']} | ${q['final_total']:,.2f}"
+        )
+        st.button("Open Quote", on_click=open_quote, args=(selected_quote['id'],))
+        st.download_button(
+            "📊 Export All Results to Excel",
+            data=lambda: export_search_results(search_number, search_dealer),
+            file_name="quotes.xlsx",
+            mime=XLSX_MIME,
+            on_click="ignore",
+        )
+        st.download_button(
+            f"📄 PDFs for These {len(found_quotes)} Results (.zip)",
+            data=lambda: pdf_search_results([quote['id'] for quote in found_quotes]),
+            file_name="quotes-pdf.zip",
+            mime="application/zip",
+            on_click="ignore",
+        )
+    else:
+        st.caption("No saved quotes found.")
+    
+    st.divider()
+    st.header("Bulk Import")
+    bulk_upload = st.file_uploader("Configurations (CSV or Excel)", type=["csv", "xlsx"])
+    st.download_button("Blank Template (.csv)", data=template_csv(), file_name="quote-import-template.csv",
+                       mime="text/csv", on_click="ignore")
+    bulk_format = st.radio("Results as", list(BULK_FORMATS), horizontal=True)
+    if bulk_upload is not None and st.button("Price All Rows"):
+        run_bulk_import(bulk_upload, bulk_format)
+    bulk_result = st.session_state.get('bulk_result')
+    if bulk_result:
+        summary = bulk_result['summary']
+        st.caption(f"{summary['rows']:,} rows: {summary['valid']:,} priced, {summary['invalid']:,} invalid | "
+                   f"Total ${summary['final_total']:,.2f}")
+        if summary['errors']:
+            st.dataframe(pd.DataFrame(summary['errors'], columns=["Row", "Problems"]), hide_index=True)
+        st.download_button(
+            "⬇ Download Priced Results",
+            data=lambda: read_file(bulk_result['path']),
+            file_name=bulk_result['file_name'],
+            mime=bulk_result['mime'],
+            on_click="ignore",
+        )
+    
     st.divider()
-    discount_percent = st.number_input("Discount %", min_value=0.0, max_value=100.0, value=4.0, step=0.5)
+    st.header("Reprice Saved Quotes")
+    reprice_panel()
 
 # Main content tabs
-tab1, tab2, tab3, tab4, tab5, tab6, tab7 = st.tabs([
-    "Body Specs", "Chassis", "Axles", "Tires & Rims", "Lights", "Paint", "Summary"
-])
+TAB_NAMES = ["Body Specs", "Chassis", "Axles", "Tires & Rims", "Lights", "Paint", "Summary", "Price Explorer"]
+if LAZY_TABS:
+    # Only the selected section's widgets are built; the others' fields are
+    # priced at their defaults (or the values kept from when they were shown)
+    active_tab = st.radio("Section", TAB_NAMES, horizontal=True, key="active_tab", label_visibility="collapsed")
+    tab1, tab2, tab3, tab4, tab5, tab6, tab7, tab8 = [
+        st.container() if name == active_tab else None for name in TAB_NAMES
+    ]
+else:
+    tab1, tab2, tab3, tab4, tab5, tab6, tab7, tab8 = st.tabs(TAB_NAMES)
 
-# Initialize pricing dictionary
-prices = {}
+def show_tab(tab, render):
+    # Lazy mode skips the tabs not selected
+    if tab is not None:
+        with tab:
+            render()
 
 # TAB 1: TRAILER BODY SPECIFICATION
-with tab1:
+@st.fragment
+@timed("tab.body_specs")
+def body_specs_tab():
     st.header("Trailer Body Specification")
     
     col1, col2 = st.columns(2)
     
     with col1:
         st.subheader("Dimensions")
-        full_body_polish = st.selectbox("Full Body Polish", ["STANDARD", "YES", "NO"])
+        full_body_polish = st.selectbox("Full Body Polish", OPTIONS['full_body_polish'], key="full_body_polish")
         
         # Trailer Length with pricing
-        trailer_length_options = ["40'", "41'", "42'", "43'", "44'", "45'", "46'", "47'", "48'"]
-        trailer_length = st.selectbox("Trailer Length", trailer_length_options, index=6)
-        if data_loaded:
-            length_prices = {
-                "40'": 0, "41'": 0, "42'": 0, "43'": 0, "44'": 0, "45'": 0, "46'": 1000, "47'": 1000, "48'": 1000
-            }
-            prices['trailer_length'] = length_prices.get(trailer_length, 0)
-        else:
-            prices['trailer_length'] = 1000 if trailer_length == "46'" else 0
+        trailer_length_options = catalog.options('trailer_length')
+        trailer_length = st.selectbox("Trailer Length", trailer_length_options, index=6, key="trailer_length")
         
-        trailer_width = st.selectbox("Trailer Width", ["96 INCHES", "102 INCHES", "104 INCHES"])
+        trailer_width = st.selectbox("Trailer Width", OPTIONS['trailer_width'], key="trailer_width")
         
         # Wall Height with pricing
-        wall_height_options = ['60"', '62"', '64"', '66"', '68"', '70"', '72"', '74"', '76"', '78"', '80"', '82"', '84"']
-        wall_height = st.selectbox("Trailer Wall Height", wall_height_options, index=1)
-        wall_height_prices = {
-            '60"': 0, '62"': 500, '64"': 600, '66"': 700, '68"': 800, 
-            '70"': 900, '72"': 1000, '74"': 1100, '76"': 1200, '78"': 1300, '80"': 1400, '82"': 1500, '84"': 1600
-        }
-        prices['wall_height'] = wall_height_prices.get(wall_height, 0)
+        wall_height_options = catalog.options('wall_height')
+        wall_height = st.selectbox("Trailer Wall Height", wall_height_options, index=1, key="wall_height")
         
         # Board Height with pricing
-        board_height_options = ["NONE", '6" Board', '8" Board', '10" Board', '12" Board']
-        board_height = st.selectbox("Board Height", board_height_options, index=2)
-        board_prices = {"NONE": 0, '6" Board': 0, '8" Board': 0, '10" Board': 0, '12" Board': 0}
-        prices['board_height'] = board_prices.get(board_height, 0)
+        board_height_options = catalog.options('board_height')
+        board_height = st.selectbox("Board Height", board_height_options, index=2, key="board_height")
         
-        box_height = st.text_input("Box Height", value='70"')
+        box_height = st.text_input("Box Height", value='70"', key="box_height")
         
     with col2:
         st.subheader("Wall & Floor")
-        wall_panels = st.selectbox("Wall Panels", ['6061  2.25" PANELS', '6061  3.0" PANELS'])
-        inner_wall = st.selectbox("Inner Wall", ["1/8 Inner wall", "3/16 Inner wall", "NONE"])
-        side_placement = st.selectbox("Side Placement", ["OUTSET SMOOTH SIDE PANEL", "INSET PANEL"])
-        body_hold_down = st.selectbox("Body Hold Down", ["NO", "YES"])
-        box_liner = st.selectbox("Box Liner", ["NONE", "YES"])
-        top_rail = st.selectbox("Top Rail", ["6061 ALUMINUM EXTRUSION - POLISHED", "PAINTED"])
+        wall_panels = st.selectbox("Wall Panels", OPTIONS['wall_panels'], key="wall_panels")
+        inner_wall = st.selectbox("Inner Wall", OPTIONS['inner_wall'], key="inner_wall")
+        side_placement = st.selectbox("Side Placement", OPTIONS['side_placement'], key="side_placement")
+        body_hold_down = st.selectbox("Body Hold Down", OPTIONS['body_hold_down'], key="body_hold_down")
+        box_liner = st.selectbox("Box Liner", OPTIONS['box_liner'], key="box_liner")
+        top_rail = st.selectbox("Top Rail", OPTIONS['top_rail'], key="top_rail")
         
         # Floor with pricing
-        floor = st.selectbox("Floor", ['1/4" THICKNESS', '3/8" THICKNESS'])
-        floor_prices = {'1/4" THICKNESS': 0, '3/8" THICKNESS': 1000}
-        prices['floor'] = floor_prices.get(floor, 0)
+        floor = st.selectbox("Floor", catalog.options('floor'), key="floor")
         
-        crossmember = st.selectbox("Crossmember(s)", [
-            '4 INCH EXTRUDED C CHANNELS - STANDARD (12" CENTER)',
-            '4 INCH EXTRUDED C CHANNELS (10" CENTER)'
-        ])
+        crossmember = st.selectbox("Crossmember(s)", OPTIONS['crossmember'], key="crossmember")
         
         # Tow Motor Package with pricing
-        tow_motor = st.selectbox("Tow Motor Package", ["NO", "YES"])
-        prices['tow_motor'] = 0 if tow_motor == "NO" else 500
+        tow_motor = st.selectbox("Tow Motor Package", catalog.options('tow_motor'), key="tow_motor")
         
-        vibrator = st.selectbox("Vibrator", ["NONE", "YES"])
+        vibrator = st.selectbox("Vibrator", OPTIONS['vibrator'], key="vibrator")
         
         # Rear Side Wall Steps with pricing
-        rear_steps_options = ["D/S IN AND OUT", "P/S IN AND OUT", "P/S IN", "NONE"]
-        rear_steps = st.selectbox("Rear Side Wall Steps", rear_steps_options, index=1)
-        rear_steps_prices = {"D/S IN AND OUT": 0, "P/S IN AND OUT": 0, "P/S IN": 0, "NONE": 0}
-        prices['rear_steps'] = rear_steps_prices.get(rear_steps, 0)
+        rear_steps_options = catalog.options('rear_steps')
+        rear_steps = st.selectbox("Rear Side Wall Steps", rear_steps_options, index=1, key="rear_steps")
     
     st.subheader("Bulkhead")
     col3, col4 = st.columns(2)
     with col3:
-        bulkhead_type = st.selectbox("Trailer Bulkhead Type", [
-            '3/16" 5083 ALUMINUM - RADIUS CORNERS',
-            '1/4" 5083 ALUMINUM - RADIUS CORNERS'
-        ])
+        bulkhead_type = st.selectbox("Trailer Bulkhead Type", OPTIONS['bulkhead_type'], key="bulkhead_type")
         
         # Shovel Holder with pricing
-        shovel_holder = st.selectbox("Shovel Holder", [
-            "YES -DRIVER SIDE @DOGHOUSE",
-            "YES -DRIVER SIDE @UNDERNEATH BOX",
-            "NONE"
-        ])
-        shovel_prices = {
-            "YES -DRIVER SIDE @DOGHOUSE": 50,
-            "YES -DRIVER SIDE @UNDERNEATH BOX": 50,
-            "NONE": 0
-        }
-        prices['shovel_holder'] = shovel_prices.get(shovel_holder, 0)
-        
-        hoist = st.selectbox("Recommended Hoist", ["HYVA", "WESTEEL"])
-        hose = st.selectbox("9' Hydraulic Hose", ['1" X 108" HOSE W/WING FITTING (4-WIRE HOSE)'])
+        shovel_holder = st.selectbox("Shovel Holder", catalog.options('shovel_holder'), key="shovel_holder")
+        
+        hoist = st.selectbox("Recommended Hoist", OPTIONS['hoist'], key="hoist")
+        hose = st.selectbox("9' Hydraulic Hose", OPTIONS['hose'], key="hose")
     
     with col4:
         # Man Door with pricing
-        man_door_options = ["NONE", "YES - DRIVER SIDE W/GRAB HANDLE", "YES - PASSENGER SIDE W/GRAB HANDLE"]
-        man_door = st.selectbox("Man Door", man_door_options)
-        man_door_prices = {"NONE": 0, "YES - DRIVER SIDE W/GRAB HANDLE": 1300, "YES - PASSENGER SIDE W/GRAB HANDLE": 1300}
-        prices['man_door'] = man_door_prices.get(man_door, 0)
+        man_door_options = catalog.options('man_door')
+        man_door = st.selectbox("Man Door", man_door_options, key="man_door")
         
         # Bulkhead Steps with pricing
-        bulkhead_steps = st.selectbox("Bulkhead Steps", ["NONE", "DRIVER SIDE AND 1 BELOW MANDOOR", "PASSENGER SIDE AND 1 BELOW MANDOOR"])
-        bulkhead_steps_prices = {"NONE": 0, "DRIVER SIDE AND 1 BELOW MANDOOR": 0, "PASSENGER SIDE AND 1 BELOW MANDOOR": 0}
-        prices['bulkhead_steps'] = bulkhead_steps_prices.get(bulkhead_steps, 0)
+        bulkhead_steps = st.selectbox("Bulkhead Steps", catalog.options('bulkhead_steps'), key="bulkhead_steps")
     
     st.subheader("Tailgate")
     col5, col6 = st.columns(2)
     with col5:
         # Tailgate Slope with pricing
-        tailgate_slope = st.selectbox("Tailgate Slope", ["STRAIGHT", "85 DEGREE SLOPE"])
-        tailgate_slope_prices = {"STRAIGHT": 0, "85 DEGREE SLOPE": 0}
-        prices['tailgate_slope'] = tailgate_slope_prices.get(tailgate_slope, 0)
+        tailgate_slope = st.selectbox("Tailgate Slope", catalog.options('tailgate_slope'), key="tailgate_slope")
         
-        tailgate_type = st.selectbox("Tailgate Type", ["OVERSLUNG ONLY", "UNDERSLUNG"])
-        rear_seal = st.selectbox("Rear Tailgate Seal", ["STANDARD RUBBER W/ ALL TRAILERS"])
+        tailgate_type = st.selectbox("Tailgate Type", OPTIONS['tailgate_type'], key="tailgate_type")
+        rear_seal = st.selectbox("Rear Tailgate Seal", OPTIONS['rear_seal'], key="rear_seal")
         
         # Gate Operation with pricing
-        gate_operation = st.selectbox("Gate Operation", [
-            "ELECTRIC OVER AIR BOOSTER",
-            "ELECTRIC OVER AIR CYLINDER",
-            "MANUAL LOCKING"
-        ])
-        gate_operation_prices = {
-            "ELECTRIC OVER AIR BOOSTER": 0,
-            "ELECTRIC OVER AIR CYLINDER": 0,
-            "MANUAL LOCKING": 0
-        }
-        prices['gate_operation'] = gate_operation_prices.get(gate_operation, 0)
+        gate_operation = st.selectbox("Gate Operation", catalog.options('gate_operation'), key="gate_operation")
     
     with col6:
-        winder_locks = st.selectbox("Winder Locks", ['4 (2 BOTTOM, 1 EACH SIDE @ 45 Degree Angle)', '6 LOCKS'])
-        angle_top = st.selectbox("Angle on Top of Gate", ["NONE", "YES"])
-        spreader_chains = st.selectbox("Spreader Chains", ["NONE", "YES"])
-        gate_steps = st.selectbox("Gate Steps", ["NONE", "YES"])
+        winder_locks = st.selectbox("Winder Locks", OPTIONS['winder_locks'], key="winder_locks")
+        angle_top = st.selectbox("Angle on Top of Gate", OPTIONS['angle_top'], key="angle_top")
+        spreader_chains = st.selectbox("Spreader Chains", OPTIONS['spreader_chains'], key="spreader_chains")
+        gate_steps = st.selectbox("Gate Steps", OPTIONS['gate_steps'], key="gate_steps")
         
         # Coal/Grain Chute with pricing
-        coal_chute = st.selectbox("Coal/Grain Chute", ['3 DOORS 24"', '1 DOOR 24"', "NONE"])
-        coal_chute_prices = {'3 DOORS 24"': 1500, '1 DOOR 24"': 1000, "NONE": 0}
-        prices['coal_chute'] = coal_chute_prices.get(coal_chute, 0)
+        coal_chute = st.selectbox("Coal/Grain Chute", catalog.options('coal_chute'), key="coal_chute")
         
         # Sock Adaptor with pricing
-        sock_adaptor = st.selectbox("Sock Adaptor", ["NONE", "YES- Driver Side", "YES- Passenger Side"])
-        sock_prices = {"NONE": 0, "YES- Driver Side": 0, "YES- Passenger Side": 0}
-        prices['sock_adaptor'] = sock_prices.get(sock_adaptor, 0)
+        sock_adaptor = st.selectbox("Sock Adaptor", catalog.options('sock_adaptor'), key="sock_adaptor")
         
-        tarp_hooks = st.selectbox("Tarp Hooks", ["NONE", "YES"])
+        tarp_hooks = st.selectbox("Tarp Hooks", OPTIONS['tarp_hooks'], key="tarp_hooks")
+    
+    refresh_if_changed()
+
+show_tab(tab1, body_specs_tab)
 
 # TAB 2: CHASSIS SPECIFICATION
-with tab2:
+@st.fragment
+@timed("tab.chassis")
+def chassis_tab():
     st.header("Chassis Specification")
     
     col1, col2 = st.columns(2)
     
     with col1:
         st.subheader("Main Chassis")
-        chassis_model = st.selectbox("Model", ["3 Axle", "4 Axle", "5 Axle"], index=1)
-        wear_pad = st.selectbox("Wear Pad", ["YES, 5/16 INCH FRAME RUBBER ILO CM PADS", "NO"])
-        cylinder_pin = st.selectbox("Cylinder Pin", ["STANDARD/ YES, 1 SOLID PIN", "2 PINS"])
+        chassis_model_options, chassis_model_index = rule_options('chassis_model', OPTIONS['chassis_model'], 1)
+        chassis_model = st.selectbox("Model", chassis_model_options, index=chassis_model_index, key="chassis_model")
+        wear_pad = st.selectbox("Wear Pad", OPTIONS['wear_pad'], key="wear_pad")
+        cylinder_pin = st.selectbox("Cylinder Pin", OPTIONS['cylinder_pin'], key="cylinder_pin")
         
         # Chassis Type with pricing
-        chassis_type = st.selectbox("Chassis", [
-            "ALUMINUM (Polished)",
-            "ALUMINUM (Non Polished)",
-            "STEEL"
-        ])
-        chassis_prices = {
-            "ALUMINUM (Polished)": 4500,
-            "ALUMINUM (Non Polished)": 1500,
-            "STEEL": 0
-        }
-        prices['chassis'] = chassis_prices.get(chassis_type, 0)
-        
-        chassis_length = st.text_input("Chassis Length", value='45\' 3"')
+        chassis_type = st.selectbox("Chassis", catalog.options('chassis'), key="chassis_type")
+        
+        chassis_length = st.text_input("Chassis Length", value='45\' 3"', key="chassis_length")
         
         # Gooseneck with pricing
-        gooseneck = st.selectbox("Gooseneck", ["NONE", 'YES - 12"'])
-        gooseneck_prices = {"NONE": 0, 'YES - 12"': 0}
-        prices['gooseneck'] = gooseneck_prices.get(gooseneck, 0)
+        gooseneck = st.selectbox("Gooseneck", catalog.options('gooseneck'), key="gooseneck")
         
-        rear_overhang = st.text_input("Rear Overhang", value='9"')
-        king_pin_setting = st.text_input("King Pin Setting", value='16"')
-        fifth_wheel = st.selectbox("Fifth Wheel Pick Up Plate", ['5/16" , GALVANIZED'])
-        king_pin_height = st.text_input("King Pin Height", value='49"')
+        rear_overhang = st.text_input("Rear Overhang", value='9"', key="rear_overhang")
+        king_pin_setting = st.text_input("King Pin Setting", value='16"', key="king_pin_setting")
+        fifth_wheel = st.selectbox("Fifth Wheel Pick Up Plate", OPTIONS['fifth_wheel'], key="fifth_wheel")
+        king_pin_height = st.text_input("King Pin Height", value='49"', key="king_pin_height")
         
     with col2:
         st.subheader("Additional Components")
-        hoist_mount = st.selectbox("Hoist and Mount Style", ['DOUBLE 3" X 6" X 3/8"'])
-        front_mudflaps = st.selectbox("Front Mudflaps", ["BOX CORNERS", "FULL WIDTH"])
-        steer_mudflap = st.selectbox("Steer Axle Mudflap", ["FRONT AND REAR", "NONE"])
+        hoist_mount = st.selectbox("Hoist and Mount Style", OPTIONS['hoist_mount'], key="hoist_mount")
+        front_mudflaps = st.selectbox("Front Mudflaps", OPTIONS['front_mudflaps'], key="front_mudflaps")
+        steer_mudflap = st.selectbox("Steer Axle Mudflap", OPTIONS['steer_mudflap'], key="steer_mudflap")
         
         # Ride Axle Mudflap with pricing
-        ride_mudflap = st.selectbox("Ride Axle Mudflap", [
-            "FRONT OF ALL AXLES",
-            "FRONT OF 1ST RIDE ONLY"
-        ])
-        ride_mudflap_prices = {"FRONT OF ALL AXLES": 0, "FRONT OF 1ST RIDE ONLY": 0}
-        prices['ride_mudflap'] = ride_mudflap_prices.get(ride_mudflap, 0)
-        
-        center_splash = st.selectbox("Center Splash Panel", ["NONE", "YES"])
-        rear_mudflaps = st.selectbox("Rear Mudflaps", ["FULL WIDTH", "STANDARD"])
-        fenders_front = st.selectbox("Fenders on Front", ["NONE", "YES"])
-        load_indicator = st.selectbox("Load Level Indicator", ["NO", "YES"])
+        ride_mudflap = st.selectbox("Ride Axle Mudflap", catalog.options('ride_mudflap'), key="ride_mudflap")
+        
+        center_splash = st.selectbox("Center Splash Panel", OPTIONS['center_splash'], key="center_splash")
+        rear_mudflaps = st.selectbox("Rear Mudflaps", OPTIONS['rear_mudflaps'], key="rear_mudflaps")
+        fenders_front = st.selectbox("Fenders on Front", OPTIONS['fenders_front'], key="fenders_front")
+        load_indicator = st.selectbox("Load Level Indicator", OPTIONS['load_indicator'], key="load_indicator")
         
         # Tire Carrier with pricing
-        tire_carrier = st.selectbox("Tire Carrier", ["YES", "NONE"])
-        tire_carrier_price = st.number_input("Tire Carrier Price (TBD)", min_value=0, value=0, step=100)
-        prices['tire_carrier'] = tire_carrier_price if tire_carrier == "YES" else 0
+        tire_carrier = st.selectbox("Tire Carrier", OPTIONS['tire_carrier'], key="tire_carrier")
+        tire_carrier_price = st.number_input("Tire Carrier Price (TBD)", min_value=0, value=0, step=100, key="tire_carrier_price")
         
-        air_tanks = st.selectbox("Air Tanks", ["ALUMINUM", "STEEL"])
-        tow_hooks = st.selectbox("Tow Hooks", ["YES, IN REAR PIVOTS", "NO"])
+        air_tanks = st.selectbox("Air Tanks", OPTIONS['air_tanks'], key="air_tanks")
+        tow_hooks = st.selectbox("Tow Hooks", OPTIONS['tow_hooks'], key="tow_hooks")
         
         # Landing Gear with pricing
-        landing_gear = st.selectbox("Landing Gear", [
-            "STEEL - SAF HOLLAND",
-            "ALUMINUM - JOST AX150"
-        ])
-        landing_gear_prices = {"STEEL - SAF HOLLAND": 0, "ALUMINUM - JOST AX150": 0}
-        prices['landing_gear'] = landing_gear_prices.get(landing_gear, 0)
+        landing_gear = st.selectbox("Landing Gear", catalog.options('landing_gear'), key="landing_gear")
         
-        shims = st.selectbox("Shims", ["STAINLESS STEEL", "GALVANIZED"])
-        enclosure = st.selectbox("Enclosure for Switches", ["YES - STAINLESS STEEL (STANDARD)"])
-        air_gauge = st.selectbox("Air Gauge/System", ['YES, IN FRONT (45 Degree Angle)'])
+        shims = st.selectbox("Shims", OPTIONS['shims'], key="shims")
+        enclosure = st.selectbox("Enclosure for Switches", OPTIONS['enclosure'], key="enclosure")
+        air_gauge = st.selectbox("Air Gauge/System", OPTIONS['air_gauge'], key="air_gauge")
+    
+    refresh_if_changed()
+
+show_tab(tab2, chassis_tab)
 
 # TAB 3: AXLE CONFIGURATION
-with tab3:
+@st.fragment
+@timed("tab.axles")
+def axles_tab():
     st.header("Axle Configuration")
     
     col1, col2, col3 = st.columns(3)
@@ -286,220 +517,191 @@ with tab3:
     with col1:
         st.subheader("General")
         # Brakes with pricing
-        brakes_type = st.selectbox("Brakes", ["DRUM", "DISC"])
-        brakes_prices = {"DRUM": 0, "DISC": 0}
-        prices['brakes'] = brakes_prices.get(brakes_type, 0)
+        brakes_type = st.selectbox("Brakes", catalog.options('brakes'), key="brakes_type")
         
-        suspension_control = st.selectbox("Suspension Control", [
-            "ELECTRIC W/ MANUAL BALL VALVE IN CONTROL BOX (Electric on Aux cord)"
-        ])
-        abs = st.selectbox("ABS", ["2S1M MERITOR/WABCO"])
-        suspension_hangers = st.selectbox("Suspension Hangers", ["GALVANIZED", "PAINTED"])
+        suspension_control = st.selectbox("Suspension Control", OPTIONS['suspension_control'], key="suspension_control")
+        abs = st.selectbox("ABS", OPTIONS['abs'], key="abs")
+        suspension_hangers = st.selectbox("Suspension Hangers", OPTIONS['suspension_hangers'], key="suspension_hangers")
     
     with col2:
         st.subheader("Ride Axle")
-        qty_ride = st.number_input("Quantity of Ride Only Axles", min_value=0, max_value=5, value=1)
-        ride_spacing = st.number_input("Axles Spacing", min_value=60, max_value=100, value=72)
-        ride_suspension = st.selectbox("Suspension for Ride Axles", ["HEND. INTRAAX AAT-30K W/HXL-3"])
-        ride_axle = st.selectbox("Axle", ["HENDRICKSON INTRAAX"])
-        ride_brakes = st.selectbox("Brakes (Ride)", ['DRUMS, 7 IN XL, W/ 30-30 CHAMBERS'])
-        ride_hubs = st.selectbox("Hubs and Drums", ['CAST W/STEEL HUB HP 10 STUD TP, LS, 7 IN'])
-        ride_lubrication = st.selectbox("Axles Lubrication", ["HXL, SYNTHETIC SEMI-FLUID GREASE 3 YEAR"])
-        ride_slacks = st.selectbox("Slacks", ["AUTOMATIC"])
+        qty_ride = st.number_input("Quantity of Ride Only Axles", min_value=0, max_value=5, value=1, key="qty_ride")
+        ride_spacing = st.number_input("Axles Spacing", min_value=60, max_value=100, value=72, key="ride_spacing")
+        ride_suspension = st.selectbox("Suspension for Ride Axles", OPTIONS['ride_suspension'], key="ride_suspension")
+        ride_axle = st.selectbox("Axle", OPTIONS['ride_axle'], key="ride_axle")
+        ride_brakes = st.selectbox("Brakes (Ride)", OPTIONS['ride_brakes'], key="ride_brakes")
+        ride_hubs = st.selectbox("Hubs and Drums", OPTIONS['ride_hubs'], key="ride_hubs")
+        ride_lubrication = st.selectbox("Axles Lubrication", OPTIONS['ride_lubrication'], key="ride_lubrication")
+        ride_slacks = st.selectbox("Slacks", OPTIONS['ride_slacks'], key="ride_slacks")
     
     with col3:
         st.subheader("Lift Axle")
         # Lift Axle Quantity with pricing
-        qty_lift = st.number_input("Quantity of Lift Axles", min_value=0, max_value=3, value=1)
-        lift_prices_map = {0: 0, 1: 1000, 2: 2000, 3: 3000}
-        prices['lift_axle'] = lift_prices_map.get(qty_lift, 0)
-        
-        lift_spacing = st.number_input("Axles Spacing (Lift)", min_value=60, max_value=100, value=72)
-        lift_option = st.selectbox("Lift", [
-            "HEND. INTRAAX AAT WITH UBL-102 LIFT",
-            "HEND. INTRAAX AAL WITH UBL-102 HIGH LIFT"
-        ])
-        lift_axle = st.selectbox("Axle (Lift)", ["HENDRICKSON INTRAAX"])
-        lift_position = st.selectbox("Position", ["1 -FRONT", "2 -MIDDLE", "3 -MIDDLE", "4 -REAR"])
+        qty_lift = st.number_input("Quantity of Lift Axles", min_value=0, max_value=3, value=1, key="qty_lift")
+        
+        lift_spacing = st.number_input("Axles Spacing (Lift)", min_value=60, max_value=100, value=72, key="lift_spacing")
+        lift_option = st.selectbox("Lift", OPTIONS['lift_option'], key="lift_option")
+        lift_axle = st.selectbox("Axle (Lift)", OPTIONS['lift_axle'], key="lift_axle")
+        lift_position_options, lift_position_index = rule_options('lift_position', OPTIONS['lift_position'])
+        lift_position = st.selectbox("Position", lift_position_options, index=lift_position_index, key="lift_position")
     
     st.subheader("Steer Axle")
     col4, col5 = st.columns(2)
     with col4:
         # Steer Axle Quantity with pricing
-        qty_steer = st.number_input("Quantity of Steer Axles", min_value=0, max_value=2, value=1)
-        steer_qty_prices = {0: 0, 1: 7000, 2: 14000}
-        prices['steer_axle'] = steer_qty_prices.get(qty_steer, 0)
+        qty_steer = st.number_input("Quantity of Steer Axles", min_value=0, max_value=2, value=1, key="qty_steer")
         
-        steer_spacing = st.number_input("Steer Axle Spacing", min_value=80, max_value=120, value=100)
-        steer_suspension = st.selectbox("Suspension for Steer/Lift Axle", ["IMT DEXTER 25K"])
-        steer_axles = st.selectbox("Steer Axles", ["IMT DEXTER"])
+        steer_spacing = st.number_input("Steer Axle Spacing", min_value=80, max_value=120, value=100, key="steer_spacing")
+        steer_suspension = st.selectbox("Suspension for Steer/Lift Axle", OPTIONS['steer_suspension'], key="steer_suspension")
+        steer_axles = st.selectbox("Steer Axles", OPTIONS['steer_axles'], key="steer_axles")
     
     with col5:
-        steer_brakes = st.selectbox("Brakes (Steer)", ['DRUMS, 7 IN XL, W/ 30-30 CHAMBERS'])
-        lift_kit = st.selectbox("Lift Kit", ["INTEGRATED WITH AXLE"])
-        lift_control = st.selectbox("Lift Control", ["REVERSE-A-MATIC"])
-        steer_hubs = st.selectbox("Hubs and Drums (Steer)", ['CAST W/STEEL HUB HP 10 STUD TP, LS, 7 IN'])
-        proportioning = st.selectbox("Proportioning Valve", ["YES", "NO"])
+        steer_brakes = st.selectbox("Brakes (Steer)", OPTIONS['steer_brakes'], key="steer_brakes")
+        lift_kit = st.selectbox("Lift Kit", OPTIONS['lift_kit'], key="lift_kit")
+        lift_control = st.selectbox("Lift Control", OPTIONS['lift_control'], key="lift_control")
+        steer_hubs = st.selectbox("Hubs and Drums (Steer)", OPTIONS['steer_hubs'], key="steer_hubs")
+        proportioning = st.selectbox("Proportioning Valve", OPTIONS['proportioning'], key="proportioning")
+    
+    refresh_if_changed()
+
+show_tab(tab3, axles_tab)
 
 # TAB 4: RIMS AND TIRES
-with tab4:
+@st.fragment
+@timed("tab.tires")
+def tires_tab():
     st.header("Rims and Tires")
     
     col1, col2 = st.columns(2)
     
     with col1:
         st.subheader("Tire Configuration")
-        tire_size = st.selectbox("Tire Size Selection", ["22.5", "24.5"])
-        ride_tire_type = st.selectbox("Ride Tire Selection", ["DUAL TIRES", "SINGLE TIRES"])
-        steer_tire_type = st.selectbox("Steer Tire Selection", ["DUAL TIRES", "SINGLE TIRES"])
+        tire_size = st.selectbox("Tire Size Selection", OPTIONS['tire_size'], key="tire_size")
+        ride_tire_type = st.selectbox("Ride Tire Selection", OPTIONS['ride_tire_type'], key="ride_tire_type")
+        steer_tire_type = st.selectbox("Steer Tire Selection", OPTIONS['steer_tire_type'], key="steer_tire_type")
         
         st.subheader("Ride Configuration")
-        ride_rim_selection = st.selectbox("Ride Rim Selection", [
-            "HIGH POLISH x ALL RIMS",
-            "DURABRITE x ALL RIMS",
-            "HIGH POLISH INSIDE AND DURABRITE OUTSIDE"
-        ])
-        
-        if data_loaded and tire_size == "22.5" and ride_tire_type == "DUAL TIRES":
-            ride_rim_prices = {
-                "HIGH POLISH x ALL RIMS": 1500,
-                "DURABRITE x ALL RIMS": 4500,
-                "HIGH POLISH INSIDE AND DURABRITE OUTSIDE": 2250
-            }
-            prices['ride_tires'] = ride_rim_prices.get(ride_rim_selection, 0)
-        else:
-            prices['ride_tires'] = 1500
+        ride_rim_selection = st.selectbox("Ride Rim Selection", catalog.options('ride_rims'), key="ride_rim_selection")
         
-        ride_tires_model = st.selectbox("Tires (Ride)", [
-            "CONTINENTAL HSR3 11R22.5 16 PLY",
-            "CONTINENTAL HSR3 11R24.5 16 PLY"
-        ])
+        ride_tires_options, ride_tires_index = rule_options('ride_tires_model', OPTIONS['ride_tires_model'])
+        ride_tires_model = st.selectbox("Tires (Ride)", ride_tires_options, index=ride_tires_index, key="ride_tires_model")
         
         if ride_rim_selection == "HIGH POLISH x ALL RIMS":
-            ride_rims_model = "ALUMINUM 22.5X8.25 - ALCOA High Polish"
+            ride_rims_model = f"ALUMINUM {tire_size}X8.25 - ALCOA High Polish"
         elif ride_rim_selection == "DURABRITE x ALL RIMS":
-            ride_rims_model = "ALUMINUM 22.5X8.25 - ALCOA Durabrite Polish"
+            ride_rims_model = f"ALUMINUM {tire_size}X8.25 - ALCOA Durabrite Polish"
         else:
-            ride_rims_model = "ALUMINUM 22.5X8.25 - ALCOA Durabrite Outside and High Polish Inside"
+            ride_rims_model = f"ALUMINUM {tire_size}X8.25 - ALCOA Durabrite Outside and High Polish Inside"
         
         st.text(f"Rims (Ride): {ride_rims_model}")
     
     with col2:
         st.subheader("Steer Configuration")
-        steer_rim_selection = st.selectbox("Steer Rim Selection", [
-            "DURABRITE x ALL RIMS",
-            "HIGH POLISH x ALL RIMS",
-            "HIGH POLISH INSIDE AND DURABRITE OUTSIDE"
-        ], index=0)
-        
-        if data_loaded and tire_size == "22.5" and steer_tire_type == "DUAL TIRES":
-            steer_rim_prices = {
-                "DURABRITE x ALL RIMS": 1000,
-                "HIGH POLISH x ALL RIMS": 500,
-                "HIGH POLISH INSIDE AND DURABRITE OUTSIDE": 750
-            }
-            prices['steer_tires'] = steer_rim_prices.get(steer_rim_selection, 0)
-        else:
-            prices['steer_tires'] = 500
+        steer_rim_selection = st.selectbox("Steer Rim Selection", catalog.options('steer_rims'), index=0, key="steer_rim_selection")
         
-        steer_tires_model = st.selectbox("Tires (Steer)", [
-            "CONTINENTAL HSR3 11R22.5 16 PLY",
-            "CONTINENTAL HSR3 11R24.5 16 PLY"
-        ])
+        steer_tires_options, steer_tires_index = rule_options('steer_tires_model', OPTIONS['steer_tires_model'])
+        steer_tires_model = st.selectbox("Tires (Steer)", steer_tires_options, index=steer_tires_index, key="steer_tires_model")
         
         if steer_rim_selection == "DURABRITE x ALL RIMS":
-            steer_rims_model = "ALUMINUM 22.5X8.25 - ALCOA Durabrite Polish"
+            steer_rims_model = f"ALUMINUM {tire_size}X8.25 - ALCOA Durabrite Polish"
         elif steer_rim_selection == "HIGH POLISH x ALL RIMS":
-            steer_rims_model = "ALUMINUM 22.5X8.25 - ALCOA High Polish"
+            steer_rims_model = f"ALUMINUM {tire_size}X8.25 - ALCOA High Polish"
         else:
-            steer_rims_model = "ALUMINUM 22.5X8.25 - ALCOA Durabrite Outside and High Polish Inside"
+            steer_rims_model = f"ALUMINUM {tire_size}X8.25 - ALCOA Durabrite Outside and High Polish Inside"
         
         st.text(f"Rims (Steer): {steer_rims_model}")
         
         st.subheader("Additional Options")
-        tire_inflation = st.selectbox("Tire Inflation System", ["NONE", "YES"])
-        chrome_hats = st.selectbox("Chrome Top Hats", ["NONE", "YES"])
+        tire_inflation = st.selectbox("Tire Inflation System", OPTIONS['tire_inflation'], key="tire_inflation")
+        chrome_hats = st.selectbox("Chrome Top Hats", OPTIONS['chrome_hats'], key="chrome_hats")
+    
+    refresh_if_changed()
+
+show_tab(tab4, tires_tab)
 
 # TAB 5: LIGHTS
-with tab5:
+@st.fragment
+@timed("tab.lights")
+def lights_tab():
     st.header("Lights")
     
     col1, col2 = st.columns(2)
     
     with col1:
         # Light Type with pricing
-        light_type = st.selectbox("Light Type", [
-            "GROTE L.E.D. STANDARD - GROMMET MOUNT",
-            "GROTE L.E.D. STANDARD - FLANGE MOUNT"
-        ])
-        light_type_prices = {
-            "GROTE L.E.D. STANDARD - GROMMET MOUNT": 0,
-            "GROTE L.E.D. STANDARD - FLANGE MOUNT": 0
-        }
-        prices['light_type'] = light_type_prices.get(light_type, 0)
-        
-        light_panel = st.selectbox("Light Panel", ["(3) LARGE - (3) LARGE", "(2) LARGE - (2) LARGE"])
-        license_plate = st.selectbox("License Plate Panel", ["STANDARD WITH 5 SMALL LIGHTS"])
-        light_shield = st.selectbox("Light Shield", ["LIGHT SHIELD STANDARD"])
-        marker_bottom = st.selectbox("Marker Lights Bottom Rail", ["(5) EACH SIDE", "(6) EACH SIDE", "(7) EACH SIDE"])
+        light_type = st.selectbox("Light Type", catalog.options('light_type'), key="light_type")
+        
+        light_panel = st.selectbox("Light Panel", OPTIONS['light_panel'], key="light_panel")
+        license_plate = st.selectbox("License Plate Panel", OPTIONS['license_plate'], key="license_plate")
+        light_shield = st.selectbox("Light Shield", OPTIONS['light_shield'], key="light_shield")
+        marker_bottom = st.selectbox("Marker Lights Bottom Rail", OPTIONS['marker_bottom'], key="marker_bottom")
         
         # Additional Marker Lights with pricing
-        additional_markers = st.number_input("Additional Marker Lights - Each Side", min_value=0, max_value=50, value=30)
-        # Price calculation: $120 per additional light for grommet
-        if "GROMMET" in light_type:
-            prices['additional_lights'] = additional_markers * 120 if additional_markers > 5 else 0
-        else:
-            prices['additional_lights'] = additional_markers * 140 if additional_markers > 5 else 0
+        additional_markers = st.number_input("Additional Marker Lights - Each Side", min_value=0, max_value=50, value=30, key="additional_markers")
     
     with col2:
-        backup_lights = st.selectbox("Back Up Lights", ["NONE", "YES"])
-        tarp_shield_lights = st.selectbox("Tarp Shield Lights", ["NONE", "YES"])
-        mid_turns = st.selectbox("Mid Turns", ["(1) PAIR LED (UNDER THE BOX)", "NONE"])
-        auxiliary_cable = st.selectbox("Auxillary Cable", [
-            "7 WAY (ISO) (GLADHANDS 7 WAY SOCKETS MOUNTED ON D/S AREA)"
-        ])
-        rear_pocket = st.selectbox("Rear Pocket Lights", ["NONE", "YES"])
+        backup_lights = st.selectbox("Back Up Lights", OPTIONS['backup_lights'], key="backup_lights")
+        tarp_shield_lights = st.selectbox("Tarp Shield Lights", OPTIONS['tarp_shield_lights'], key="tarp_shield_lights")
+        mid_turns = st.selectbox("Mid Turns", OPTIONS['mid_turns'], key="mid_turns")
+        auxiliary_cable = st.selectbox("Auxillary Cable", OPTIONS['auxiliary_cable'], key="auxiliary_cable")
+        rear_pocket = st.selectbox("Rear Pocket Lights", OPTIONS['rear_pocket'], key="rear_pocket")
+    
+    refresh_if_changed()
+
+show_tab(tab5, lights_tab)
 
 # TAB 6: PAINT
-with tab6:
+@st.fragment
+@timed("tab.paint")
+def paint_tab():
     st.header("Paint")
     
     col1, col2 = st.columns(2)
     
     with col1:
-        chassis_finish = st.selectbox("Chassis Finish", ["NOT POLISHED", "POLISHED"])
-        paint_color = st.selectbox("Paint Color", ["GALVANIZED", "BLACK", "WHITE", "RED", "BLUE"])
+        chassis_finish = st.selectbox("Chassis Finish", OPTIONS['chassis_finish'], key="chassis_finish")
+        paint_color = st.selectbox("Paint Color", OPTIONS['paint_color'], key="paint_color")
     
     with col2:
-        sideboard_color = st.selectbox("Side Board Color", ["BLACK", "GALVANIZED", "WHITE", "RED"])
-        document_holder = st.selectbox("Document Holder", ["STANDARD (ROUND) HOLDER", "RECTANGULAR"])
+        sideboard_color = st.selectbox("Side Board Color", OPTIONS['sideboard_color'], key="sideboard_color")
+        document_holder = st.selectbox("Document Holder", OPTIONS['document_holder'], key="document_holder")
     
     st.subheader("Special Notes / Additional Requests")
-    special_notes = st.text_area("Enter any special requirements", height=100)
+    special_notes = st.text_area("Enter any special requirements", height=100, key="special_notes")
+    
+    steel_galvanized = st.checkbox("All Steel Parts Galvanized", value=True, key="steel_galvanized")
     
-    steel_galvanized = st.checkbox("All Steel Parts Galvanized", value=True)
+    refresh_if_changed()
+
+show_tab(tab6, paint_tab)
+
+# Price the configuration with the pricing engine
+config = priced_config()
+# Only the price items whose inputs changed since the last rerun are recomputed
+with section("summary.pricing"):
+    prices = st.session_state.pricer.update(config, catalog)
+count("pricer.items_recomputed", st.session_state.pricer.recomputed)
+count("pricer.items_reused", len(PRICE_ITEMS) - st.session_state.pricer.recomputed)
 
 # TAB 7: SUMMARY & PRICING
-with tab7:
+@st.fragment
+@timed("tab.summary")
+def summary_tab():
     st.header("Quote Summary")
     
-    # Calculate base price from all options
-    base_price = sum(prices.values())
+    # Combinations the compatibility rules reject
+    problems = catalog.rules.violations(config)
+    if problems:
+        st.warning("**Configuration check**\n" + "\n".join(f"- {problem}" for problem in problems))
     
     # Display itemized pricing
     st.subheader("Itemized Pricing")
     
-    pricing_data = []
-    for item, price in prices.items():
-        if price > 0:
-            pricing_data.append({
-                "Item": item.replace('_', ' ').title(),
-                "Price": f"${price:,.2f}"
-            })
-    
-    if pricing_data:
-        pricing_df = pd.DataFrame(pricing_data)
+    with section("summary.dataframe"):
+        pricing_df = itemized_table(prices, config)
+    if not pricing_df.empty:
         st.dataframe(pricing_df, use_container_width=True, hide_index=True)
+    st.caption(f"{st.session_state.pricer.recomputed} of {len(PRICE_ITEMS)} price items recomputed this rerun")
     
     st.divider()
     
@@ -510,87 +712,115 @@ with tab7:
         st.subheader("Additional Items")
         
         # Additional line items
-        alcoa_rims_add = st.number_input("ALCOA Rims Additional", min_value=0, value=2000, step=100)
-        grain_sock_add = st.number_input("Grain Sock", min_value=0, value=500, step=50)
+        alcoa_rims_add = st.number_input("ALCOA Rims Additional", min_value=0, value=2000, step=100, key="alcoa_rims_add")
+        grain_sock_add = st.number_input("Grain Sock", min_value=0, value=500, step=50, key="grain_sock_add")
         
         # Custom line items
         st.write("Add Custom Items:")
         custom_item_name = st.text_input("Item Name")
         custom_item_price = st.number_input("Item Price", min_value=0, value=0, step=100)
         if st.button("Add Custom Item") and custom_item_name:
-            st.session_state.line_items.append({
-                "name": custom_item_name,
-                "price": custom_item_price
-            })
+            save_line_items(line_items() + [line_item(custom_item_name, custom_item_price)])
             st.success(f"Added {custom_item_name}")
         
-        if st.session_state.line_items:
+        items = line_items()
+        if items:
             st.write("Custom Items:")
-            for idx, item in enumerate(st.session_state.line_items):
+            for item in items:
                 col_a, col_b, col_c = st.columns([3, 2, 1])
                 with col_a:
                     st.write(item['name'])
                 with col_b:
                     st.write(f"${item['price']:,.2f}")
                 with col_c:
-                    if st.button("Remove", key=f"remove_{idx}"):
-                        st.session_state.line_items.pop(idx)
-                        st.rerun()
+                    st.button("Remove", key=f"remove_{item['id']}", on_click=remove_line_item, args=(item['id'],))
     
     with col2:
         st.subheader("Final Pricing")
         
-        # Calculate totals
-        subtotal = base_price
-        discount_amount = subtotal * (discount_percent / 100)
-        discounted_price = subtotal - discount_amount
-        
-        additional_items_total = alcoa_rims_add + grain_sock_add + sum([item['price'] for item in st.session_state.line_items])
-        final_total = discounted_price + additional_items_total
-        
-        # Display pricing
-        st.metric("Base Price", f"${subtotal:,.2f}")
-        st.metric(f"Discount ({discount_percent}%)", f"-${discount_amount:,.2f}")
-        st.metric("Discounted Price", f"${discounted_price:,.2f}")
-        st.metric("Additional Items", f"${additional_items_total:,.2f}")
-        st.metric("**TOTAL PRICE**", f"**${final_total:,.2f}**")
+        with section("summary.metrics"):
+            # Calculate totals; unchanged prices and discount reuse the formatted strings
+            totals, metrics = summary_metrics(prices, discount_percent, alcoa_rims_add, grain_sock_add, items)
+            
+            # Display pricing
+            for label, value in metrics:
+                st.metric(label, value)
     
     st.divider()
     
     # Generate Quote Document
     st.subheader("Generate Quote Document")
     
-    if st.button("📄 Generate PDF Quote", type="primary"):
-        st.info("PDF generation would be implemented here using reportlab or similar library")
-    
-    # Export to Excel
-    if st.button("📊 Export to Excel"):
-        # Create export data
-        export_data = {
-            "Quote Information": {
-                "Quote #": quote_number,
-                "Date": str(quote_date),
-                "Dealer": dealer,
-                "Contact": contact,
-                "Model": model
-            },
-            "Specifications": {
-                "Trailer Length": trailer_length,
-                "Wall Height": wall_height,
-                "Chassis Type": chassis_type,
-                "Tire Size": tire_size,
-            },
-            "Pricing": {
-                "Base Price": subtotal,
-                f"Discount ({discount_percent}%)": -discount_amount,
-                "Discounted Price": discounted_price,
-                "Additional Items": additional_items_total,
-                "TOTAL": final_total
-            }
-        }
-        
-        st.success("Excel export functionality ready!")
-        st.json(export_data)
+    current_quote = {
+        'config': QuoteConfig.from_state(st.session_state),
+        'prices': prices,
+        'totals': dict(totals),
+        'line_items': items,
+    }
+    
+    if st.button("💾 Save Quote"):
+        try:
+            quote_store.save(current_quote['config'], prices, totals, current_quote['line_items'])
+            st.success(f"Quote {quote_number} saved")
+        except ValueError as e:
+            st.error(str(e))
+    
+    # Revision history: any saved revision against another or the current form
+    revisions = quote_store.revisions(quote_number) if quote_number else []
+    if revisions:
+        with st.expander(f"Revision History ({len(revisions)} revisions)"):
+            labels = {r['revision']: f"Rev {r['revision']} | {r['saved_at']} | ${r['final_total']:,.2f}"
+                      for r in revisions}
+            col_rev_a, col_rev_b = st.columns(2)
+            with col_rev_a:
+                revision_a = st.selectbox("Compare", list(labels), index=max(0, len(labels) - 2),
+                                          format_func=labels.get, key="revision_a")
+            with col_rev_b:
+                revision_b = st.selectbox("With", ["current"] + list(labels),
+                                          format_func=lambda r: "Current form" if r == "current" else labels[r],
+                                          key="revision_b")
+            old_quote = quote_store.get_revision(quote_number, revision_a)
+            new_quote = current_quote if revision_b == "current" else quote_store.get_revision(quote_number, revision_b)
+            diff = diff_quotes(old_quote, new_quote)
+            a_label = f"Rev {revision_a}"
+            b_label = "Current" if revision_b == "current" else f"Rev {revision_b}"
+            
+            if diff['config']:
+                st.write("**Specification changes**")
+                st.dataframe(pd.DataFrame(
+                    [(FIELD_LABELS.get(key, key), str(old), str(new)) for key, old, new in diff['config']],
+                    columns=["Field", a_label, b_label]), use_container_width=True, hide_index=True)
+            money_changes = ([(item.replace('_', ' ').title(), old, new) for item, old, new in diff['prices']]
+                             + [(item.replace('_', ' ').title(), old, new) for item, old, new in diff['totals']])
+            if money_changes:
+                st.write("**Price changes**")
+                st.dataframe(pd.DataFrame(
+                    [(name, f"${old or 0:,.2f}", f"${new or 0:,.2f}", f"{(new or 0) - (old or 0):+,.2f}")
+                     for name, old, new in money_changes],
+                    columns=["Item", a_label, b_label, "Change"]), use_container_width=True, hide_index=True)
+            if diff['line_items']:
+                old_items, new_items = diff['line_items']
+                st.caption(f"Custom line items changed: {len(old_items)} → {len(new_items)}")
+            if not (diff['config'] or money_changes or diff['line_items']):
+                st.caption("No differences.")
+    
+    st.download_button(
+        "📄 Generate PDF Quote",
+        data=lambda: quote_pdf_bytes(current_quote),
+        file_name=f"Quote-{quote_number or 'draft'}.pdf",
+        mime="application/pdf",
+        type="primary",
+        on_click="ignore",
+    )
+    
+    # Export to Excel, built only when the button is clicked
+    st.download_button(
+        "📊 Export to Excel",
+        data=lambda: quote_xlsx_bytes(current_quote),
+        file_name=f"Quote-{quote_number or 'draft'}.xlsx",
+        mime=XLSX_MIME,
+        on_click="ignore",
+    )
     
     # Signature section
     st.divider()
@@ -603,7 +833,97 @@ with tab7:
         st.write("**Sales Representative:**")
         st.write("")
         st.write("_" * 40)
+    
+    # Custom items added or removed in a fragment rerun
+    save_draft()
+
+show_tab(tab7, summary_tab)
+
+# TAB 8: PRICE EXPLORER
+@st.fragment
+@timed("tab.explorer")
+def explorer_tab():
+    st.header("Price Explorer")
+    st.caption("Cheapest or most expensive builds across every option the compatibility rules allow. "
+               "Subtotals are before discount and additions; the TBD tire carrier price is not included.")
+    explorer = get_explorer(catalog)
+    choices = explorer.choices()
+
+    col1, col2, col3 = st.columns([3, 1, 1])
+    with col1:
+        explore_fields = st.multiselect("Fix these options", choices, default=['model', 'trailer_length', 'chassis_type'],
+                                        format_func=lambda field: FIELD_LABELS.get(field, field), key="explore_fields")
+    with col2:
+        explore_order = st.radio("Find", ["Cheapest", "Most expensive"], key="explore_order")
+    with col3:
+        explore_count = st.number_input("Results", min_value=1, max_value=50, value=10, key="explore_count")
+
+    constraints = {}
+    if explore_fields:
+        columns = st.columns(min(len(explore_fields), 4))
+        for i, field in enumerate(explore_fields):
+            options = explorer.domains[field]
+            current = st.session_state.get(field, options[0])
+            with columns[i % len(columns)]:
+                constraints[field] = st.selectbox(FIELD_LABELS.get(field, field), options,
+                                                  index=options.index(current) if current in options else 0,
+                                                  key=f"explore_{field}")
+
+    with section("explorer.search"):
+        price_range = explorer.price_range(constraints)
+        results = explorer.search(constraints, explore_count, most_expensive=explore_order == "Most expensive")
+    if not results:
+        st.info("No configuration meets these choices and the compatibility rules.")
+        refresh_if_changed()
+        return
+    st.metric("Subtotal Range", f"${price_range[0]:,.2f} – ${price_range[1]:,.2f}")
+
+    # One column per option that differs from the current form in some result
+    current = priced_config()
+    changed = [field for field in choices
+               if any(values[field] != current.get(field) for _, values in results)]
+    explore_results = pd.DataFrame(
+        [{'Rank': rank, 'Subtotal': f"${subtotal:,.2f}",
+          **{FIELD_LABELS.get(field, field): values[field] for field in changed}}
+         for rank, (subtotal, values) in enumerate(results, start=1)]
+    )
+    st.write("**Differences from the current form**" if changed else "**The current form is already the best match**")
+    st.dataframe(explore_results, use_container_width=True, hide_index=True)
+
+    col_load1, col_load2 = st.columns([1, 3])
+    with col_load1:
+        explore_rank = st.selectbox("Result", explore_results['Rank'], key="explore_rank")
+    with col_load2:
+        st.write("")
+        # Single-valued fields (the TBD tire carrier price) keep what was entered
+        load_values = {field: value for field, value in results[explore_rank - 1][1].items() if field in choices}
+        st.button("Load into Form", on_click=load_configuration, args=(load_values,))
+
+    refresh_if_changed()
+
+show_tab(tab8, explorer_tab)
 
 # Footer
 st.divider()
-st.caption(f"Quote Generated: {quote_date} | Discount Applied: {discount_percent}% | Total: ${sum(prices.values()):,.2f}")
+st.caption(f"Quote Generated: {quote_date} | Discount Applied: {discount_percent}% | Total: ${money_sum(prices.values()):,.2f} | Price Catalog v{catalog.version}")
+
+# Opt-in instrumentation (QUOTE_METRICS=1): whole-rerun time, session size,
+# the Prometheus text file and the admin panel
+if METRICS_ENABLED:
+    METRICS.observe("rerun", time.perf_counter() - run_start)
+    gauge("session_state.bytes", state_size(st.session_state))
+    if METRICS_FILE:
+        METRICS.write(METRICS_FILE)
+    if is_admin(st.query_params):
+        with st.sidebar.expander("⏱ Performance", expanded=False):
+            snapshot = METRICS.snapshot()
+            st.dataframe(pd.DataFrame.from_dict(snapshot['timings'], orient='index').round(3)
+                         .sort_values('total_ms', ascending=False), use_container_width=True)
+            st.write({**snapshot['counters'],
+                      **{name: g['last'] for name, g in snapshot['gauges'].items()}})
+            st.download_button("Prometheus metrics", data=METRICS.prometheus(),
+                               file_name="metrics.prom", mime="text/plain", on_click="ignore")
+
+save_draft()
+st.session_state.rule_inputs = rule_inputs()
+st.session_state.full_run_active = False
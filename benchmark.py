@@ -0,0 +1,369 @@
+"""Benchmark suite for the quotation app.
+
+Drives app.py headlessly through Streamlit's AppTest harness and times the
+hot paths underneath it:
+
+* micro: catalog load (xlsx parse, cached sheets, compile), full and
+  incremental pricing, totals and the Summary tab's itemized DataFrame
+* session: first-run and per-rerun script time for one session, for an
+  unpriced edit (paint color) and a priced one (tire size)
+* first_load: a new session's first run with every tab built and with
+  ``QUOTE_LAZY_TABS=1``, with the elements and element bytes sent
+* concurrency: N live sessions driven round-robin, reporting reruns/second,
+  rerun latency percentiles and traced memory per session
+* api: requests/second of ``pricing_api`` with N keep-alive clients, for one
+  repeated config (cache hits), distinct configs (misses) and batches
+
+AppTest is not thread-safe, and a Streamlit server runs every session's
+script in one process under the GIL, so sessions are interleaved on one
+thread rather than run in parallel; what scales with N is the memory held
+and the pressure on the shared caches and quote store.
+
+Run ``python benchmark.py [--sessions 1,10,50,200] [--api 1,10,50] [--output results.json]``.
+Results are JSON; ``--baseline old.json`` reports every timing more than
+``--tolerance`` slower than the baseline and exits non-zero if there are any.
+"""
+import argparse
+import asyncio
+import datetime
+import gc
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+import tracemalloc
+
+import streamlit
+from streamlit.testing.v1 import AppTest
+
+from catalog import DEFAULT_CATALOG, EXCEL_FILE, compile_catalog, read_sheets
+from catalog_cache import load_sheets
+from catalog_watcher import CatalogWatcher
+from pricing import (DEFAULT_CONFIG, IncrementalPricer, calculate_prices, calculate_totals, itemized_frame,
+                     itemized_table, summary_metrics)
+from pricing_api import PricingAPI, start_server
+
+APP_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'app.py')
+TIMEOUT = 60
+
+# Edits made on each rerun, cycling: (widget key, values to alternate between)
+EDITS = [
+    ('paint_color', ["RED", "BLUE"]),
+    ('tire_size', ["24.5", "22.5"]),
+    ('additional_markers', [10, 0]),
+]
+
+
+def _ms(seconds):
+    return round(seconds * 1000, 3)
+
+
+def _stats(times):
+    times = sorted(times)
+    return {
+        'n': len(times),
+        'median_ms': _ms(statistics.median(times)),
+        'p95_ms': _ms(times[min(len(times) - 1, int(len(times) * 0.95))]),
+        'min_ms': _ms(times[0]),
+        'max_ms': _ms(times[-1]),
+    }
+
+
+def _time(fn, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return _stats(times)
+
+
+def micro_benchmarks(excel_file=EXCEL_FILE, repeat=200):
+    """Time catalog loading, pricing, totals and the Summary table build."""
+    config = dict(DEFAULT_CONFIG, tire_size="24.5", additional_markers=10)
+    prices = calculate_prices(config)
+    results = {}
+
+    if os.path.exists(excel_file):
+        sheets = load_sheets(excel_file)
+        results['read_sheets_xlsx'] = _time(lambda: read_sheets(excel_file), max(1, repeat // 40))
+        results['load_sheets_cached'] = _time(lambda: load_sheets(excel_file), max(1, repeat // 10))
+        results['compile_catalog'] = _time(lambda: compile_catalog(sheets), repeat)
+
+    results['calculate_prices'] = _time(lambda: calculate_prices(config, DEFAULT_CATALOG), repeat)
+
+    pricer = IncrementalPricer()
+    pricer.update(config, DEFAULT_CATALOG)
+    results['incremental_unchanged'] = _time(lambda: pricer.update(config, DEFAULT_CATALOG), repeat)
+    edits = [dict(config, paint_color="RED", tire_size=size) for size in ("22.5", "24.5")]
+    results['incremental_one_edit'] = _time(
+        lambda: [pricer.update(edit, DEFAULT_CATALOG) for edit in edits], repeat)
+
+    results['calculate_totals'] = _time(lambda: calculate_totals(prices, 4.0, 2000, 500), repeat)
+    results['itemized_frame'] = _time(lambda: itemized_frame(prices, config), repeat)
+    results['itemized_table_cached'] = _time(lambda: itemized_table(prices, config), repeat)
+    results['summary_metrics_cached'] = _time(lambda: summary_metrics(prices, 4.0, 2000, 500), repeat)
+    return results
+
+
+def _new_session():
+    return AppTest.from_file(APP_FILE, default_timeout=TIMEOUT)
+
+
+def _check(at):
+    if at.exception:
+        raise RuntimeError(f"app raised during benchmark: {at.exception[0].value}")
+
+
+def _rerun(at, step):
+    key, values = EDITS[step % len(EDITS)]
+    widget = at.selectbox(key=key) if key != 'additional_markers' else at.number_input(key=key)
+    value = values[(step // len(EDITS)) % len(values)]
+    start = time.perf_counter()
+    if key == 'additional_markers':
+        widget.set_value(value).run()
+    else:
+        widget.select(value).run()
+    elapsed = time.perf_counter() - start
+    _check(at)
+    return key, elapsed
+
+
+def session_benchmark(reruns=30):
+    """First-run and per-rerun time of one session, split by the edited widget."""
+    _new_session().run()  # warm imports and st.cache_resource
+    at = _new_session()
+    start = time.perf_counter()
+    at.run()
+    first = time.perf_counter() - start
+    _check(at)
+
+    by_key = {key: [] for key, _ in EDITS}
+    for step in range(reruns):
+        key, elapsed = _rerun(at, step)
+        by_key[key].append(elapsed)
+    return {
+        'first_run_ms': _ms(first),
+        'rerun': _stats([t for times in by_key.values() for t in times]),
+        'rerun_by_widget': {key: _stats(times) for key, times in by_key.items()},
+    }
+
+
+def _elements(node):
+    yield node
+    for child in getattr(node, 'children', {}).values():
+        yield from _elements(child)
+
+
+def first_load_benchmark(repeat=5):
+    """A new session's first run, every tab built vs. only the selected one.
+
+    The byte count sums the elements' protobufs, i.e. roughly what the first
+    page load sends over the websocket.
+    """
+    results = {}
+    previous = os.environ.get('QUOTE_LAZY_TABS')
+    try:
+        _new_session().run()  # warm imports and st.cache_resource
+        times = {'eager': [], 'lazy': []}
+        for _ in range(repeat):
+            # Alternated, so both modes see the same cache and GC state
+            for mode in times:
+                os.environ['QUOTE_LAZY_TABS'] = '1' if mode == 'lazy' else '0'
+                at = _new_session()
+                start = time.perf_counter()
+                at.run()
+                times[mode].append(time.perf_counter() - start)
+                _check(at)
+                nodes = list(_elements(at._tree))
+                results[mode] = {
+                    'elements': len(nodes),
+                    'element_bytes': sum(node.proto.ByteSize() for node in nodes
+                                         if getattr(node, 'proto', None) is not None),
+                }
+    finally:
+        if previous is None:
+            os.environ.pop('QUOTE_LAZY_TABS', None)
+        else:
+            os.environ['QUOTE_LAZY_TABS'] = previous
+    for mode, mode_times in times.items():
+        results[mode]['first_run'] = _stats(mode_times)
+    return results
+
+
+def concurrency_benchmark(sessions, reruns_per_session=5):
+    """Hold ``sessions`` live sessions and interleave their reruns."""
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    apps = []
+    for _ in range(sessions):
+        at = _new_session()
+        at.run()
+        _check(at)
+        apps.append(at)
+    gc.collect()
+    held = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+
+    times = []
+    start = time.perf_counter()
+    for step in range(reruns_per_session):
+        for at in apps:
+            times.append(_rerun(at, step)[1])
+    wall = time.perf_counter() - start
+    return {
+        'sessions': sessions,
+        'reruns': len(times),
+        'reruns_per_second': round(len(times) / wall, 2),
+        'rerun': _stats(times),
+        'memory_per_session_kb': round(held / sessions / 1024, 1),
+    }
+
+
+async def _api_client(host, port, bodies, path, times):
+    # One keep-alive connection sending its requests in turn
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        for body in bodies:
+            start = time.perf_counter()
+            writer.write(f"POST {path} HTTP/1.1\r\nHost: {host}\r\nContent-Type: application/json\r\n"
+                         f"Content-Length: {len(body)}\r\n\r\n".encode() + body)
+            await writer.drain()
+            status = await reader.readline()
+            length = 0
+            while (line := await reader.readline()) not in (b'\r\n', b''):
+                if line.lower().startswith(b'content-length:'):
+                    length = int(line.split(b':')[1])
+            await reader.readexactly(length)
+            if b' 200 ' not in status:
+                raise RuntimeError(f"pricing API answered {status.decode().strip()}")
+            times.append(time.perf_counter() - start)
+    finally:
+        writer.close()
+
+
+async def _api_run(concurrency, requests, batch_size):
+    watcher = CatalogWatcher(EXCEL_FILE)
+    watcher.reload()
+    server = await start_server(PricingAPI(watcher), '127.0.0.1', 0)
+    host, port = server.sockets[0].getsockname()[:2]
+
+    def quote(n):
+        # The discount is part of the cache key, so distinct discounts are distinct misses
+        return {'config': dict(DEFAULT_CONFIG, quote_date=None, discount_percent=round(n % 10000 / 1000, 3)),
+                'line_items': [{'name': "Tarp", 'price': 450}]}
+
+    async def drive(bodies, path):
+        times = []
+        start = time.perf_counter()
+        await asyncio.gather(*(_api_client(host, port, bodies[i::concurrency], path, times)
+                               for i in range(concurrency)))
+        return times, time.perf_counter() - start
+
+    results = {}
+    repeated = json.dumps(quote(0)).encode()
+    times, wall = await drive([repeated] * requests, '/price')
+    results['cached'] = {'requests_per_second': round(len(times) / wall, 1), 'latency': _stats(times)}
+    distinct = [json.dumps(quote(n)).encode() for n in range(1, requests + 1)]
+    times, wall = await drive(distinct, '/price')
+    results['uncached'] = {'requests_per_second': round(len(times) / wall, 1), 'latency': _stats(times)}
+    batches = [json.dumps({'quotes': [quote(requests + 1 + n * batch_size + i) for i in range(batch_size)]}).encode()
+               for n in range(max(1, requests // batch_size))]
+    times, wall = await drive(batches, '/price/batch')
+    results['batch'] = {'batch_size': batch_size, 'quotes_per_second': round(len(times) * batch_size / wall, 1),
+                        'latency': _stats(times)}
+    server.close()
+    await server.wait_closed()
+    return results
+
+
+def api_benchmark(concurrency, requests=2000, batch_size=200):
+    """Drive the pricing API with ``concurrency`` clients in this process.
+
+    Server and clients share one event loop (and the GIL), so the figures
+    are a floor for a dedicated server process.
+    """
+    return {'concurrency': concurrency, **asyncio.run(_api_run(concurrency, requests, batch_size))}
+
+
+def run_all(sessions=(1, 10, 50), reruns=30, reruns_per_session=5, repeat=200, api=(1, 10, 50)):
+    return {
+        'meta': {
+            'timestamp': datetime.datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'streamlit': streamlit.__version__,
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+        },
+        'micro': micro_benchmarks(repeat=repeat),
+        'session': session_benchmark(reruns),
+        'first_load': first_load_benchmark(),
+        'concurrency': [concurrency_benchmark(n, reruns_per_session) for n in sessions],
+        'api': [api_benchmark(n) for n in api],
+    }
+
+
+def _timings(results, prefix=''):
+    # Flatten to {path: median_ms} for comparison
+    flat = {}
+    if isinstance(results, dict):
+        for key, value in results.items():
+            if key in ('median_ms', 'first_run_ms') and isinstance(value, (int, float)):
+                flat[f"{prefix}{key}"] = value
+            else:
+                flat.update(_timings(value, f"{prefix}{key}."))
+    elif isinstance(results, list):
+        for value in results:
+            label = ''
+            if isinstance(value, dict):
+                label = next((f"{name}={value[name]}" for name in ('sessions', 'concurrency') if name in value), '')
+            flat.update(_timings(value, f"{prefix}{label}."))
+    return flat
+
+
+def compare(baseline, results, tolerance=0.2):
+    """Timings in ``results`` more than ``tolerance`` slower than in ``baseline``."""
+    old = _timings(baseline)
+    regressions = []
+    for name, value in _timings(results).items():
+        if name in old and old[name] > 0 and value > old[name] * (1 + tolerance):
+            regressions.append((name, old[name], value))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--sessions', default='1,10,50', help="comma-separated session counts")
+    parser.add_argument('--api', default='1,10,50', help="comma-separated pricing API client counts")
+    parser.add_argument('--reruns', type=int, default=30, help="reruns for the single-session benchmark")
+    parser.add_argument('--reruns-per-session', type=int, default=5)
+    parser.add_argument('--repeat', type=int, default=200, help="iterations per micro-benchmark")
+    parser.add_argument('--output', help="write the JSON results here instead of stdout")
+    parser.add_argument('--baseline', help="JSON results of a previous run to compare against")
+    parser.add_argument('--tolerance', type=float, default=0.2)
+    args = parser.parse_args(argv)
+
+    sessions = [int(n) for n in args.sessions.split(',') if n]
+    api = [int(n) for n in args.api.split(',') if n]
+    results = run_all(sessions, args.reruns, args.reruns_per_session, args.repeat, api)
+    text = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(text)
+    else:
+        print(text)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(json.load(f), results, args.tolerance)
+        for name, old, new in regressions:
+            print(f"REGRESSION {name}: {old:.3f} ms -> {new:.3f} ms", file=sys.stderr)
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
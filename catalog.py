@@ -0,0 +1,229 @@
+"""Price catalog compiled from Quote-Tempelate.xlsx.
+
+Any sheet of the quote workbook (LIGHTS, AXLES, TIRES, SPECOPTIONS, CHASSIS)
+can carry three kinds of rows, each recognised by its column headers:
+
+    GROUP | OPTION | PRICE | TIRE SIZE | TIRE TYPE                     price rows
+    IF FIELD | IF VALUE | THEN FIELD | ALLOWED | MIN | MAX | MESSAGE   compatibility rules (``rules``)
+    PRESET | FIELD | VALUE                                              preset builds (``presets``)
+
+Sheets with none of these are skipped, and workbook rows override the
+built-in defaults, so a price change is just an Excel edit. On price rows
+``TIRE SIZE`` and ``TIRE TYPE`` are optional conditions (used by the rim
+groups), and an ``OPTION`` of ``*`` is the fallback price for the group.
+
+Prices are kept as rows of ``(group, option, price, conditions)``, compiled
+once into a dict index so every lookup is a hash hit; prices are rounded to
+the cent there (see ``money``). Rules and presets are compiled alongside and
+travel with the catalog as ``catalog.rules`` and ``catalog.presets``.
+"""
+import hashlib
+
+import pandas as pd
+
+from money import to_the_cent
+from presets import DEFAULT_PRESETS, compile_presets
+from rules import DEFAULT_RULESET, compile_rules
+
+ANY = '*'
+
+EXCEL_FILE = 'Quote-Tempelate.xlsx'
+SHEETS = ['LIGHTS', 'AXLES', 'TIRES', 'SPECOPTIONS', 'CHASSIS']
+
+# Condition columns, in the order they appear in the index key
+CONDITION_COLUMNS = ['TIRE SIZE', 'TIRE TYPE']
+
+
+def _table(group, prices):
+    return [(group, option, price, ()) for option, price in prices.items()]
+
+
+def _rims(group, prices, flat_price):
+    rows = [(group, option, price, ("22.5", "DUAL TIRES")) for option, price in prices.items()]
+    rows.append((group, ANY, flat_price, ()))
+    return rows
+
+
+# Built-in price list, used when the workbook is missing or has no price rows
+DEFAULT_ROWS = (
+    _table('trailer_length', {
+        "40'": 0, "41'": 0, "42'": 0, "43'": 0, "44'": 0, "45'": 0, "46'": 1000, "47'": 1000, "48'": 1000
+    })
+    + _table('wall_height', {
+        '60"': 0, '62"': 500, '64"': 600, '66"': 700, '68"': 800,
+        '70"': 900, '72"': 1000, '74"': 1100, '76"': 1200, '78"': 1300, '80"': 1400, '82"': 1500, '84"': 1600
+    })
+    + _table('board_height', {"NONE": 0, '6" Board': 0, '8" Board': 0, '10" Board': 0, '12" Board': 0})
+    + _table('floor', {'1/4" THICKNESS': 0, '3/8" THICKNESS': 1000})
+    + _table('tow_motor', {"NO": 0, "YES": 500})
+    + _table('rear_steps', {"D/S IN AND OUT": 0, "P/S IN AND OUT": 0, "P/S IN": 0, "NONE": 0})
+    + _table('shovel_holder', {
+        "YES -DRIVER SIDE @DOGHOUSE": 50,
+        "YES -DRIVER SIDE @UNDERNEATH BOX": 50,
+        "NONE": 0
+    })
+    + _table('man_door', {
+        "NONE": 0, "YES - DRIVER SIDE W/GRAB HANDLE": 1300, "YES - PASSENGER SIDE W/GRAB HANDLE": 1300
+    })
+    + _table('bulkhead_steps', {
+        "NONE": 0, "DRIVER SIDE AND 1 BELOW MANDOOR": 0, "PASSENGER SIDE AND 1 BELOW MANDOOR": 0
+    })
+    + _table('tailgate_slope', {"STRAIGHT": 0, "85 DEGREE SLOPE": 0})
+    + _table('gate_operation', {
+        "ELECTRIC OVER AIR BOOSTER": 0,
+        "ELECTRIC OVER AIR CYLINDER": 0,
+        "MANUAL LOCKING": 0
+    })
+    + _table('coal_chute', {'3 DOORS 24"': 1500, '1 DOOR 24"': 1000, "NONE": 0})
+    + _table('sock_adaptor', {"NONE": 0, "YES- Driver Side": 0, "YES- Passenger Side": 0})
+    + _table('chassis', {
+        "ALUMINUM (Polished)": 4500,
+        "ALUMINUM (Non Polished)": 1500,
+        "STEEL": 0
+    })
+    + _table('gooseneck', {"NONE": 0, 'YES - 12"': 0})
+    + _table('ride_mudflap', {"FRONT OF ALL AXLES": 0, "FRONT OF 1ST RIDE ONLY": 0})
+    + _table('landing_gear', {"STEEL - SAF HOLLAND": 0, "ALUMINUM - JOST AX150": 0})
+    + _table('brakes', {"DRUM": 0, "DISC": 0})
+    + _table('lift_axle', {0: 0, 1: 1000, 2: 2000, 3: 3000})
+    + _table('steer_axle', {0: 0, 1: 7000, 2: 14000})
+    # Rim prices only apply to 22.5 dual tires, everything else is a flat rate
+    + _rims('ride_rims', {
+        "HIGH POLISH x ALL RIMS": 1500,
+        "DURABRITE x ALL RIMS": 4500,
+        "HIGH POLISH INSIDE AND DURABRITE OUTSIDE": 2250
+    }, 1500)
+    + _rims('steer_rims', {
+        "DURABRITE x ALL RIMS": 1000,
+        "HIGH POLISH x ALL RIMS": 500,
+        "HIGH POLISH INSIDE AND DURABRITE OUTSIDE": 750
+    }, 500)
+    + _table('light_type', {
+        "GROTE L.E.D. STANDARD - GROMMET MOUNT": 0,
+        "GROTE L.E.D. STANDARD - FLANGE MOUNT": 0
+    })
+    # Per-light rate for additional marker lights, by light type
+    + _table('marker_lights', {
+        "GROTE L.E.D. STANDARD - GROMMET MOUNT": 120,
+        "GROTE L.E.D. STANDARD - FLANGE MOUNT": 140,
+        ANY: 140,
+    })
+)
+
+
+def _normalize_option(value):
+    # Excel hands back 1.0 for a quantity of 1 and pads text with spaces
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+    if isinstance(value, str):
+        return value.strip()
+    return value
+
+
+def _normalize_condition(value):
+    if pd.isna(value) or value == '':
+        return None
+    if isinstance(value, float):
+        return f"{value:g}"
+    return str(value).strip()
+
+
+class Catalog:
+    """In-memory price index keyed by ``(group, option, conditions)``."""
+
+    def __init__(self, rows, version=0, rules=None, presets=None):
+        self.version = version
+        self.rules = DEFAULT_RULESET if rules is None else rules
+        self.presets = DEFAULT_PRESETS if presets is None else presets
+        self._index = {}
+        self._options = {}
+        self._tables = {}
+        self._digest = None
+        for group, option, price, conditions in rows:
+            option = _normalize_option(option)
+            self._index[(group, option, tuple(conditions))] = to_the_cent(price)
+            if option != ANY:
+                options = self._options.setdefault(group, [])
+                if option not in options:
+                    options.append(option)
+
+    def __len__(self):
+        return len(self._index)
+
+    @property
+    def digest(self):
+        """Fingerprint of the prices: equal for catalogs that price every quote alike."""
+        if self._digest is None:
+            text = repr(sorted(self._index.items(), key=repr))
+            self._digest = hashlib.sha1(text.encode()).hexdigest()[:12]
+        return self._digest
+
+    def groups(self):
+        return list(self._options)
+
+    def options(self, group):
+        """Selectable options of a group, in catalog order."""
+        return self._options.get(group, [])
+
+    def price(self, group, option, conditions=()):
+        """Price of an option; falls back to the unconditional and ``*`` rows, then 0."""
+        index = self._index
+        price = index.get((group, option, conditions))
+        if price is None and conditions:
+            price = index.get((group, option, ()))
+        if price is None:
+            price = index.get((group, ANY, conditions))
+        if price is None and conditions:
+            price = index.get((group, ANY, ()))
+        return 0 if price is None else price
+
+    def table(self, group, conditions=()):
+        """``{option: price}`` for a group under the given conditions (memoized)."""
+        key = (group, conditions)
+        table = self._tables.get(key)
+        if table is None:
+            table = {option: self.price(group, option, conditions) for option in self.options(group)}
+            self._tables[key] = table
+        return table
+
+
+def rows_from_sheet(df):
+    """Extract catalog rows from one workbook sheet, or [] if it has no price rows."""
+    columns = {str(col).strip().upper(): col for col in df.columns}
+    if not {'GROUP', 'OPTION', 'PRICE'} <= set(columns):
+        return []
+
+    rows = []
+    for record in df.to_dict('records'):
+        group = record[columns['GROUP']]
+        option = record[columns['OPTION']]
+        price = pd.to_numeric(record[columns['PRICE']], errors='coerce')
+        if pd.isna(group) or pd.isna(option) or pd.isna(price):
+            continue
+        conditions = tuple(
+            _normalize_condition(record[columns[name]]) if name in columns else None
+            for name in CONDITION_COLUMNS
+        )
+        if all(value is None for value in conditions):
+            conditions = ()
+        rows.append((str(group).strip(), option, float(price), conditions))
+    return rows
+
+
+def compile_catalog(sheets, version=0):
+    """Build a Catalog (and its rules and presets) from the workbook sheets layered over the defaults."""
+    rows = list(DEFAULT_ROWS)
+    for df in sheets:
+        rows.extend(rows_from_sheet(df))
+    return Catalog(rows, version=version, rules=compile_rules(sheets), presets=compile_presets(sheets))
+
+
+def read_sheets(excel_file=EXCEL_FILE):
+    return [pd.read_excel(excel_file, sheet_name=name) for name in SHEETS]
+
+
+def load_catalog(excel_file=EXCEL_FILE):
+    return compile_catalog(read_sheets(excel_file))
+
+
+DEFAULT_CATALOG = Catalog(DEFAULT_ROWS)
@@ -0,0 +1,178 @@
+"""On-disk cache of the parsed quote workbook sheets.
+
+Parsing Quote-Tempelate.xlsx through openpyxl is the slowest part of a cold
+start. The parsed sheets are written to ``.catalog_cache/`` next to the
+workbook as Parquet files (pickle for sheets Arrow can't type, e.g. mixed
+text/number columns) together with a manifest holding the workbook's mtime,
+size and SHA-256. A later process loads the Parquet files directly and only
+re-parses the workbook when it has actually changed.
+
+Run ``python catalog_cache.py [workbook]`` for a timing report comparing the
+xlsx and cached load.
+"""
+import hashlib
+import json
+import logging
+import os
+import sys
+import time
+
+import pandas as pd
+
+from catalog import EXCEL_FILE, SHEETS, read_sheets
+from instrumentation import count
+
+logger = logging.getLogger(__name__)
+
+CACHE_DIR = '.catalog_cache'
+MANIFEST = 'manifest.json'
+CACHE_FORMAT_VERSION = 1
+
+
+def _cache_dir(excel_file):
+    return os.path.join(os.path.dirname(os.path.abspath(excel_file)), CACHE_DIR)
+
+
+def workbook_hash(excel_file):
+    digest = hashlib.sha256()
+    with open(excel_file, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _read_manifest(cache_dir):
+    try:
+        with open(os.path.join(cache_dir, MANIFEST)) as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if manifest.get('format') != CACHE_FORMAT_VERSION:
+        return None
+    return manifest
+
+
+def _write_atomic(path, write):
+    tmp = f"{path}.tmp{os.getpid()}"
+    try:
+        write(tmp)
+        os.replace(tmp, path)
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+
+
+def _dump_json(data, path):
+    with open(path, 'w') as f:
+        json.dump(data, f)
+
+
+def _write_sheet(cache_dir, name, df):
+    path = os.path.join(cache_dir, f"{name}.parquet")
+    try:
+        _write_atomic(path, lambda tmp: df.to_parquet(tmp, index=False))
+        return os.path.basename(path)
+    except Exception:
+        # Arrow refuses mixed-type object columns and non-string headers
+        path = os.path.join(cache_dir, f"{name}.pkl")
+        _write_atomic(path, lambda tmp: df.to_pickle(tmp))
+        return os.path.basename(path)
+
+
+def _read_sheet(cache_dir, filename):
+    path = os.path.join(cache_dir, filename)
+    if filename.endswith('.parquet'):
+        return pd.read_parquet(path)
+    return pd.read_pickle(path)
+
+
+def rebuild(excel_file=EXCEL_FILE, digest=None):
+    """Parse the workbook and refresh the cache. Returns the parsed sheets."""
+    stat = os.stat(excel_file)
+    digest = digest or workbook_hash(excel_file)
+    sheets = read_sheets(excel_file)
+
+    cache_dir = _cache_dir(excel_file)
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        files = [_write_sheet(cache_dir, name, df) for name, df in zip(SHEETS, sheets)]
+        manifest = {
+            'format': CACHE_FORMAT_VERSION,
+            'mtime_ns': stat.st_mtime_ns,
+            'size': stat.st_size,
+            'sha256': digest,
+            'sheets': dict(zip(SHEETS, files)),
+        }
+        _write_atomic(os.path.join(cache_dir, MANIFEST), lambda tmp: _dump_json(manifest, tmp))
+    except OSError as exc:
+        # A read-only checkout still works, it just parses the xlsx every time
+        logger.warning("could not write catalog cache in %s: %s", cache_dir, exc)
+    return sheets
+
+
+def load_sheets(excel_file=EXCEL_FILE):
+    """Return the workbook sheets, from the cache when the workbook is unchanged.
+
+    The mtime and size are checked first; only when they differ is the file
+    hashed, so touching the workbook without editing it keeps the cache.
+    """
+    start = time.perf_counter()
+    stat = os.stat(excel_file)
+    cache_dir = _cache_dir(excel_file)
+    manifest = _read_manifest(cache_dir)
+
+    digest = None
+    fresh = False
+    if manifest is not None:
+        if manifest['mtime_ns'] == stat.st_mtime_ns and manifest['size'] == stat.st_size:
+            fresh = True
+        else:
+            digest = workbook_hash(excel_file)
+            fresh = digest == manifest['sha256']
+
+    if fresh:
+        try:
+            sheets = [_read_sheet(cache_dir, manifest['sheets'][name]) for name in SHEETS]
+            if digest is not None:
+                # Same content under a new mtime, remember it to skip hashing next time
+                manifest.update(mtime_ns=stat.st_mtime_ns, size=stat.st_size)
+                _write_atomic(os.path.join(cache_dir, MANIFEST), lambda tmp: _dump_json(manifest, tmp))
+            count("catalog_cache.hit")
+            logger.info("catalog sheets loaded from cache in %.1f ms", (time.perf_counter() - start) * 1000)
+            return sheets
+        except Exception as exc:
+            logger.warning("catalog cache unreadable, rebuilding: %s", exc)
+
+    sheets = rebuild(excel_file, digest)
+    count("catalog_cache.miss")
+    logger.info("catalog sheets parsed from xlsx in %.1f ms", (time.perf_counter() - start) * 1000)
+    return sheets
+
+
+def timing_report(excel_file=EXCEL_FILE, repeat=5):
+    """Time the xlsx parse against the cached load, in milliseconds."""
+    rebuild(excel_file)
+
+    def best(fn):
+        times = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            fn(excel_file)
+            times.append((time.perf_counter() - start) * 1000)
+        return min(times)
+
+    xlsx_ms = best(read_sheets)
+    cached_ms = best(load_sheets)
+    return {
+        'workbook': excel_file,
+        'xlsx_ms': round(xlsx_ms, 2),
+        'cached_ms': round(cached_ms, 2),
+        'speedup': round(xlsx_ms / cached_ms, 1) if cached_ms else None,
+    }
+
+
+if __name__ == '__main__':
+    report = timing_report(sys.argv[1] if len(sys.argv) > 1 else EXCEL_FILE)
+    print(f"xlsx load:   {report['xlsx_ms']:8.2f} ms")
+    print(f"cached load: {report['cached_ms']:8.2f} ms")
+    print(f"speedup:     {report['speedup']}x")
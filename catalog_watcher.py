@@ -0,0 +1,91 @@
+"""Hot reload of the price catalog when the quote workbook changes.
+
+A CatalogWatcher polls the workbook's mtime/size from a daemon thread. When
+the file changes (and has stopped changing for one poll, so a half-copied
+workbook is never read) the catalog is rebuilt in that thread and swapped in
+with a single attribute assignment. Sessions read ``watcher.catalog`` once
+per rerun, so a running script keeps the catalog it started with and picks
+up the new prices on its next rerun.
+"""
+import logging
+import os
+import threading
+
+from catalog import DEFAULT_CATALOG, EXCEL_FILE, compile_catalog
+from catalog_cache import load_sheets
+from instrumentation import count
+
+logger = logging.getLogger(__name__)
+
+POLL_SECONDS = 2.0
+
+
+def _signature(excel_file):
+    try:
+        stat = os.stat(excel_file)
+    except OSError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+
+class CatalogWatcher:
+    def __init__(self, excel_file=EXCEL_FILE, poll_seconds=POLL_SECONDS):
+        self.excel_file = excel_file
+        self.poll_seconds = poll_seconds
+        self.catalog = DEFAULT_CATALOG
+        self.loaded = False
+        self.error = None
+        self._signature = None
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    @property
+    def version(self):
+        return self.catalog.version
+
+    def reload(self):
+        """Rebuild the catalog now if the workbook changed. Returns True on swap."""
+        with self._lock:
+            signature = _signature(self.excel_file)
+            if signature is None or signature == self._signature:
+                return False
+            try:
+                catalog = compile_catalog(load_sheets(self.excel_file), version=self.catalog.version + 1)
+            except Exception as exc:
+                # Keep serving the previous catalog, retry on the next change
+                self.error = exc
+                self._signature = signature
+                count("catalog.reload_errors")
+                logger.warning("catalog reload of %s failed: %s", self.excel_file, exc)
+                return False
+            self.catalog = catalog
+            self.loaded = True
+            count("catalog.reloads")
+            self.error = None
+            self._signature = signature
+            logger.info("catalog version %d loaded from %s", catalog.version, self.excel_file)
+            return True
+
+    def start(self):
+        if self._thread is None:
+            self.reload()
+            self._thread = threading.Thread(target=self._run, name="catalog-watcher", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+
+    def _run(self):
+        pending = None
+        while not self._stop.wait(self.poll_seconds):
+            signature = _signature(self.excel_file)
+            if signature is None or signature == self._signature:
+                pending = None
+            elif signature == pending:
+                # Unchanged for a whole poll, the save has finished
+                self.reload()
+                pending = None
+            else:
+                pending = signature
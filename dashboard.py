@@ -0,0 +1,103 @@
+"""Quote analytics for management: ``streamlit run dashboard.py``.
+
+Every chart and table reads the rollup tables of ``quote_analytics``, never
+the quotes themselves, so a page costs the same few queries however many
+quotes are stored.
+"""
+import datetime
+
+import streamlit as st
+
+from instrumentation import section
+from quote_analytics import ROLLUP_FIELDS, QuoteAnalytics
+from quote_fields import FIELD_LABELS
+from quote_store import QuoteStore
+
+ALL = "All"
+# Dealers listed in the breakdown table
+TOP_DEALERS = 25
+
+st.set_page_config(page_title="Quote Analytics", layout="wide")
+
+
+# The quote database shared with the quoting app
+@st.cache_resource
+def get_analytics():
+    return QuoteAnalytics(QuoteStore())
+
+analytics = get_analytics()
+# Quotes saved before the rollup tables existed are rolled up by an explicit step
+missing = analytics.missing()
+
+with st.sidebar:
+    st.header("Filters")
+    today = datetime.date.today()
+    dates = st.date_input("Quote dates", value=(today - datetime.timedelta(days=90), today), key="dates")
+    # A range still being picked has only its first day
+    date_from, date_to = (tuple(dates) + (None, None))[:2]
+    dealer = st.selectbox("Dealer", [ALL] + analytics.values('dealer'), key="dealer")
+    model = st.selectbox("Model", [ALL] + analytics.values('model'), key="model")
+
+filters = {
+    'date_from': date_from,
+    'date_to': date_to,
+    'dealer': None if dealer == ALL else dealer,
+    'model': None if model == ALL else model,
+}
+
+st.title("Quote Analytics")
+if missing:
+    st.warning(f"{missing:,} saved quotes predate the rollups and are not counted. "
+               "Run `python quote_analytics.py` to roll them up.")
+
+with section("dashboard.daily"):
+    daily = analytics.daily(**filters)
+if daily.empty:
+    st.info("No quotes saved for these filters.")
+    st.stop()
+
+col1, col2, col3 = st.columns(3)
+quotes = int(daily['quotes'].sum())
+col1.metric("Quotes", f"{quotes:,}")
+col2.metric("Average Total", f"${(daily['quotes'] * daily['average_total']).sum() / quotes:,.2f}")
+col3.metric("Quotes per Day", f"{quotes / len(daily):,.1f}")
+
+daily = daily.set_index('day')
+col1, col2 = st.columns(2)
+with col1:
+    st.subheader("Quotes per Day")
+    st.bar_chart(daily['quotes'])
+with col2:
+    st.subheader("Average Total per Day")
+    st.line_chart(daily['average_total'])
+
+col1, col2 = st.columns(2)
+with col1:
+    st.subheader("By Dealer")
+    with section("dashboard.dealers"):
+        dealers = analytics.breakdown('dealer', limit=TOP_DEALERS, **filters)
+    st.dataframe(dealers, hide_index=True, use_container_width=True, column_config={
+        'average_total': st.column_config.NumberColumn("Average Total", format="$%.2f"),
+        'average_discount': st.column_config.NumberColumn("Average Discount", format="%.1f%%"),
+    })
+with col2:
+    st.subheader("By Model")
+    with section("dashboard.models"):
+        models = analytics.breakdown('model', **filters)
+    st.dataframe(models, hide_index=True, use_container_width=True, column_config={
+        'average_total': st.column_config.NumberColumn("Average Total", format="$%.2f"),
+        'average_discount': st.column_config.NumberColumn("Average Discount", format="%.1f%%"),
+    })
+
+st.subheader("Discounts")
+with section("dashboard.discounts"):
+    discounts = analytics.discounts(**filters)
+st.bar_chart(discounts.assign(discount=discounts['discount'].astype(str) + "%").set_index('discount')['quotes'])
+
+st.subheader("Most Selected Options")
+for column, field in zip(st.columns(len(ROLLUP_FIELDS)), ROLLUP_FIELDS):
+    with column:
+        st.markdown(f"**{FIELD_LABELS.get(field, field)}**")
+        with section("dashboard.options"):
+            options = analytics.options(field, **filters)
+        st.dataframe(options, hide_index=True, use_container_width=True)
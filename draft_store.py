@@ -0,0 +1,214 @@
+"""In-progress quotes, kept outside the Streamlit session.
+
+A draft is the form's values (a ``QuoteConfig``) and the custom line items,
+stored under a draft id that the app keeps in the page URL (``?draft=``).
+A reload, a restarted server or a rep moved to another instance by the load
+balancer reopens the same URL and gets the draft back.
+
+``SqliteDraftStore`` keeps drafts in a SQLite file, standing in for storage
+shared by every instance; drafts untouched for ``DRAFT_TTL_DAYS`` are purged
+when it opens. ``MemoryDraftStore`` is a least-recently-used cache of
+``max_drafts`` drafts in this process, over a ``SqliteDraftStore`` or on its
+own. The app reads a session's line items from it on every run instead of
+keeping a copy in the session, so idle sessions cost a bounded amount of
+memory; a draft dropped from the cache is read back from SQLite.
+
+Both hold a draft packed: the config as ``QuoteConfig.to_bytes``
+(a few hundred bytes) and the line items as JSON. ``QUOTE_DRAFT_STORE``
+picks the storage (``sqlite`` by default, or ``memory`` for a single
+instance without persistence, whose evicted drafts are gone).
+
+Line items carry a stable ``id`` so a removal targets the item the rep
+clicked, not whatever sits at that list index by the time it runs.
+"""
+import datetime
+import json
+import os
+import sqlite3
+import threading
+import uuid
+from collections import OrderedDict
+
+from quote_config import QuoteConfig
+
+DRAFTS_FILE = 'drafts.db'
+# Drafts held by MemoryDraftStore before the least recently used is dropped
+MAX_DRAFTS = 5000
+DRAFT_TTL_DAYS = 30
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS drafts (
+    draft_id TEXT PRIMARY KEY,
+    config BLOB NOT NULL,
+    line_items TEXT NOT NULL,
+    saved_at TEXT NOT NULL
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS drafts_saved_at ON drafts (saved_at);
+"""
+
+
+def new_draft_id():
+    return uuid.uuid4().hex
+
+
+def line_item(name, price, item_id=None):
+    """A custom line item with a stable id."""
+    return {'id': item_id or uuid.uuid4().hex[:12], 'name': name, 'price': price}
+
+
+def with_item_ids(line_items):
+    """The line items, giving an id to those saved before items had one."""
+    return [item if item.get('id') else line_item(item['name'], item['price']) for item in line_items]
+
+
+def _pack(config, line_items):
+    if not isinstance(config, QuoteConfig):
+        config = QuoteConfig(config)
+    return config.to_bytes(), json.dumps(list(line_items), separators=(',', ':'))
+
+
+def _unpack(config, line_items, saved_at):
+    try:
+        config = QuoteConfig.from_bytes(config)
+    except ValueError:
+        # Packed for another field list (the form changed since); start over
+        return None
+    return {'config': config, 'line_items': json.loads(line_items), 'saved_at': saved_at}
+
+
+def _now():
+    return datetime.datetime.now().isoformat(timespec='seconds')
+
+
+class MemoryDraftStore:
+    def __init__(self, backing=None, max_drafts=MAX_DRAFTS):
+        self.backing = backing
+        self.max_drafts = max_drafts
+        self._drafts = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._drafts)
+
+    def _remember(self, draft_id, packed):
+        with self._lock:
+            self._drafts[draft_id] = packed
+            self._drafts.move_to_end(draft_id)
+            while len(self._drafts) > self.max_drafts:
+                self._drafts.popitem(last=False)
+
+    def _packed(self, draft_id, refresh=False):
+        if not refresh or self.backing is None:
+            with self._lock:
+                packed = self._drafts.get(draft_id)
+                if packed is not None:
+                    self._drafts.move_to_end(draft_id)
+                    return packed
+            if self.backing is None:
+                return None
+        packed = self.backing._get_packed(draft_id)
+        if packed is None:
+            with self._lock:
+                self._drafts.pop(draft_id, None)
+        else:
+            self._remember(draft_id, packed)
+        return packed
+
+    def get(self, draft_id, refresh=False):
+        """``{'config', 'line_items', 'saved_at'}`` of a draft, or None.
+
+        ``refresh`` reads past the cache, for a session opening a draft that
+        another instance may have saved since.
+        """
+        packed = self._packed(draft_id, refresh)
+        return None if packed is None else _unpack(*packed)
+
+    def line_items(self, draft_id):
+        """The draft's line items, without unpacking its config."""
+        packed = self._packed(draft_id)
+        return [] if packed is None else json.loads(packed[1])
+
+    def save(self, draft_id, config, line_items=()):
+        """Store a draft; returns False, writing nothing, when it is unchanged."""
+        config, line_items = _pack(config, line_items)
+        with self._lock:
+            cached = self._drafts.get(draft_id)
+        if cached is not None and cached[:2] == (config, line_items):
+            return False
+        packed = (config, line_items, _now())
+        if self.backing is not None:
+            self.backing._save_packed(draft_id, *packed)
+        self._remember(draft_id, packed)
+        return True
+
+    def delete(self, draft_id):
+        if self.backing is not None:
+            self.backing.delete(draft_id)
+        with self._lock:
+            self._drafts.pop(draft_id, None)
+
+
+class SqliteDraftStore:
+    def __init__(self, path=DRAFTS_FILE, ttl_days=DRAFT_TTL_DAYS):
+        self.path = path
+        # One connection shared by the sessions' threads, like QuoteStore
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.executescript(SCHEMA)
+        if ttl_days is not None:
+            self.purge(ttl_days)
+
+    def close(self):
+        self._conn.close()
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM drafts").fetchone()[0]
+
+    def _get_packed(self, draft_id):
+        with self._lock:
+            return self._conn.execute(
+                "SELECT config, line_items, saved_at FROM drafts WHERE draft_id = ?", (draft_id,)
+            ).fetchone()
+
+    def _save_packed(self, draft_id, config, line_items, saved_at):
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT INTO drafts (draft_id, config, line_items, saved_at) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT (draft_id) DO UPDATE SET config = excluded.config, "
+                "line_items = excluded.line_items, saved_at = excluded.saved_at",
+                (draft_id, config, line_items, saved_at),
+            )
+
+    def get(self, draft_id):
+        """``{'config', 'line_items', 'saved_at'}`` of a draft, or None."""
+        row = self._get_packed(draft_id)
+        return None if row is None else _unpack(*row)
+
+    def save(self, draft_id, config, line_items=()):
+        self._save_packed(draft_id, *_pack(config, line_items), _now())
+
+    def delete(self, draft_id):
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM drafts WHERE draft_id = ?", (draft_id,))
+
+    def purge(self, ttl_days=DRAFT_TTL_DAYS):
+        """Drop drafts not saved for ``ttl_days``; returns how many."""
+        cutoff = (datetime.datetime.now() - datetime.timedelta(days=ttl_days)).isoformat(timespec='seconds')
+        with self._lock, self._conn:
+            return self._conn.execute("DELETE FROM drafts WHERE saved_at < ?", (cutoff,)).rowcount
+
+
+# Storage under the cache: kind -> factory, or None for the cache alone
+DRAFT_STORES = {'memory': None, 'sqlite': SqliteDraftStore}
+
+
+def open_draft_store(kind=None):
+    """A ``MemoryDraftStore`` over the storage named by ``kind`` or ``QUOTE_DRAFT_STORE`` (default ``sqlite``)."""
+    kind = (kind or os.environ.get('QUOTE_DRAFT_STORE') or 'sqlite').lower()
+    if kind not in DRAFT_STORES:
+        raise ValueError(f"unknown draft store {kind!r}; expected one of {', '.join(DRAFT_STORES)}")
+    backing = DRAFT_STORES[kind]
+    return MemoryDraftStore(backing and backing())
@@ -0,0 +1,234 @@
+"""Cheapest / most expensive configurations across the whole option space.
+
+The price of a quote is a sum of price items, and each item only reads a
+few fields (``pricing.PRICE_ITEM_INPUTS``). Fields are grouped into
+independent components: two fields share a component when one price item
+or one compatibility rule reads both. Each component is small (the axle
+counts with the chassis model and lift position, the tire size with the
+tire types and rims, the light type with the marker count ...), so every
+valid combination of its fields is priced once per catalog and kept
+sorted.
+
+A query fixes some fields, filters each component's table and combines
+the per-component lists with a best-first search over index tuples. The
+cheapest combination of sorted lists is their first entries; from any
+tuple the next candidates only advance one index, so a heap ordered by
+total yields the exact top N without enumerating the product.
+"""
+import functools
+import heapq
+import itertools
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from catalog import DEFAULT_CATALOG
+from pricing import DEFAULT_CONFIG, OPTION_GROUPS, PRICE_ITEM_INPUTS, PRICE_ITEMS, price_item
+from quote_fields import NUMBER_RANGES, OPTIONS
+
+# A component bigger than this would mean the rules tie too many fields together
+MAX_COMBINATIONS = 500_000
+
+
+def _domain(field, catalog, rules):
+    if field in OPTION_GROUPS:
+        values = list(catalog.options(OPTION_GROUPS[field]))
+    elif field in OPTIONS:
+        values = list(OPTIONS[field])
+    elif field in NUMBER_RANGES and NUMBER_RANGES[field][1] is not None:
+        low, high = NUMBER_RANGES[field]
+        values = list(range(int(low), int(high) + 1))
+    else:
+        # Free-form inputs (the TBD tire carrier price) stay at their default
+        # and are left out of the subtotals
+        values = []
+    if not values:
+        default = DEFAULT_CONFIG.get(field, rules.defaults.get(field))
+        values = [default]
+    return values
+
+
+def _components(rules):
+    # Union-find over the fields read together by a price item or a rule
+    parent = {}
+
+    def find(field):
+        parent.setdefault(field, field)
+        while parent[field] != field:
+            parent[field] = parent[parent[field]]
+            field = parent[field]
+        return field
+
+    def union(fields):
+        fields = list(fields)
+        for field in fields:
+            find(field)
+        for other in fields[1:]:
+            parent[find(other)] = find(fields[0])
+
+    for inputs in PRICE_ITEM_INPUTS.values():
+        union(inputs)
+    for group in rules.field_groups():
+        union(group)
+
+    components = {}
+    for field in parent:
+        components.setdefault(find(field), []).append(field)
+    return list(components.values())
+
+
+class Component:
+    """Every valid combination of a few linked fields, sorted by price."""
+
+    def __init__(self, fields, catalog, rules):
+        self.fields = fields
+        self.items = [item for item in PRICE_ITEMS if set(PRICE_ITEM_INPUTS[item]) <= set(fields)]
+        domains = [_domain(field, catalog, rules) for field in fields]
+        self.domains = dict(zip(fields, domains))
+        size = int(np.prod([len(domain) for domain in domains]))
+        if size > MAX_COMBINATIONS:
+            raise ValueError(f"{size} combinations of {', '.join(fields)}; too many to precompute")
+
+        rows, prices, changes = [], [], []
+        base = dict(rules.defaults)
+        base.update(DEFAULT_CONFIG)
+        for values in itertools.product(*domains):
+            cfg = dict(base)
+            cfg.update(zip(fields, values))
+            if rules.violations(cfg, fields):
+                continue
+            rows.append(values)
+            prices.append(sum(price_item(item, cfg, catalog) for item in self.items))
+            changes.append(sum(value != base.get(field) for field, value in zip(fields, values)))
+
+        # By price, then closest to the form defaults: that row represents its price
+        order = np.lexsort((changes, prices))
+        self.prices = np.asarray(prices, dtype=float)[order]
+        self.table = pd.DataFrame(rows, columns=fields, dtype=object).iloc[order].reset_index(drop=True)
+
+    @property
+    def min_price(self):
+        return float(self.prices[0]) if len(self.prices) else None
+
+    @property
+    def max_price(self):
+        return float(self.prices[-1]) if len(self.prices) else None
+
+    def select(self, constraints):
+        """Positions (ascending price) of the rows matching ``constraints``, one per price.
+
+        Options that don't change the price would otherwise fill the top N
+        with copies of one total; the row changing the fewest defaults stays.
+        """
+        mask = np.ones(len(self.table), dtype=bool)
+        for field in self.fields:
+            if field in constraints:
+                mask &= self.table[field].isin(constraints[field]).to_numpy()
+        positions = np.flatnonzero(mask)
+        _, first = np.unique(self.prices[positions], return_index=True)
+        return positions[first]
+
+
+def _normalize_constraints(constraints):
+    normalized = {}
+    for field, value in (constraints or {}).items():
+        values = value if isinstance(value, (list, tuple, set, frozenset)) else [value]
+        normalized[field] = list(values)
+    return normalized
+
+
+class PriceExplorer:
+    def __init__(self, catalog=None):
+        self.catalog = catalog or DEFAULT_CATALOG
+        rules = self.catalog.rules
+        self.components = [Component(fields, self.catalog, rules) for fields in _components(rules)]
+        self.fields = [field for component in self.components for field in component.fields]
+        self.domains = {field: values for component in self.components for field, values in component.domains.items()}
+
+    def choices(self):
+        """Fields the search can change, i.e. with more than one value to pick from."""
+        return [field for field in self.fields if len(self.domains[field]) > 1]
+
+    def group_ranges(self):
+        """Per component: its fields and min/max contribution to the subtotal."""
+        return [{'fields': component.fields, 'min': component.min_price, 'max': component.max_price,
+                 'combinations': len(component.prices)} for component in self.components]
+
+    def search(self, constraints=None, n=10, most_expensive=False):
+        """The ``n`` cheapest (or most expensive) configurations meeting ``constraints``.
+
+        ``constraints`` maps fields to a value or a list of allowed values.
+        Returns ``[(subtotal, config)]`` best first, each a different choice
+        of priced options; ``config`` covers every priced and rule-bound
+        field. Empty when nothing satisfies them.
+        """
+        constraints = _normalize_constraints(constraints)
+        lists = []
+        for component in self.components:
+            positions = component.select(constraints)
+            if len(positions) == 0:
+                return []
+            if most_expensive:
+                positions = positions[::-1]
+            lists.append((component, positions, component.prices[positions]))
+
+        sign = -1.0 if most_expensive else 1.0
+        start = (0,) * len(lists)
+        heap = [(sign * sum(prices[0] for _, _, prices in lists), start, 0)]
+        results = []
+        while heap and len(results) < n:
+            key, indexes, last = heapq.heappop(heap)
+            results.append((float(sign * key), self._config(lists, indexes)))
+            # Advancing only positions >= the last advanced one reaches each tuple once
+            for k in range(last, len(lists)):
+                prices = lists[k][2]
+                if indexes[k] + 1 < len(prices):
+                    step = prices[indexes[k] + 1] - prices[indexes[k]]
+                    advanced = indexes[:k] + (indexes[k] + 1,) + indexes[k + 1:]
+                    heapq.heappush(heap, (key + sign * step, advanced, k))
+        return results
+
+    def price_range(self, constraints=None):
+        """``(min, max)`` subtotal meeting ``constraints``, or None."""
+        cheapest = self.search(constraints, 1)
+        dearest = self.search(constraints, 1, most_expensive=True)
+        if not cheapest:
+            return None
+        return cheapest[0][0], dearest[0][0]
+
+    @staticmethod
+    def _config(lists, indexes):
+        config = {}
+        for (component, positions, _), index in zip(lists, indexes):
+            row = component.table.iloc[positions[index]]
+            config.update(zip(component.fields, row.tolist()))
+        return config
+
+
+@functools.lru_cache(maxsize=4)
+def get_explorer(catalog):
+    """One precomputed explorer per catalog; a reloaded catalog builds a new one."""
+    return PriceExplorer(catalog)
+
+
+if __name__ == '__main__':
+    import os
+
+    from catalog import EXCEL_FILE, load_catalog
+
+    catalog = load_catalog(EXCEL_FILE) if os.path.exists(EXCEL_FILE) else DEFAULT_CATALOG
+    start = time.perf_counter()
+    explorer = PriceExplorer(catalog)
+    built = time.perf_counter() - start
+    defaults = dict(catalog.rules.defaults, **DEFAULT_CONFIG)
+    constraints = dict(arg.split('=', 1) for arg in sys.argv[1:])
+    start = time.perf_counter()
+    results = explorer.search(constraints, 10)
+    searched = time.perf_counter() - start
+    for subtotal, config in results:
+        print(f"${subtotal:>12,.2f}  " + ', '.join(f"{field}={config[field]}" for field in explorer.choices()
+                                                 if config[field] != defaults.get(field)))
+    print(f"{len(explorer.components)} option groups precomputed in {built * 1000:.1f} ms; "
+          f"top {len(results)} found in {searched * 1000:.1f} ms")
@@ -0,0 +1,187 @@
+"""Opt-in timings and counters for the app's hot paths.
+
+Off unless ``QUOTE_METRICS=1`` is set in the environment. When off,
+``section`` hands back one shared no-op context manager, ``timed`` returns
+the function undecorated and ``count``/``gauge`` return after one flag
+check, so the instrumented code runs as before.
+
+When on, every section's call count, total and maximum time, the counters
+(cache hits and misses) and the gauges (session-state size) are aggregated
+process-wide across all sessions. ``METRICS.prometheus()`` renders them in
+the Prometheus text exposition format; set ``QUOTE_METRICS_FILE`` to have
+the app write that file (e.g. for node_exporter's textfile collector).
+The sidebar panel is shown only when the page URL carries
+``?admin=<QUOTE_ADMIN_KEY>``.
+"""
+import contextlib
+import functools
+import hmac
+import os
+import pickle
+import re
+import threading
+import time
+
+ENABLED = os.environ.get('QUOTE_METRICS', '').lower() in ('1', 'true', 'yes')
+METRICS_FILE = os.environ.get('QUOTE_METRICS_FILE')
+ADMIN_KEY = os.environ.get('QUOTE_ADMIN_KEY')
+# Seconds between rewrites of METRICS_FILE
+WRITE_INTERVAL = 10.0
+PREFIX = 'quote_app'
+
+_NOOP = contextlib.nullcontext()
+
+
+class Metrics:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.timings = {}  # name -> [count, total seconds, max seconds]
+        self.counters = {}
+        self.gauges = {}  # name -> [last, max]
+        self._written = 0.0
+
+    def observe(self, name, seconds):
+        with self._lock:
+            stat = self.timings.get(name)
+            if stat is None:
+                self.timings[name] = [1, seconds, seconds]
+            else:
+                stat[0] += 1
+                stat[1] += seconds
+                if seconds > stat[2]:
+                    stat[2] = seconds
+
+    def count(self, name, n=1):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + n
+
+    def gauge(self, name, value):
+        with self._lock:
+            last_max = self.gauges.get(name)
+            self.gauges[name] = [value, value if last_max is None else max(value, last_max[1])]
+
+    def reset(self):
+        with self._lock:
+            self.timings.clear()
+            self.counters.clear()
+            self.gauges.clear()
+
+    def snapshot(self):
+        """Copies of the aggregates: timings as dicts in milliseconds."""
+        with self._lock:
+            timings = {
+                name: {'count': n, 'total_ms': total * 1000, 'mean_ms': total * 1000 / n, 'max_ms': peak * 1000}
+                for name, (n, total, peak) in self.timings.items()
+            }
+            return {
+                'timings': timings,
+                'counters': dict(self.counters),
+                'gauges': {name: {'last': last, 'max': peak} for name, (last, peak) in self.gauges.items()},
+            }
+
+    def prometheus(self, prefix=PREFIX):
+        snapshot = self.snapshot()
+        lines = [
+            f"# HELP {prefix}_section_seconds Time spent in each instrumented section",
+            f"# TYPE {prefix}_section_seconds summary",
+        ]
+        for name, stat in sorted(snapshot['timings'].items()):
+            label = f'{{section="{name}"}}'
+            lines.append(f"{prefix}_section_seconds_count{label} {stat['count']}")
+            lines.append(f"{prefix}_section_seconds_sum{label} {stat['total_ms'] / 1000:.6f}")
+        lines.append(f"# TYPE {prefix}_section_max_seconds gauge")
+        for name, stat in sorted(snapshot['timings'].items()):
+            lines.append(f'{prefix}_section_max_seconds{{section="{name}"}} {stat["max_ms"] / 1000:.6f}')
+        for name, value in sorted(snapshot['counters'].items()):
+            metric = f"{prefix}_{_metric_name(name)}_total"
+            lines += [f"# TYPE {metric} counter", f"{metric} {value}"]
+        for name, gauge in sorted(snapshot['gauges'].items()):
+            metric = f"{prefix}_{_metric_name(name)}"
+            lines += [f"# TYPE {metric} gauge", f"{metric} {gauge['last']}",
+                      f"# TYPE {metric}_max gauge", f"{metric}_max {gauge['max']}"]
+        return '\n'.join(lines) + '\n'
+
+    def write(self, path, force=False):
+        """Rewrite ``path`` with the Prometheus text, at most every WRITE_INTERVAL seconds."""
+        now = time.monotonic()
+        if not force and now - self._written < WRITE_INTERVAL:
+            return False
+        self._written = now
+        tmp = f"{path}.tmp{os.getpid()}.{threading.get_ident()}"
+        with open(tmp, 'w') as f:
+            f.write(self.prometheus())
+        os.replace(tmp, path)
+        return True
+
+
+def _metric_name(name):
+    return re.sub(r'[^a-zA-Z0-9_]', '_', name)
+
+
+METRICS = Metrics()
+
+
+class _Timer:
+    __slots__ = ('name', 'start')
+
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        # Recorded even when the section ends in st.rerun() or an error
+        METRICS.observe(self.name, time.perf_counter() - self.start)
+        return False
+
+
+def section(name):
+    """``with section('summary.totals'):`` times the block when metrics are on."""
+    return _Timer(name) if ENABLED else _NOOP
+
+
+def timed(name):
+    """Decorator form of ``section``; a no-op when metrics are off."""
+    def decorate(fn):
+        if not ENABLED:
+            return fn
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with _Timer(name):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def count(name, n=1):
+    if ENABLED:
+        METRICS.count(name, n)
+
+
+def gauge(name, value):
+    if ENABLED:
+        METRICS.gauge(name, value)
+
+
+def state_size(state):
+    """Approximate bytes held by a session state: the pickled size of each value."""
+    total = 0
+    for value in state.values():
+        try:
+            total += len(pickle.dumps(value, pickle.HIGHEST_PROTOCOL))
+        except Exception:
+            # Widgets' callables and the like; counted as nothing
+            pass
+    return total
+
+
+def is_admin(query_params):
+    key = query_params.get('admin')
+    if not ADMIN_KEY or not isinstance(key, str):
+        return False
+    # Constant time, so response times don't tell how much of a guess matched;
+    # as bytes, since compare_digest takes only ASCII str
+    return hmac.compare_digest(key.encode(), ADMIN_KEY.encode())
@@ -0,0 +1,110 @@
+"""Money as integer cents.
+
+Catalog prices and the Summary tab's additions arrive as dollar floats;
+totals are computed on whole cents so the screen, the exports and the ERP
+add up the same way. The rounding policy:
+
+* every amount (price item, addition, custom line item) is rounded to the
+  cent once, half away from zero, exactly as
+  ``Decimal(repr(amount)).quantize(Decimal('0.01'), ROUND_HALF_UP)`` rounds
+  it: 1.005 is $1.01 and -1.005 is -$1.01, while 1.00499999 is $1.00;
+* the subtotal is the exact sum of the rounded items, so the itemized lines
+  add up to it;
+* a discount percent counts to the hundredth of a percent, rounded the
+  same way (12.125% is 12.13%), and the
+  discount is that share of the subtotal rounded half away from zero;
+* the discounted price and the final total are exact sums of cents.
+
+``from_cents`` gives dollars back as ``cents / 100``, the float nearest the
+exact amount: it converts to the same cents again and prints to two
+decimals exactly.
+
+``cents_array`` and ``percent_of_array`` are the int64 versions of
+``to_cents`` and ``percent_of`` for the batch path. They do the same float
+operations element by element, so a batch agrees with single quotes to the
+cent. ``tests/test_money.py`` checks both against ``decimal``.
+"""
+import numpy as np
+
+# Hundredths of a percent in a whole
+_BASIS = 10_000
+
+
+# How far from a half cent the float product can be trusted; its error is
+# around 1e-14 of the amount
+_NEAR_HALF = 0.49
+
+
+def to_cents(amount):
+    """Whole cents of a dollar amount, rounded half away from zero."""
+    product = amount * 100
+    cents = round(product)
+    if abs(product - cents) < _NEAR_HALF:
+        return int(cents)
+    return _half_cents(float(amount))
+
+
+def _half_cents(amount):
+    # 1.005 * 100 is 100.49999999999999, so near a half cent the product only
+    # picks the neighbourhood. The float nearest a half cent, (2 * cents +- 1)
+    # / 200, is the float whose repr is that half cent: at or above it rounds up.
+    if amount < 0:
+        return -_half_cents(-amount)
+    cents = round(amount * 100)
+    if amount < (2 * cents - 1) / 200:
+        return cents - 1
+    if amount >= (2 * cents + 1) / 200:
+        return cents + 1
+    return cents
+
+
+def from_cents(cents):
+    return cents / 100
+
+
+def to_the_cent(amount):
+    """A dollar amount rounded to the cent, in dollars."""
+    return to_cents(amount) / 100
+
+
+def total_cents(amounts):
+    """Sum of the amounts' ``to_cents``."""
+    # to_cents inlined: this runs over every price item of every quote
+    total = 0
+    for amount in amounts:
+        product = amount * 100
+        cents = round(product)
+        total += int(cents) if abs(product - cents) < _NEAR_HALF else _half_cents(float(amount))
+    return total
+
+
+def money_sum(amounts):
+    """Dollar total of amounts each rounded to the cent, as ``from_cents`` gives it."""
+    return from_cents(total_cents(amounts))
+
+
+def _divide(numerator, denominator):
+    # Integer division rounded half away from zero
+    quotient = (abs(numerator) + denominator // 2) // denominator
+    return -quotient if numerator < 0 else quotient
+
+
+def percent_of(cents, percent):
+    """``percent`` (to the hundredth) of an amount in cents, in whole cents."""
+    return _divide(cents * to_cents(percent), _BASIS)
+
+
+def cents_array(amounts):
+    """``to_cents`` of every dollar amount, as int64."""
+    amounts = np.asarray(amounts, dtype=float)
+    magnitudes = np.abs(amounts)
+    cents = np.rint(magnitudes * 100)
+    cents -= magnitudes < (2 * cents - 1) / 200
+    cents += magnitudes >= (2 * cents + 1) / 200
+    return (np.sign(amounts) * cents).astype(np.int64)
+
+
+def percent_of_array(cents, percents):
+    """``percent_of`` element by element over int64 cents."""
+    products = np.asarray(cents, dtype=np.int64) * cents_array(percents)
+    return np.sign(products) * ((np.abs(products) + _BASIS // 2) // _BASIS)
@@ -0,0 +1,89 @@
+"""Named preset configurations: the standard builds most quotes start from.
+
+A preset names the form values of one build; applying it writes them all
+into the form at once. Presets can also be workbook rows, one per field
+(the sheet format is in ``catalog``). ``FIELD`` is a form field name
+(``trailer_length``) or its label ("Trailer Length"), and a workbook preset
+replaces the built-in preset of the same name. ``compile_presets`` runs
+once per catalog load and the presets travel with the catalog as
+``catalog.presets``; ``pricing.preset_prices`` prices them once per
+catalog.
+"""
+import pandas as pd
+
+from quote_fields import FIELD_LABELS, FIELDS, NUMBER_RANGES
+
+_FIELD_NAMES = {**{label.strip().lower(): field for field, label in FIELD_LABELS.items()},
+                **{field.lower(): field for field in FIELDS}}
+
+
+def _preset(name, **values):
+    return [(name, field, value) for field, value in values.items()]
+
+
+# (preset, field, value)
+DEFAULT_PRESET_ROWS = tuple(
+    _preset("End Dump 4x 46' Polished Aluminum",
+            model="End Dump 4x", chassis_model="4 Axle", trailer_length="46'", wall_height='62"',
+            chassis_type="ALUMINUM (Polished)", qty_ride=2, qty_lift=1, qty_steer=1, tire_size="22.5",
+            ride_tire_type="DUAL TIRES", steer_tire_type="DUAL TIRES",
+            ride_rim_selection="HIGH POLISH x ALL RIMS", steer_rim_selection="HIGH POLISH x ALL RIMS")
+    + _preset("End Dump 3x 40' Steel",
+              model="End Dump 3x", chassis_model="3 Axle", trailer_length="40'", wall_height='60"',
+              chassis_type="STEEL", qty_ride=2, qty_lift=1, qty_steer=0, tire_size="22.5",
+              ride_tire_type="DUAL TIRES", ride_rim_selection="DURABRITE x ALL RIMS")
+    + _preset("End Dump 5x 48' Polished Aluminum",
+              model="End Dump 5x", chassis_model="5 Axle", trailer_length="48'", wall_height='66"',
+              chassis_type="ALUMINUM (Polished)", qty_ride=2, qty_lift=2, qty_steer=1, tire_size="22.5",
+              ride_tire_type="DUAL TIRES", steer_tire_type="DUAL TIRES",
+              ride_rim_selection="HIGH POLISH x ALL RIMS", steer_rim_selection="HIGH POLISH x ALL RIMS")
+)
+
+
+def _field(name):
+    return _FIELD_NAMES.get(str(name).strip().lower())
+
+
+def _value(field, value):
+    # Excel hands back 1.0 for a quantity of 1; number inputs of whole ranges take ints
+    if isinstance(value, str):
+        return value.strip()
+    if field in NUMBER_RANGES and isinstance(value, (int, float)):
+        whole = isinstance(NUMBER_RANGES[field][0], int) and float(value).is_integer()
+        return int(value) if whole else float(value)
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+    return value
+
+
+def presets_from_sheet(df):
+    """Extract preset rows from one workbook sheet, or [] if it has no preset columns."""
+    columns = {str(col).strip().upper(): col for col in df.columns}
+    if not {'PRESET', 'FIELD', 'VALUE'} <= set(columns):
+        return []
+
+    rows = []
+    for record in df.to_dict('records'):
+        name, field, value = (record[columns[column]] for column in ('PRESET', 'FIELD', 'VALUE'))
+        if any(not isinstance(cell, str) and pd.isna(cell) for cell in (name, field, value)):
+            continue
+        rows.append((str(name).strip(), field, value))
+    return rows
+
+
+def compile_presets(sheets=()):
+    """``{name: {field: value}}`` from the workbook sheets layered over the built-in presets.
+
+    Rows naming no form field are skipped.
+    """
+    workbook = [row for df in sheets for row in presets_from_sheet(df)]
+    replaced = {name for name, _, _ in workbook}
+    presets = {}
+    for name, field, value in [row for row in DEFAULT_PRESET_ROWS if row[0] not in replaced] + workbook:
+        field = _field(field)
+        if field is not None:
+            presets.setdefault(name, {})[field] = _value(field, value)
+    return presets
+
+
+DEFAULT_PRESETS = compile_presets()
@@ -0,0 +1,456 @@
+"""Headless pricing engine for trailer quotes.
+
+Everything here is plain Python/pandas so a configuration can be priced
+without running the Streamlit script. A configuration is a mapping of the
+field names used in app.py (``trailer_length``, ``wall_height``,
+``chassis_type``, ``qty_lift`` ...) to the selected values; missing fields
+fall back to the form defaults in ``DEFAULT_CONFIG``. Prices come from a
+``catalog.Catalog``; the built-in default catalog is used when none is given.
+
+Item prices are rounded to the cent and the totals are computed in integer
+cents, with the rounding policy in ``money``; both are returned in dollars.
+"""
+import functools
+
+import numpy as np
+import pandas as pd
+
+from catalog import ANY, DEFAULT_CATALOG
+from money import (cents_array, from_cents, money_sum, percent_of, percent_of_array, to_cents, to_the_cent,
+                   total_cents)
+from quote_fields import NUMBER_RANGES, OPTIONS
+
+# Additional marker lights are only charged above this many per side
+FREE_MARKER_LIGHTS = 5
+
+# Simple one-field lookups: price key -> (config field, catalog group)
+LOOKUP_ITEMS = {
+    'trailer_length': ('trailer_length', 'trailer_length'),
+    'wall_height': ('wall_height', 'wall_height'),
+    'board_height': ('board_height', 'board_height'),
+    'floor': ('floor', 'floor'),
+    'tow_motor': ('tow_motor', 'tow_motor'),
+    'rear_steps': ('rear_steps', 'rear_steps'),
+    'shovel_holder': ('shovel_holder', 'shovel_holder'),
+    'man_door': ('man_door', 'man_door'),
+    'bulkhead_steps': ('bulkhead_steps', 'bulkhead_steps'),
+    'tailgate_slope': ('tailgate_slope', 'tailgate_slope'),
+    'gate_operation': ('gate_operation', 'gate_operation'),
+    'coal_chute': ('coal_chute', 'coal_chute'),
+    'sock_adaptor': ('sock_adaptor', 'sock_adaptor'),
+    'chassis': ('chassis_type', 'chassis'),
+    'gooseneck': ('gooseneck', 'gooseneck'),
+    'ride_mudflap': ('ride_mudflap', 'ride_mudflap'),
+    'landing_gear': ('landing_gear', 'landing_gear'),
+    'brakes': ('brakes_type', 'brakes'),
+    'lift_axle': ('qty_lift', 'lift_axle'),
+    'steer_axle': ('qty_steer', 'steer_axle'),
+    'light_type': ('light_type', 'light_type'),
+}
+
+# Config field holding the selection behind each price item
+PRICE_ITEM_FIELDS = {key: field for key, (field, _) in LOOKUP_ITEMS.items()}
+PRICE_ITEM_FIELDS.update({
+    'tire_carrier': 'tire_carrier',
+    'ride_tires': 'ride_rim_selection',
+    'steer_tires': 'steer_rim_selection',
+    'additional_lights': 'additional_markers',
+})
+
+# Selectbox fields whose options are the rows of a catalog group
+OPTION_GROUPS = {field: group for field, group in LOOKUP_ITEMS.values() if field not in NUMBER_RANGES}
+OPTION_GROUPS.update({
+    'ride_rim_selection': 'ride_rims',
+    'steer_rim_selection': 'steer_rims',
+})
+
+# Config fields each price item depends on
+PRICE_ITEM_INPUTS = {key: (field,) for key, (field, _) in LOOKUP_ITEMS.items()}
+PRICE_ITEM_INPUTS.update({
+    'tire_carrier': ('tire_carrier', 'tire_carrier_price'),
+    'ride_tires': ('tire_size', 'ride_tire_type', 'ride_rim_selection'),
+    'steer_tires': ('tire_size', 'steer_tire_type', 'steer_rim_selection'),
+    'additional_lights': ('light_type', 'additional_markers'),
+})
+
+# Order of the itemized breakdown, same as the tabs in app.py
+PRICE_ITEMS = [
+    'trailer_length', 'wall_height', 'board_height', 'floor', 'tow_motor', 'rear_steps',
+    'shovel_holder', 'man_door', 'bulkhead_steps', 'tailgate_slope', 'gate_operation',
+    'coal_chute', 'sock_adaptor', 'chassis', 'gooseneck', 'ride_mudflap', 'tire_carrier',
+    'landing_gear', 'brakes', 'lift_axle', 'steer_axle', 'ride_tires', 'steer_tires',
+    'light_type', 'additional_lights',
+]
+
+# Form defaults for every field that affects the price
+DEFAULT_CONFIG = {
+    'trailer_length': "46'",
+    'wall_height': '62"',
+    'board_height': '8" Board',
+    'floor': '1/4" THICKNESS',
+    'tow_motor': "NO",
+    'rear_steps': "P/S IN AND OUT",
+    'shovel_holder': "YES -DRIVER SIDE @DOGHOUSE",
+    'man_door': "NONE",
+    'bulkhead_steps': "NONE",
+    'tailgate_slope': "STRAIGHT",
+    'gate_operation': "ELECTRIC OVER AIR BOOSTER",
+    'coal_chute': '3 DOORS 24"',
+    'sock_adaptor': "NONE",
+    'chassis_type': "ALUMINUM (Polished)",
+    'gooseneck': "NONE",
+    'ride_mudflap': "FRONT OF ALL AXLES",
+    'tire_carrier': "YES",
+    'tire_carrier_price': 0,
+    'landing_gear': "STEEL - SAF HOLLAND",
+    'brakes_type': "DRUM",
+    'qty_lift': 1,
+    'qty_steer': 1,
+    'tire_size': "22.5",
+    'ride_tire_type': "DUAL TIRES",
+    'steer_tire_type': "DUAL TIRES",
+    'ride_rim_selection': "HIGH POLISH x ALL RIMS",
+    'steer_rim_selection': "DURABRITE x ALL RIMS",
+    'light_type': "GROTE L.E.D. STANDARD - GROMMET MOUNT",
+    'additional_markers': 30,
+}
+
+# Summary tab defaults
+DEFAULT_DISCOUNT_PERCENT = 4.0
+DEFAULT_ALCOA_RIMS_ADD = 2000
+DEFAULT_GRAIN_SOCK_ADD = 500
+# What every pricing path (form, API, bulk import, repricing) takes for a missing input
+SUMMARY_DEFAULTS = {
+    'discount_percent': DEFAULT_DISCOUNT_PERCENT,
+    'alcoa_rims_add': DEFAULT_ALCOA_RIMS_ADD,
+    'grain_sock_add': DEFAULT_GRAIN_SOCK_ADD,
+}
+
+
+def price_item(item, cfg, catalog):
+    """Price of one item of the breakdown for a complete config (defaults applied), to the cent."""
+    lookup = LOOKUP_ITEMS.get(item)
+    if lookup is not None:
+        field, group = lookup
+        return catalog.price(group, cfg[field])
+
+    if item == 'tire_carrier':
+        return to_the_cent(cfg['tire_carrier_price']) if cfg['tire_carrier'] == "YES" else 0
+    if item == 'ride_tires':
+        return catalog.price('ride_rims', cfg['ride_rim_selection'],
+                             (str(cfg['tire_size']), cfg['ride_tire_type']))
+    if item == 'steer_tires':
+        return catalog.price('steer_rims', cfg['steer_rim_selection'],
+                             (str(cfg['tire_size']), cfg['steer_tire_type']))
+    if item == 'additional_lights':
+        markers = cfg['additional_markers']
+        rate = catalog.price('marker_lights', cfg['light_type'])
+        return to_the_cent(markers * rate) if markers > FREE_MARKER_LIGHTS else 0
+    raise KeyError(item)
+
+
+def calculate_prices(config, catalog=None):
+    """Return the itemized ``prices`` dict for one configuration."""
+    if catalog is None:
+        catalog = DEFAULT_CATALOG
+    cfg = dict(DEFAULT_CONFIG)
+    cfg.update(config)
+    return {item: price_item(item, cfg, catalog) for item in PRICE_ITEMS}
+
+
+def _priced(cfg, catalog):
+    prices = {item: price_item(item, cfg, catalog) for item in PRICE_ITEMS}
+    inputs = {item: tuple([cfg[field] for field in PRICE_ITEM_INPUTS[item]]) for item in PRICE_ITEMS}
+    return prices, inputs
+
+
+@functools.lru_cache(maxsize=4)
+def default_prices(catalog):
+    """``(prices, inputs)`` of ``DEFAULT_CONFIG``, priced once per catalog.
+
+    ``inputs`` maps each item to the values of its ``PRICE_ITEM_INPUTS``,
+    as ``IncrementalPricer`` memoizes them.
+    """
+    return _priced(dict(DEFAULT_CONFIG), catalog)
+
+
+def _offered(field, value, catalog):
+    if field in OPTION_GROUPS:
+        return value in catalog.options(OPTION_GROUPS[field])
+    if field in OPTIONS:
+        return value in OPTIONS[field]
+    if field in NUMBER_RANGES:
+        low, high = NUMBER_RANGES[field]
+        return isinstance(value, (int, float)) and value >= low and (high is None or value <= high)
+    return True
+
+
+def preset_config(name, catalog=None):
+    """The whole build of one of ``catalog.presets``, as the form takes it.
+
+    The preset's values over the defaults of every priced field and every
+    field the rules read; values the catalog doesn't offer stay at the default.
+    """
+    if catalog is None:
+        catalog = DEFAULT_CATALOG
+    config = dict(catalog.rules.defaults, **DEFAULT_CONFIG)
+    config.update((field, value) for field, value in catalog.presets[name].items()
+                  if _offered(field, value, catalog))
+    return config
+
+
+@functools.lru_cache(maxsize=4)
+def preset_prices(catalog):
+    """``{name: (prices, inputs)}`` of the catalog's presets, priced once per catalog like ``default_prices``."""
+    return {name: _priced(preset_config(name, catalog), catalog) for name in catalog.presets}
+
+
+class IncrementalPricer:
+    """Reprices only the items whose inputs changed since the last call.
+
+    Each price item is memoized against the values of its fields in
+    ``PRICE_ITEM_INPUTS``; a different catalog starts over from its
+    ``default_prices``. Keep one per session (e.g. in ``st.session_state``).
+    ``recomputed`` is the number of items priced by the last ``update``.
+    """
+
+    def __init__(self):
+        self.catalog = None
+        self.inputs = {}
+        self.prices = {}
+        self.recomputed = 0
+
+    def __getstate__(self):
+        # The catalog is shared and large; an unpickled pricer reprices once on its next update
+        state = self.__dict__.copy()
+        state['catalog'] = None
+        state['inputs'] = {}
+        return state
+
+    def start_from(self, catalog, prices, inputs):
+        """Take over prices already worked out (``default_prices``, ``preset_prices``)."""
+        self.catalog = catalog
+        self.prices = dict(prices)
+        self.inputs = dict(inputs)
+
+    def _inputs(self, item, cfg):
+        return tuple([cfg[field] for field in PRICE_ITEM_INPUTS[item]])
+
+    def is_stale(self, config, catalog=None):
+        """Whether ``update`` would reprice anything, without pricing."""
+        if (catalog or DEFAULT_CATALOG) is not self.catalog:
+            return True
+        cfg = dict(DEFAULT_CONFIG)
+        cfg.update(config)
+        return any(self.inputs.get(item) != self._inputs(item, cfg) for item in PRICE_ITEMS)
+
+    def update(self, config, catalog=None):
+        if catalog is None:
+            catalog = DEFAULT_CATALOG
+        if catalog is not self.catalog:
+            # Start from the catalog's default-form prices: a new session only
+            # prices the items its first config changes
+            self.start_from(catalog, *default_prices(catalog))
+        cfg = dict(DEFAULT_CONFIG)
+        cfg.update(config)
+
+        recomputed = 0
+        for item in PRICE_ITEMS:
+            inputs = self._inputs(item, cfg)
+            if self.inputs.get(item) != inputs:
+                self.prices[item] = price_item(item, cfg, catalog)
+                self.inputs[item] = inputs
+                recomputed += 1
+        self.recomputed = recomputed
+        return {item: self.prices[item] for item in PRICE_ITEMS}
+
+
+def line_items_total(line_items):
+    """Dollar total of custom line items, each rounded to the cent."""
+    return money_sum([item['price'] for item in line_items])
+
+
+def _additional_cents(alcoa_rims_add, grain_sock_add, line_items):
+    return to_cents(alcoa_rims_add) + to_cents(grain_sock_add) + total_cents([item['price'] for item in line_items])
+
+
+def totals_cents(subtotal, discount_percent, additional_cents):
+    """The Summary tab's totals in integer cents, from the subtotal and additions in cents."""
+    discount_amount = percent_of(subtotal, discount_percent)
+    discounted_price = subtotal - discount_amount
+    return {
+        'subtotal': subtotal,
+        'discount_amount': discount_amount,
+        'discounted_price': discounted_price,
+        'additional_items_total': additional_cents,
+        'final_total': discounted_price + additional_cents,
+    }
+
+
+def calculate_totals(prices, discount_percent=DEFAULT_DISCOUNT_PERCENT,
+                     alcoa_rims_add=0, grain_sock_add=0, line_items=()):
+    """Discount and total math from the Summary tab, in dollars (computed in cents)."""
+    cents = totals_cents(total_cents(prices.values()), discount_percent,
+                         _additional_cents(alcoa_rims_add, grain_sock_add, line_items))
+    return {key: from_cents(value) for key, value in cents.items()}
+
+
+def _selection_text(value):
+    if isinstance(value, bool):
+        return "YES" if value else "NO"
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    return "" if value is None else str(value)
+
+
+def selections(prices, config):
+    """``(item, chosen option)`` of the non-zero price items, as the table shows them."""
+    fields = [(item, PRICE_ITEM_FIELDS[item]) for item, price in prices.items() if price > 0]
+    return tuple((item, _selection_text(config.get(field, DEFAULT_CONFIG.get(field)))) for item, field in fields)
+
+
+def _itemized(prices, chosen):
+    rows = [{"Item": item.replace('_', ' ').title(), "Option": option, "Price": f"${prices[item]:,.2f}"}
+            for item, option in chosen]
+    return pd.DataFrame(rows, columns=["Item", "Option", "Price"])
+
+
+def itemized_frame(prices, config=None):
+    """The Summary tab's Item/Price table: the non-zero items, prices formatted.
+
+    With ``config``, an Option column shows what was chosen for each item.
+    """
+    if config is not None:
+        return _itemized(prices, selections(prices, config))
+    rows = [{"Item": item.replace('_', ' ').title(), "Price": f"${price:,.2f}"}
+            for item, price in prices.items() if price > 0]
+    return pd.DataFrame(rows, columns=["Item", "Price"])
+
+
+@functools.lru_cache(maxsize=256)
+def _itemized_table(items, chosen):
+    return _itemized(dict(items), chosen)
+
+
+def itemized_table(prices, config):
+    """``itemized_frame(prices, config)``, memoized on the prices and the chosen options.
+
+    A rerun that changes neither gets the same DataFrame back; don't modify it.
+    """
+    return _itemized_table(tuple(prices.items()), selections(prices, config))
+
+
+@functools.lru_cache(maxsize=256, typed=True)
+def _summary_metrics(items, discount_percent, additional_cents):
+    # The additions only enter the totals as one sum
+    cents = totals_cents(total_cents([price for _, price in items]), discount_percent, additional_cents)
+    totals = {key: from_cents(value) for key, value in cents.items()}
+    metrics = (
+        ("Base Price", f"${totals['subtotal']:,.2f}"),
+        (f"Discount ({discount_percent}%)", f"-${totals['discount_amount']:,.2f}"),
+        ("Discounted Price", f"${totals['discounted_price']:,.2f}"),
+        ("Additional Items", f"${totals['additional_items_total']:,.2f}"),
+        ("**TOTAL PRICE**", f"**${totals['final_total']:,.2f}**"),
+    )
+    return totals, metrics
+
+
+def summary_metrics(prices, discount_percent=DEFAULT_DISCOUNT_PERCENT, alcoa_rims_add=0,
+                    grain_sock_add=0, line_items=()):
+    """``(totals, [(label, value)])`` of the Summary tab's Final Pricing metrics.
+
+    Memoized on the prices, the discount and the additional items total;
+    the totals dict is shared, so copy it before modifying.
+    """
+    additional_cents = _additional_cents(alcoa_rims_add, grain_sock_add, line_items)
+    return _summary_metrics(tuple(prices.items()), discount_percent, additional_cents)
+
+
+def price_quote(config, discount_percent=DEFAULT_DISCOUNT_PERCENT, alcoa_rims_add=DEFAULT_ALCOA_RIMS_ADD,
+                grain_sock_add=DEFAULT_GRAIN_SOCK_ADD, line_items=(), catalog=None):
+    """Price one configuration, returning ``(prices, totals)``."""
+    prices = calculate_prices(config, catalog)
+    totals = calculate_totals(prices, discount_percent, alcoa_rims_add, grain_sock_add, line_items)
+    return prices, totals
+
+
+def _column(df, field):
+    # Missing columns and blank cells both take the form default
+    if field in df.columns:
+        return df[field].where(df[field].notna(), DEFAULT_CONFIG[field])
+    return pd.Series(DEFAULT_CONFIG[field], index=df.index)
+
+
+def _lookup(values, table, default=0):
+    return values.map(table).fillna(default).to_numpy(dtype=float)
+
+
+def _rim_prices(catalog, group, selection, tire_size, tire_type):
+    # One vectorized lookup per distinct (tire size, tire type) condition
+    result = np.empty(len(selection))
+    conditions = pd.DataFrame({'size': tire_size.to_numpy(), 'type': tire_type.to_numpy()})
+    for (size, kind), positions in conditions.groupby(['size', 'type']).indices.items():
+        cond = (size, kind)
+        result[positions] = _lookup(selection.iloc[positions], catalog.table(group, cond),
+                                    catalog.price(group, ANY, cond))
+    return result
+
+
+def price_frame(df, catalog=None):
+    """Vectorized batch mode: price every row of a DataFrame of configurations.
+
+    Rows use the same field names as ``calculate_prices``; missing columns and
+    blank cells take the form defaults. The Summary tab inputs can be given per row as
+    ``discount_percent``, ``alcoa_rims_add``, ``grain_sock_add`` and
+    ``line_items_total`` columns, defaulting to ``SUMMARY_DEFAULTS`` (and
+    no line items) like the form; ``line_items_total`` is rounded as one
+    amount, so give it as ``line_items_total(line_items)`` to match
+    ``calculate_totals``. Returns a new DataFrame with one column per
+    price item plus the totals, in dollars, aligned with ``df.index``; the
+    totals are computed on int64 cents like the single-quote path.
+    """
+    if catalog is None:
+        catalog = DEFAULT_CATALOG
+    out = pd.DataFrame(index=df.index)
+
+    for key, (field, group) in LOOKUP_ITEMS.items():
+        out[key] = _lookup(_column(df, field), catalog.table(group), catalog.price(group, ANY))
+
+    out['tire_carrier'] = np.where(
+        _column(df, 'tire_carrier') == "YES",
+        pd.to_numeric(_column(df, 'tire_carrier_price'), errors='coerce').fillna(0).to_numpy(dtype=float),
+        0.0,
+    )
+
+    tire_size = _column(df, 'tire_size').astype(str)
+    out['ride_tires'] = _rim_prices(catalog, 'ride_rims', _column(df, 'ride_rim_selection'),
+                                    tire_size, _column(df, 'ride_tire_type'))
+    out['steer_tires'] = _rim_prices(catalog, 'steer_rims', _column(df, 'steer_rim_selection'),
+                                     tire_size, _column(df, 'steer_tire_type'))
+
+    markers = pd.to_numeric(_column(df, 'additional_markers'), errors='coerce').fillna(0).to_numpy(dtype=float)
+    rate = _lookup(_column(df, 'light_type'), catalog.table('marker_lights'), catalog.price('marker_lights', ANY))
+    out['additional_lights'] = np.where(markers > FREE_MARKER_LIGHTS, markers * rate, 0.0)
+
+    price_cents = cents_array(out[PRICE_ITEMS].to_numpy())
+    out = pd.DataFrame(from_cents(price_cents), index=df.index, columns=PRICE_ITEMS)
+
+    def summary_input(name, default):
+        if name in df.columns:
+            return pd.to_numeric(df[name], errors='coerce').fillna(default).to_numpy(dtype=float)
+        return np.full(len(df), float(default))
+
+    discount_percent = summary_input('discount_percent', SUMMARY_DEFAULTS['discount_percent'])
+    additional = (cents_array(summary_input('alcoa_rims_add', SUMMARY_DEFAULTS['alcoa_rims_add']))
+                  + cents_array(summary_input('grain_sock_add', SUMMARY_DEFAULTS['grain_sock_add']))
+                  + cents_array(summary_input('line_items_total', 0)))
+
+    subtotal = price_cents.sum(axis=1)
+    discount_amount = percent_of_array(subtotal, discount_percent)
+    discounted_price = subtotal - discount_amount
+    out['subtotal'] = from_cents(subtotal)
+    out['discount_amount'] = from_cents(discount_amount)
+    out['discounted_price'] = from_cents(discounted_price)
+    out['additional_items_total'] = from_cents(additional)
+    out['final_total'] = from_cents(discounted_price + additional)
+    return out
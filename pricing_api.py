@@ -0,0 +1,357 @@
+"""Headless HTTP/JSON pricing API for the ERP and the dealer portal.
+
+Prices a configuration exactly as the Summary tab does, with the same
+pricing engine and the same catalog (reloaded when the workbook changes).
+Served by a small asyncio HTTP/1.1 server from the standard library, with
+keep-alive, so it runs anywhere the app does::
+
+    python pricing_api.py [--host 127.0.0.1] [--port 8502]
+
+Endpoints:
+
+* ``GET /health``: status and the catalog version/digest being priced with.
+* ``POST /price``: one quote, ``{"config": {...}, "line_items": [...]}``.
+  ``config`` uses the form's field keys (``quote_fields.FIELDS``); missing
+  fields take the form defaults, including the sidebar discount
+  (``discount_percent``) and the Summary tab's ``alcoa_rims_add`` and
+  ``grain_sock_add``, which may also be given next to ``config``.
+  ``line_items`` are ``{"name", "price"}`` custom items, priced 0 or
+  more. Returns
+  ``{"prices": {item: price}, "totals": {...}, "catalog_version": n}``;
+  a config failing the option lists, the number ranges (whole numbers
+  where the form takes them, never NaN or infinite) or the compatibility
+  rules gets 422 and ``{"errors": [...]}``, checked as ``quote_import``
+  checks a row, so the API rejects what a bulk import marks INVALID.
+* ``POST /price/batch``: ``{"quotes": [quote, ...]}`` (up to
+  ``MAX_BATCH``), answered with ``{"results": [...]}`` in the same order,
+  each a /price response body. Large sets of cache misses are priced
+  together by ``pricing.price_frame``.
+
+Results are cached per catalog on a hash of the priced fields and the
+additions (``CACHE_SIZE`` entries, least recently used dropped), so the
+customer name or notes don't defeat the cache. ``benchmark.py --api``
+measures requests/second under concurrency.
+"""
+import argparse
+import asyncio
+import http
+import json
+import logging
+import math
+import operator
+import threading
+from collections import OrderedDict
+
+from catalog_watcher import CatalogWatcher
+from instrumentation import count, section
+from money import money_sum
+from pricing import PRICE_ITEMS, SUMMARY_DEFAULTS, price_frame, price_quote
+from quote_config import FIELD_INDEX, QuoteConfig
+from quote_import import IMPORT_RANGES, allowed_options, range_text
+from reprice import PRICED_FIELDS, TOTAL_COLUMNS
+
+logger = logging.getLogger(__name__)
+
+HOST = '127.0.0.1'
+PORT = 8502
+CACHE_SIZE = 50_000
+MAX_BATCH = 10_000
+MAX_BODY = 16 * 1024 * 1024
+# Cache misses below this many are priced one by one: price_frame costs ~50 ms
+# however few rows it gets, a config priced alone ~30 us
+FRAME_MIN_ROWS = 1500
+
+
+# The values of PRICED_FIELDS, picked from QuoteConfig.astuple()
+_priced_values = operator.itemgetter(*[FIELD_INDEX[field] for field in PRICED_FIELDS])
+
+
+class RequestError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+class PriceCache:
+    """LRU of priced results, shared by the event loop and the batch threads."""
+
+    def __init__(self, size=CACHE_SIZE):
+        self.size = size
+        self._results = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = self.misses = 0
+
+    def get(self, key):
+        with self._lock:
+            result = self._results.get(key)
+            if result is None:
+                self.misses += 1
+                return None
+            self._results.move_to_end(key)
+            self.hits += 1
+        return result
+
+    def put(self, key, result):
+        with self._lock:
+            self._results[key] = result
+            while len(self._results) > self.size:
+                self._results.popitem(last=False)
+
+
+def _number_ok(value, low, high):
+    # As quote_import.validate checks a number cell: finite, in range, whole for integer ranges
+    if isinstance(value, bool) or not isinstance(value, (int, float)) or not math.isfinite(value):
+        return False
+    if value < low or (high is not None and value > high):
+        return False
+    return not isinstance(low, int) or float(value).is_integer()
+
+
+def _line_items_total(line_items):
+    try:
+        prices = [float(item['price']) for item in line_items]
+    except (KeyError, TypeError, ValueError):
+        raise RequestError(400, "line_items must be a list of {\"name\", \"price\"}") from None
+    # JSON's NaN and Infinity parse to floats; neither is a price. Items are
+    # never credits: bulk import holds line_items_total to 0 or more too.
+    low, high = IMPORT_RANGES['line_items_total']
+    if not all(_number_ok(price, low, high) for price in prices):
+        raise RequestError(422, [f"line_items: a price must be a number in {range_text(low, high)}"])
+    return money_sum(prices)
+
+
+class PricingAPI:
+    def __init__(self, watcher=None, cache_size=CACHE_SIZE):
+        self.watcher = watcher or CatalogWatcher().start()
+        self.cache = PriceCache(cache_size)
+        self._allowed = (None, None)
+
+    @property
+    def catalog(self):
+        return self.watcher.catalog
+
+    def allowed(self, catalog):
+        # Option lists of the catalog being priced with, rebuilt when it's swapped
+        built_for, allowed = self._allowed
+        if built_for is not catalog:
+            allowed = allowed_options(catalog)
+            self._allowed = (catalog, allowed)
+        return allowed
+
+    def parse(self, quote, catalog):
+        """``(config, line items total, cache key)`` of one request quote."""
+        if not isinstance(quote, dict) or not isinstance(quote.get('config', {}), dict):
+            raise RequestError(400, "a quote is an object with a \"config\" object")
+        values = dict(quote.get('config', {}))
+        # The Summary inputs may also sit next to config; filled in here as they
+        # are part of the cache key and of what price_quote is given
+        values.update({name: quote[name] for name in SUMMARY_DEFAULTS if name in quote})
+        for name, default in SUMMARY_DEFAULTS.items():
+            if values.get(name) is None:
+                values[name] = default
+        try:
+            config = QuoteConfig(values)
+        except (TypeError, ValueError) as exc:
+            raise RequestError(400, str(exc)) from None
+
+        # Only the fields given need checking; the rest take the form defaults
+        errors = []
+        allowed = self.allowed(catalog)
+        for field, value in values.items():
+            if value is None:
+                continue
+            if field in allowed:
+                if str(value) not in allowed[field]:
+                    errors.append(f"{field}: {value!r} is not an option")
+            elif field in IMPORT_RANGES:
+                low, high = IMPORT_RANGES[field]
+                if not _number_ok(value, low, high):
+                    errors.append(f"{field}: must be a number in {range_text(low, high)}")
+        errors += catalog.rules.violations(config)
+        if errors:
+            raise RequestError(422, errors)
+
+        line_items_total = _line_items_total(quote.get('line_items', ()))
+        key = (catalog.digest, _priced_values(config.astuple()), line_items_total)
+        return config, line_items_total, key
+
+    def _result(self, prices, totals, catalog):
+        return {'prices': prices, 'totals': totals, 'catalog_version': catalog.version}
+
+    def price(self, quote):
+        catalog = self.catalog
+        config, line_items_total, key = self.parse(quote, catalog)
+        result = self.cache.get(key)
+        if result is None:
+            count("api.cache_miss")
+            with section("api.price"):
+                prices, totals = price_quote(config, config['discount_percent'], config['alcoa_rims_add'],
+                                             config['grain_sock_add'], [{'price': line_items_total}], catalog)
+            result = self._result(prices, totals, catalog)
+            self.cache.put(key, result)
+        else:
+            count("api.cache_hit")
+        return result
+
+    def price_batch(self, quotes):
+        """Results (or ``{"errors": ...}``) for each quote, cache misses priced in one frame."""
+        if not isinstance(quotes, list):
+            raise RequestError(400, "\"quotes\" must be a list")
+        if len(quotes) > MAX_BATCH:
+            raise RequestError(413, f"at most {MAX_BATCH} quotes per batch")
+        catalog = self.catalog
+        results = [None] * len(quotes)
+        misses = {}
+        for index, quote in enumerate(quotes):
+            try:
+                config, line_items_total, key = self.parse(quote, catalog)
+            except RequestError as exc:
+                results[index] = {'errors': exc.args[0] if isinstance(exc.args[0], list) else [exc.args[0]]}
+                continue
+            result = self.cache.get(key)
+            if result is not None:
+                results[index] = result
+            else:
+                # Repeats within the batch are priced once
+                misses.setdefault(key, (config, line_items_total, []))[2].append(index)
+        count("api.cache_miss", len(misses))
+
+        if len(misses) >= FRAME_MIN_ROWS:
+            with section("api.price_frame"):
+                df = QuoteConfig.to_frame([config for config, _, _ in misses.values()], PRICED_FIELDS)
+                df['line_items_total'] = [total for _, total, _ in misses.values()]
+                priced = price_frame(df, catalog)
+            rows = zip(priced[PRICE_ITEMS].to_numpy(dtype=float).tolist(),
+                       priced[TOTAL_COLUMNS].to_numpy(dtype=float).tolist())
+            priced = [(dict(zip(PRICE_ITEMS, prices)), dict(zip(TOTAL_COLUMNS, totals))) for prices, totals in rows]
+        else:
+            priced = [price_quote(config, config['discount_percent'], config['alcoa_rims_add'],
+                                  config['grain_sock_add'], [{'price': total}], catalog)
+                      for config, total, _ in misses.values()]
+        for (key, (_, _, indexes)), (prices, totals) in zip(misses.items(), priced):
+            result = self._result(prices, totals, catalog)
+            self.cache.put(key, result)
+            for index in indexes:
+                results[index] = result
+        return results
+
+    def health(self):
+        catalog = self.catalog
+        return {'status': 'ok', 'catalog_version': catalog.version, 'catalog_digest': catalog.digest,
+                'catalog_loaded': self.watcher.loaded, 'cache_hits': self.cache.hits,
+                'cache_misses': self.cache.misses}
+
+    async def route(self, method, path, body):
+        if path == '/health' and method == 'GET':
+            return 200, self.health()
+        if path in ('/price', '/price/batch'):
+            if method != 'POST':
+                raise RequestError(405, f"{path} takes POST")
+            try:
+                request = json.loads(body or b'null')
+            except ValueError as exc:
+                raise RequestError(400, f"invalid JSON: {exc}") from None
+            if path == '/price':
+                return 200, self.price(request)
+            if not isinstance(request, dict):
+                raise RequestError(400, "expected {\"quotes\": [...]}")
+            # Big batches are priced off the event loop so other requests keep flowing
+            loop = asyncio.get_running_loop()
+            return 200, {'results': await loop.run_in_executor(None, self.price_batch, request.get('quotes'))}
+        raise RequestError(404, f"no endpoint {path}")
+
+    async def handle(self, reader, writer):
+        """One connection: requests answered in turn until the client closes it."""
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                try:
+                    method, path, version = request_line.decode('latin-1').split()
+                except ValueError:
+                    await _respond(writer, 400, {'error': "malformed request line"}, False)
+                    break
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b'\r\n', b'\n', b''):
+                        break
+                    name, _, value = line.decode('latin-1').partition(':')
+                    headers[name.strip().lower()] = value.strip()
+                keep_alive = (headers.get('connection', '').lower() != 'close'
+                              and version.upper() == 'HTTP/1.1')
+                try:
+                    length = _content_length(headers.get('content-length'))
+                except RequestError as exc:
+                    # Without a length the body can't be told from the next request
+                    await _respond(writer, exc.status, {'error': exc.args[0]}, False)
+                    break
+                if length > MAX_BODY:
+                    await _respond(writer, 413, {'error': f"body over {MAX_BODY} bytes"}, False)
+                    break
+                body = await reader.readexactly(length) if length else b''
+                try:
+                    status, payload = await self.route(method.upper(), path.split('?', 1)[0], body)
+                except RequestError as exc:
+                    message = exc.args[0]
+                    status, payload = exc.status, ({'errors': message} if isinstance(message, list)
+                                                   else {'error': message})
+                except Exception:
+                    logger.exception("pricing request %s %s failed", method, path)
+                    status, payload = 500, {'error': "internal error"}
+                await _respond(writer, status, payload, keep_alive)
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+
+def _content_length(value):
+    # Content-Length is 1*DIGIT; int() would also take '-1', ' 1' or '1_000'
+    if not value:
+        return 0
+    if not (value.isascii() and value.isdigit()):
+        raise RequestError(400, f"invalid Content-Length: {value!r}")
+    return int(value)
+
+
+async def _respond(writer, status, payload, keep_alive):
+    body = json.dumps(payload, separators=(',', ':')).encode()
+    writer.write(
+        f"HTTP/1.1 {status} {http.HTTPStatus(status).phrase}\r\n"
+        f"Content-Type: application/json\r\nContent-Length: {len(body)}\r\n"
+        f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n".encode() + body
+    )
+    await writer.drain()
+
+
+async def start_server(api, host=HOST, port=PORT):
+    """Listen for requests; port 0 picks a free port (``server.sockets[0].getsockname()``)."""
+    return await asyncio.start_server(api.handle, host, port)
+
+
+async def serve(api, host=HOST, port=PORT):
+    server = await start_server(api, host, port)
+    logger.info("pricing API listening on %s:%d", host, port)
+    async with server:
+        await server.serve_forever()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--host', default=HOST)
+    parser.add_argument('--port', type=int, default=PORT)
+    parser.add_argument('--cache-size', type=int, default=CACHE_SIZE)
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    try:
+        asyncio.run(serve(PricingAPI(cache_size=args.cache_size), args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,320 @@
+"""Pre-aggregated quote analytics for the management dashboard.
+
+Rollup tables in the quote database count, per period and model: the
+quotes, the sums of their final totals and discounts, the quotes per whole
+discount percent, and how often each value of ``ROLLUP_FIELDS`` (chassis
+type, rim selections, lift axle count) was picked. Every quote counts
+towards four rows of each table: its day and its month (the quote date),
+each for its dealer and for ``ALL_DEALERS``.
+
+A date range is read as the whole months inside it from the monthly rows
+plus the days at either end from the daily rows, so a dashboard query reads
+at most a couple of months of daily rows however many quotes there are;
+without a dealer filter it reads only the ``ALL_DEALERS`` rows.
+
+``QuoteStore.save`` updates the rollups in the same transaction as the
+quote, taking back what a re-saved quote counted before. Opening a store
+only creates the tables: a database whose quotes predate them is rolled up
+by ``python quote_analytics.py [quotes.db]``, once, as a migration step. It
+recomputes every rollup from ``quotes`` (a minute or so for a few hundred
+thousand quotes) and holds the database's write lock meanwhile, so run it
+before the app or in a quiet hour.
+
+The dashboard itself is ``dashboard.py``.
+"""
+import datetime
+import json
+import operator
+import sqlite3
+import sys
+import time
+from collections import Counter, defaultdict
+
+import pandas as pd
+
+ROLLUP_FIELDS = ('chassis_type', 'ride_rim_selection', 'steer_rim_selection', 'qty_lift')
+# The dealer of the rows counting every dealer's quotes
+ALL_DEALERS = '*'
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS rollup_quotes (
+    dealer TEXT NOT NULL COLLATE NOCASE,
+    grain TEXT NOT NULL,
+    period TEXT NOT NULL,
+    model TEXT NOT NULL,
+    quotes INTEGER NOT NULL,
+    total_sum REAL NOT NULL,
+    discount_sum REAL NOT NULL,
+    discount_quotes INTEGER NOT NULL,
+    PRIMARY KEY (dealer, grain, period, model)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS rollup_discounts (
+    dealer TEXT NOT NULL COLLATE NOCASE,
+    grain TEXT NOT NULL,
+    period TEXT NOT NULL,
+    model TEXT NOT NULL,
+    discount INTEGER NOT NULL,
+    quotes INTEGER NOT NULL,
+    PRIMARY KEY (dealer, grain, period, model, discount)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS rollup_options (
+    field TEXT NOT NULL,
+    dealer TEXT NOT NULL COLLATE NOCASE,
+    grain TEXT NOT NULL,
+    period TEXT NOT NULL,
+    model TEXT NOT NULL,
+    value TEXT NOT NULL,
+    quotes INTEGER NOT NULL,
+    PRIMARY KEY (field, dealer, grain, period, model, value)
+) WITHOUT ROWID;
+"""
+
+ROLLUP_TABLES = ('rollup_quotes', 'rollup_discounts', 'rollup_options')
+ONE_DAY = datetime.timedelta(days=1)
+
+
+def _text(value):
+    # Option values as the dashboard shows them; 1.0 from a form and 1 are the same count
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    return str(value)
+
+
+def _quote_key(row):
+    # (day, dealer, model) of one quote
+    return row['quote_date'] or row['saved_at'][:10], row['dealer'] or '', row['model'] or ''
+
+
+def _keys(day, dealer, model):
+    # (dealer, grain, period, model) of the four rows a quote counts towards
+    return [(who, grain, period, model)
+            for who in (ALL_DEALERS, dealer)
+            for grain, period in (('day', day), ('month', day[:7]))]
+
+
+# Upserts adding to the counts; the dealer column is NOCASE, so 'Dealer 7'
+# and 'dealer 7' share rows
+_ADD_QUOTES = (
+    "INSERT INTO rollup_quotes VALUES (?, ?, ?, ?, ?, ?, ?, ?) ON CONFLICT DO UPDATE SET "
+    "quotes = quotes + excluded.quotes, total_sum = total_sum + excluded.total_sum, "
+    "discount_sum = discount_sum + excluded.discount_sum, "
+    "discount_quotes = discount_quotes + excluded.discount_quotes"
+)
+_ADD_DISCOUNTS = ("INSERT INTO rollup_discounts VALUES (?, ?, ?, ?, ?, ?) ON CONFLICT DO UPDATE SET "
+                  "quotes = quotes + excluded.quotes")
+_ADD_OPTIONS = ("INSERT INTO rollup_options VALUES (?, ?, ?, ?, ?, ?, ?) ON CONFLICT DO UPDATE SET "
+                "quotes = quotes + excluded.quotes")
+
+
+def _picked(config):
+    # (field, value) of the ROLLUP_FIELDS set in a JSON config
+    config = json.loads(config)
+    return [(field, _text(config[field])) for field in ROLLUP_FIELDS if config.get(field) is not None]
+
+
+def record(conn, row, sign=1):
+    """Add (``sign=1``) or take back (``sign=-1``) one ``quotes`` row's counts.
+
+    Runs inside the caller's transaction; ``row`` has the quotes columns,
+    config as JSON.
+    """
+    keys = _keys(*_quote_key(row))
+    discount = row['discount_percent']
+    amounts = (sign, sign * (row['final_total'] or 0.0), sign * (discount or 0.0), sign * (discount is not None))
+    conn.executemany(_ADD_QUOTES, [key + amounts for key in keys])
+    if discount is not None:
+        conn.executemany(_ADD_DISCOUNTS, [key + (int(discount), sign) for key in keys])
+    conn.executemany(_ADD_OPTIONS, [(field,) + key + (value, sign)
+                                    for field, value in _picked(row['config']) for key in keys])
+    if sign < 0:
+        for table in ROLLUP_TABLES:
+            conn.executemany(
+                f"DELETE FROM {table} WHERE dealer = ? AND grain = ? AND period = ? AND model = ? AND quotes <= 0",
+                keys)
+
+
+def _add(sums, key, amounts):
+    total = sums.get(key)
+    sums[key] = amounts if total is None else tuple(map(operator.add, total, amounts))
+
+
+def rebuild(conn):
+    """Recompute every rollup from the quotes table (inside a transaction).
+
+    The quotes are summed in memory per day, dealer and model, then each sum
+    is spread over its four rows; SQLite's GROUP BY over every quote's four
+    rows is slower.
+    """
+    for table in ROLLUP_TABLES:
+        conn.execute(f"DELETE FROM {table}")
+    by_quote = defaultdict(lambda: [0, 0.0, 0.0, 0])
+    by_discount = Counter()
+    by_option = Counter()
+    # One spelling per dealer, as the NOCASE key keeps the first one saved
+    dealers = {}
+    cursor = conn.execute(
+        "SELECT quote_date, saved_at, dealer, model, discount_percent, final_total, config FROM quotes ORDER BY id")
+    cursor.row_factory = sqlite3.Row
+    for row in cursor:
+        day, dealer, model = _quote_key(row)
+        quote_key = day, dealers.setdefault(dealer.casefold(), dealer), model
+        sums = by_quote[quote_key]
+        sums[0] += 1
+        sums[1] += row['final_total'] or 0.0
+        discount = row['discount_percent']
+        if discount is not None:
+            sums[2] += discount
+            sums[3] += 1
+            by_discount[quote_key, int(discount)] += 1
+        for picked in _picked(row['config']):
+            by_option[quote_key, picked] += 1
+    totals, discounts, options = {}, Counter(), Counter()
+    for quote_key, sums in by_quote.items():
+        for key in _keys(*quote_key):
+            _add(totals, key, tuple(sums))
+    for (quote_key, discount), quotes in by_discount.items():
+        for key in _keys(*quote_key):
+            discounts[key + (discount,)] += quotes
+    for (quote_key, (field, value)), quotes in by_option.items():
+        for key in _keys(*quote_key):
+            options[(field,) + key + (value,)] += quotes
+    conn.executemany("INSERT INTO rollup_quotes VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                     [key + sums for key, sums in totals.items()])
+    conn.executemany("INSERT INTO rollup_discounts VALUES (?, ?, ?, ?, ?, ?)",
+                     [key + (quotes,) for key, quotes in discounts.items()])
+    conn.executemany("INSERT INTO rollup_options VALUES (?, ?, ?, ?, ?, ?, ?)",
+                     [key + (quotes,) for key, quotes in options.items()])
+
+
+def create_rollups(conn):
+    """Create the rollup tables if missing; ``rebuild`` fills them."""
+    conn.executescript(SCHEMA)
+
+
+def _next_month(day):
+    return (day.replace(day=1) + datetime.timedelta(days=32)).replace(day=1)
+
+
+def period_spans(date_from=None, date_to=None):
+    """``[(grain, first period, last period)]`` covering the dates; None is open-ended.
+
+    Whole months come from the monthly rows, the days at either end from
+    the daily rows.
+    """
+    date_from = datetime.date.fromisoformat(str(date_from)) if date_from else None
+    date_to = datetime.date.fromisoformat(str(date_to)) if date_to else None
+    if date_from and date_to and date_from > date_to:
+        return []
+    # First and last day of the whole months inside the range
+    first = date_from if date_from is None or date_from.day == 1 else _next_month(date_from)
+    last = date_to
+    if date_to is not None and _next_month(date_to) - ONE_DAY != date_to:
+        last = date_to.replace(day=1) - ONE_DAY
+    if first is not None and last is not None and first > last:
+        return [('day', str(date_from), str(date_to))]
+    spans = [('month', first and str(first)[:7], last and str(last)[:7])]
+    if date_from is not None and first != date_from:
+        spans.append(('day', str(date_from), str(first - ONE_DAY)))
+    if date_to is not None and last != date_to:
+        spans.append(('day', str(last + ONE_DAY), str(date_to)))
+    return spans
+
+
+class QuoteAnalytics:
+    """Dashboard queries; they read the rollup tables only."""
+
+    def __init__(self, store):
+        self.store = store
+
+    def _where(self, spans, dealer=None, model=None, by_dealer=False):
+        clauses = ["dealer != ?" if by_dealer else "dealer = ?"]
+        params = [ALL_DEALERS if by_dealer or not dealer else dealer]
+        if dealer and by_dealer:
+            clauses.append("dealer = ?")
+            params.append(dealer)
+        if model:
+            clauses.append("model = ?")
+            params.append(model)
+        ranges = []
+        for grain, first, last in spans:
+            parts = ["grain = ?"]
+            params.append(grain)
+            if first:
+                parts.append("period >= ?")
+                params.append(first)
+            if last:
+                parts.append("period <= ?")
+                params.append(last)
+            ranges.append(f"({' AND '.join(parts)})")
+        clauses.append(f"({' OR '.join(ranges) or '0'})")
+        return f"WHERE {' AND '.join(clauses)}", params
+
+    def _frame(self, sql, params=()):
+        with self.store.transaction() as conn:
+            cursor = conn.execute(sql, params)
+            rows = cursor.fetchall()
+        return pd.DataFrame([tuple(row) for row in rows], columns=[col[0] for col in cursor.description])
+
+    def daily(self, date_from=None, date_to=None, dealer=None, model=None):
+        """Quotes and average final total per day."""
+        where, params = self._where([('day', date_from and str(date_from), date_to and str(date_to))], dealer, model)
+        return self._frame(
+            f"SELECT period AS day, SUM(quotes) AS quotes, SUM(total_sum) / SUM(quotes) AS average_total "
+            f"FROM rollup_quotes {where} GROUP BY period ORDER BY period", params)
+
+    def breakdown(self, by='dealer', limit=None, date_from=None, date_to=None, dealer=None, model=None):
+        """Quotes, average total and average discount per dealer or per model, most quotes first."""
+        if by not in ('dealer', 'model'):
+            raise ValueError("breakdown is by 'dealer' or 'model'")
+        where, params = self._where(period_spans(date_from, date_to), dealer, model, by_dealer=by == 'dealer')
+        sql = (f"SELECT {by}, SUM(quotes) AS quotes, SUM(total_sum) / SUM(quotes) AS average_total, "
+               f"SUM(discount_sum) / NULLIF(SUM(discount_quotes), 0) AS average_discount "
+               f"FROM rollup_quotes {where} GROUP BY {by} ORDER BY quotes DESC")
+        if limit:
+            sql += f" LIMIT {int(limit)}"
+        return self._frame(sql, params)
+
+    def discounts(self, date_from=None, date_to=None, dealer=None, model=None):
+        """Quotes per whole discount percent."""
+        where, params = self._where(period_spans(date_from, date_to), dealer, model)
+        return self._frame(
+            f"SELECT discount, SUM(quotes) AS quotes FROM rollup_discounts {where} "
+            f"GROUP BY discount ORDER BY discount", params)
+
+    def options(self, field, limit=10, date_from=None, date_to=None, dealer=None, model=None):
+        """The most picked values of one of ``ROLLUP_FIELDS``."""
+        where, params = self._where(period_spans(date_from, date_to), dealer, model)
+        return self._frame(
+            f"SELECT value, SUM(quotes) AS quotes FROM rollup_options {where} AND field = ? "
+            f"GROUP BY value ORDER BY quotes DESC LIMIT {int(limit)}", params + [field])
+
+    def values(self, column):
+        """The dealers or models present in the rollups, for the filters."""
+        if column not in ('dealer', 'model'):
+            raise ValueError("values are listed for 'dealer' or 'model'")
+        with self.store.transaction() as conn:
+            return [row[0] for row in conn.execute(
+                f"SELECT DISTINCT {column} FROM rollup_quotes WHERE grain = 'month' AND dealer != ? "
+                f"ORDER BY {column}", (ALL_DEALERS,))]
+
+    def missing(self):
+        """Stored quotes the rollups don't count: those saved before the rollup tables existed."""
+        with self.store.transaction() as conn:
+            return conn.execute(
+                "SELECT (SELECT COUNT(*) FROM quotes) - IFNULL((SELECT SUM(quotes) FROM rollup_quotes "
+                "WHERE dealer = ? AND grain = 'month'), 0)", (ALL_DEALERS,)).fetchone()[0]
+
+    def rebuild(self):
+        """Recompute the rollups from the quotes; returns the rollup rows written."""
+        with self.store.transaction() as conn:
+            rebuild(conn)
+            return sum(conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0] for table in ROLLUP_TABLES)
+
+
+if __name__ == '__main__':
+    from quote_store import QuoteStore
+
+    store = QuoteStore(sys.argv[1] if len(sys.argv) > 1 else 'quotes.db')
+    start = time.perf_counter()
+    rows = QuoteAnalytics(store).rebuild()
+    print(f"{store.count()} quotes rolled up into {rows} rows in {time.perf_counter() - start:.2f} s")
@@ -0,0 +1,260 @@
+"""Typed, compact quote configuration.
+
+``QuoteConfig`` holds one slot per form field (``quote_fields.FIELDS``),
+typed by kind: selectbox options, numbers, checkboxes, the quote date and
+free text. It is immutable and hashable, so a whole configuration can key a
+cache, and it is a read-only mapping of the fields that are set, so it
+goes anywhere a config dict went (pricing, rules, the store, the exports).
+
+``to_bytes`` packs it in a few hundred bytes: options as one-byte codes into
+the fixed option lists and the built-in catalog's groups, numbers as
+doubles, text length-prefixed. ``to_frame`` / ``from_frame`` move lists of
+them to and from DataFrame rows for the batch paths.
+"""
+import datetime
+import math
+import operator
+import struct
+import zlib
+from collections.abc import Mapping
+
+import numpy as np
+import pandas as pd
+
+from catalog import DEFAULT_CATALOG
+from pricing import OPTION_GROUPS
+from quote_fields import FIELDS, FLAG_FIELDS, NUMBER_RANGES, OPTIONS
+
+# Field kinds, by how a value is coded
+OPTION, NUMBER, FLAG, DATE, TEXT = range(5)
+
+
+def _kind(field):
+    if field in OPTIONS or field in OPTION_GROUPS:
+        return OPTION
+    if field in NUMBER_RANGES:
+        return NUMBER
+    if field in FLAG_FIELDS:
+        return FLAG
+    if field == 'quote_date':
+        return DATE
+    return TEXT
+
+
+FIELD_KINDS = {field: _kind(field) for field in FIELDS}
+FIELD_TYPES = {OPTION: str, NUMBER: float, FLAG: bool, DATE: datetime.date, TEXT: str}
+
+# Options behind the one-byte codes: fixed lists and the built-in catalog groups.
+# Workbook-only options are stored as text.
+CODE_OPTIONS = {field: list(OPTIONS[field]) if field in OPTIONS else list(DEFAULT_CATALOG.options(OPTION_GROUPS[field]))
+                for field, kind in FIELD_KINDS.items() if kind == OPTION}
+_CODES = {field: {option: code for code, option in enumerate(options, start=1)}
+          for field, options in CODE_OPTIONS.items()}
+
+FORMAT_VERSION = 1
+# Bytes packed against another field or option list are refused
+SCHEMA_ID = zlib.crc32(repr((FIELDS, CODE_OPTIONS)).encode())
+_HEADER = struct.Struct('<BI')
+_DOUBLE = struct.Struct('<d')
+_DATE = struct.Struct('<I')
+# Option code bytes beyond the option lists
+NO_VALUE, RAW_TEXT = 0, 255
+FIELD_INDEX = {field: index for index, field in enumerate(FIELDS)}
+_DATE_INDEX = FIELD_INDEX['quote_date']
+# Value types stored as given
+_PLAIN = {type(None), str, int, float, bool, datetime.date}
+
+
+def _is_missing(value):
+    return value is None or (isinstance(value, float) and np.isnan(value))
+
+
+def _coerce(field, value):
+    if _is_missing(value):
+        return None
+    if isinstance(value, np.generic):
+        value = value.item()
+    if FIELD_KINDS[field] == DATE and isinstance(value, str):
+        return datetime.date.fromisoformat(value) if value else None
+    return value
+
+
+def _pack_text(out, text):
+    data = text.encode()
+    out += struct.pack('<H', len(data) + 1)
+    out += data
+
+
+def _unpack_text(data, pos):
+    (length,), pos = struct.unpack_from('<H', data, pos), pos + 2
+    if length == 0:
+        return None, pos
+    end = pos + length - 1
+    return data[pos:end].decode(), end
+
+
+class QuoteConfig(Mapping):
+    """One quote's form values; missing fields are None and left out of the mapping.
+
+    The values live in one tuple in ``FIELDS`` order; each field is a
+    read-only attribute (``config.trailer_length``).
+    """
+
+    __slots__ = ('_values', '_hash')
+    __annotations__ = {field: FIELD_TYPES[kind] | None for field, kind in FIELD_KINDS.items()}
+
+    def __init__(self, values=(), **fields):
+        if fields or not isinstance(values, dict):
+            values = dict(values, **fields)
+        if not values.keys() <= FIELD_INDEX.keys():
+            unknown = sorted(set(values) - set(FIELD_INDEX))
+            raise TypeError(f"unknown quote fields: {', '.join(unknown)}")
+        row = list(map(values.get, FIELDS))
+        types = set(map(type, row))
+        if not types <= _PLAIN:
+            # numpy scalars and the like, from DataFrames
+            row = [_coerce(field, value) for field, value in zip(FIELDS, row)]
+        elif float in types and any(value != value for value in row):
+            row = [None if value != value else value for value in row]
+        if isinstance(row[_DATE_INDEX], str):
+            row[_DATE_INDEX] = _coerce('quote_date', row[_DATE_INDEX])
+        set_slot = object.__setattr__
+        set_slot(self, '_values', tuple(row))
+        set_slot(self, '_hash', None)
+
+    @classmethod
+    def from_state(cls, state):
+        """The form's current values from ``st.session_state`` (or any mapping)."""
+        return cls({field: state[field] for field in FIELDS if field in state})
+
+    def __setattr__(self, name, value):
+        raise AttributeError("QuoteConfig is immutable; use replace()")
+
+    def replace(self, **changes):
+        return QuoteConfig(self.to_dict(), **changes)
+
+    def astuple(self):
+        return self._values
+
+    # Mapping of the fields that are set, like the sparse dicts it replaces
+    def __getitem__(self, field):
+        index = FIELD_INDEX.get(field)
+        value = None if index is None else self._values[index]
+        if value is None:
+            raise KeyError(field)
+        return value
+
+    def get(self, field, default=None):
+        index = FIELD_INDEX.get(field)
+        value = None if index is None else self._values[index]
+        return default if value is None else value
+
+    def __iter__(self):
+        return (field for field, value in zip(FIELDS, self._values) if value is not None)
+
+    def __len__(self):
+        return len(self._values) - self._values.count(None)
+
+    def to_dict(self):
+        return {field: value for field, value in zip(FIELDS, self._values) if value is not None}
+
+    def __eq__(self, other):
+        if isinstance(other, QuoteConfig):
+            return self._values == other._values
+        return Mapping.__eq__(self, other)
+
+    def __hash__(self):
+        if self._hash is None:
+            object.__setattr__(self, '_hash', hash(self._values))
+        return self._hash
+
+    def __repr__(self):
+        return f"QuoteConfig({self.to_dict()!r})"
+
+    def __reduce__(self):
+        return (QuoteConfig.from_bytes, (self.to_bytes(),))
+
+    def to_bytes(self):
+        out = bytearray(_HEADER.pack(FORMAT_VERSION, SCHEMA_ID))
+        for field, value in zip(FIELDS, self._values):
+            kind = FIELD_KINDS[field]
+            if kind == OPTION:
+                code = NO_VALUE if value is None else _CODES[field].get(value, RAW_TEXT)
+                out.append(code)
+                if code == RAW_TEXT:
+                    _pack_text(out, str(value))
+            elif kind == NUMBER:
+                out += _DOUBLE.pack(np.nan if value is None else float(value))
+            elif kind == FLAG:
+                out.append(2 if value is None else int(bool(value)))
+            elif kind == DATE:
+                out += _DATE.pack(0 if value is None else value.toordinal())
+            else:
+                if value is None:
+                    out += b'\0\0'
+                else:
+                    _pack_text(out, str(value))
+        return bytes(out)
+
+    @classmethod
+    def from_bytes(cls, data):
+        version, schema = _HEADER.unpack_from(data, 0)
+        if version != FORMAT_VERSION or schema != SCHEMA_ID:
+            raise ValueError("QuoteConfig bytes were packed for a different field list")
+        pos = _HEADER.size
+        values = {}
+        for field in FIELDS:
+            kind = FIELD_KINDS[field]
+            if kind == OPTION:
+                code = data[pos]
+                pos += 1
+                if code == RAW_TEXT:
+                    values[field], pos = _unpack_text(data, pos)
+                elif code != NO_VALUE:
+                    values[field] = CODE_OPTIONS[field][code - 1]
+            elif kind == NUMBER:
+                (number,) = _DOUBLE.unpack_from(data, pos)
+                pos += _DOUBLE.size
+                if not math.isnan(number):
+                    # Integer ranges come back as the ints the number inputs gave;
+                    # a fraction (a price of 123.45 set through the API) stays a float
+                    values[field] = (int(number) if isinstance(NUMBER_RANGES[field][0], int) and number.is_integer()
+                                     else number)
+            elif kind == FLAG:
+                if data[pos] != 2:
+                    values[field] = bool(data[pos])
+                pos += 1
+            elif kind == DATE:
+                (ordinal,) = _DATE.unpack_from(data, pos)
+                pos += _DATE.size
+                if ordinal:
+                    values[field] = datetime.date.fromordinal(ordinal)
+            else:
+                values[field], pos = _unpack_text(data, pos)
+        return cls(values)
+
+    @staticmethod
+    def to_frame(configs, fields=None, index=None):
+        """One row per config, one column per field (or per one of ``fields``); missing values are None."""
+        fields = FIELDS if fields is None else list(fields)
+        rows = [config._values for config in configs]
+        if fields is not FIELDS:
+            pick = operator.itemgetter(*[FIELD_INDEX[field] for field in fields])
+            rows = [pick(row) for row in rows] if len(fields) > 1 else [(pick(row),) for row in rows]
+        # Built column by column, which pandas does faster than row records
+        return pd.DataFrame(dict(zip(fields, zip(*rows))), columns=fields, index=index)
+
+    @classmethod
+    def from_frame(cls, df):
+        """A QuoteConfig per row; columns that aren't quote fields are ignored."""
+        columns = [field for field in FIELDS if field in df.columns]
+        rows = df[columns].astype(object).where(df[columns].notna(), None)
+        return [cls(zip(columns, row)) for row in rows.itertuples(index=False, name=None)]
+
+
+def _field(index, field):
+    return property(lambda self: self._values[index], doc=f"The {field} form value, or None")
+
+
+for _index, _name in enumerate(FIELDS):
+    setattr(QuoteConfig, _name, _field(_index, _name))
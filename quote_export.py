@@ -0,0 +1,170 @@
+"""Excel export of quotes.
+
+``quote_workbook`` writes one quote as a formatted specification sheet:
+the quote header, every field of every tab grouped by section, the itemized
+pricing and the final totals. ``export_quotes`` streams any number of quotes
+into one workbook, one row per quote, plus a Line Items sheet.
+
+Both use openpyxl's write-only mode, so rows go straight to disk/the output
+buffer and memory stays flat however many quotes are exported. A quote is
+the dict returned by ``QuoteStore.get`` (config, prices, totals, line_items).
+"""
+import datetime
+import io
+
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Alignment, Border, Font, PatternFill, Side
+
+from pricing import PRICE_ITEM_FIELDS, PRICE_ITEMS
+from quote_fields import FIELD_LABELS, FIELDS, SECTIONS
+
+MONEY_FORMAT = '"$"#,##0.00'
+
+TITLE_FONT = Font(bold=True, size=14)
+SECTION_FONT = Font(bold=True, color='FFFFFF')
+SECTION_FILL = PatternFill('solid', fgColor='1F4E78')
+LABEL_FONT = Font(bold=True)
+TOTAL_FONT = Font(bold=True, size=12)
+TOTAL_BORDER = Border(top=Side(style='thin'), bottom=Side(style='double'))
+WRAP = Alignment(wrap_text=True, vertical='top')
+
+TOTAL_ROWS = [
+    ('Base Price', 'subtotal'),
+    ('Discount', 'discount_amount'),
+    ('Discounted Price', 'discounted_price'),
+    ('Additional Items', 'additional_items_total'),
+    ('TOTAL PRICE', 'final_total'),
+]
+
+
+def item_label(item):
+    return item.replace('_', ' ').title()
+
+
+def _cell(ws, value, font=None, fill=None, number_format=None, alignment=None, border=None):
+    cell = WriteOnlyCell(ws, value=value)
+    if font:
+        cell.font = font
+    if fill:
+        cell.fill = fill
+    if number_format:
+        cell.number_format = number_format
+    if alignment:
+        cell.alignment = alignment
+    if border:
+        cell.border = border
+    return cell
+
+
+def _value(value):
+    # Excel has no booleans in spec sheets; dates and numbers stay native
+    if isinstance(value, bool):
+        return "YES" if value else "NO"
+    if isinstance(value, (int, float, datetime.date)) or value is None:
+        return value
+    return str(value)
+
+
+def _section(ws, title):
+    ws.append([])
+    ws.append([_cell(ws, title, SECTION_FONT, SECTION_FILL),
+               _cell(ws, None, fill=SECTION_FILL), _cell(ws, None, fill=SECTION_FILL)])
+
+
+def write_quote_sheet(ws, quote):
+    """Append the specification layout of one quote to a write-only sheet."""
+    config = quote['config']
+    ws.column_dimensions['A'].width = 36
+    ws.column_dimensions['B'].width = 60
+    ws.column_dimensions['C'].width = 16
+
+    ws.append([_cell(ws, "TRAILER QUOTATION", TITLE_FONT)])
+    for title, fields in SECTIONS:
+        _section(ws, title)
+        for key, label in fields:
+            ws.append([_cell(ws, label, LABEL_FONT), _cell(ws, _value(config.get(key)), alignment=WRAP)])
+
+    _section(ws, "Itemized Pricing")
+    ws.append([_cell(ws, "Item", LABEL_FONT), _cell(ws, "Selection", LABEL_FONT), _cell(ws, "Price", LABEL_FONT)])
+    for item in PRICE_ITEMS:
+        price = quote['prices'].get(item, 0)
+        if price > 0:
+            ws.append([item_label(item), _value(config.get(PRICE_ITEM_FIELDS[item])),
+                       _cell(ws, price, number_format=MONEY_FORMAT)])
+    for line_item in quote['line_items']:
+        ws.append([line_item['name'], "Custom item", _cell(ws, line_item['price'], number_format=MONEY_FORMAT)])
+
+    _section(ws, "Final Pricing")
+    totals = quote['totals']
+    discount_percent = config.get('discount_percent', 0)
+    for label, key in TOTAL_ROWS:
+        value = totals[key]
+        if key == 'discount_amount':
+            label, value = f"Discount ({discount_percent}%)", -value
+        if key == 'final_total':
+            ws.append([_cell(ws, label, TOTAL_FONT), None,
+                       _cell(ws, value, TOTAL_FONT, number_format=MONEY_FORMAT, border=TOTAL_BORDER)])
+        else:
+            ws.append([_cell(ws, label, LABEL_FONT), None, _cell(ws, value, number_format=MONEY_FORMAT)])
+
+    ws.append([])
+    ws.append([_cell(ws, "Customer Signature:", LABEL_FONT), _cell(ws, "Sales Representative:", LABEL_FONT)])
+    ws.append(["_" * 40, "_" * 40])
+
+
+def _sheet_title(title):
+    for char in '[]:*?/\\':
+        title = title.replace(char, '-')
+    return title[:31]
+
+
+def quote_workbook(quote):
+    """One quote as .xlsx bytes, ready for ``st.download_button``."""
+    wb = Workbook(write_only=True)
+    title = str(quote['config'].get('quote_number') or 'Quote')
+    ws = wb.create_sheet(title=_sheet_title(title))
+    write_quote_sheet(ws, quote)
+    buffer = io.BytesIO()
+    wb.save(buffer)
+    return buffer.getvalue()
+
+
+EXPORT_TOTALS = ['subtotal', 'discount_amount', 'discounted_price', 'additional_items_total', 'final_total']
+
+
+def export_quotes(quotes, fileobj):
+    """Stream an iterable of quotes into one workbook written to ``fileobj``.
+
+    The Quotes sheet has one row per quote (every field, every price item and
+    the totals); custom line items go to a Line Items sheet. Quotes are
+    consumed one at a time, so pass a generator such as
+    ``QuoteStore.iter_quotes`` to keep memory flat. Returns the quote count.
+    """
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet("Quotes")
+    items_ws = wb.create_sheet("Line Items")
+
+    ws.freeze_panes = 'B2'
+    header = ([FIELD_LABELS[key] for key in FIELDS]
+              + [item_label(item) for item in PRICE_ITEMS]
+              + [item_label(key) for key in EXPORT_TOTALS]
+              + ["Custom Items"])
+    ws.append([_cell(ws, name, LABEL_FONT) for name in header])
+    items_ws.append([_cell(items_ws, name, LABEL_FONT) for name in ("Quote #", "Item", "Price")])
+
+    count = 0
+    for quote in quotes:
+        config = quote['config']
+        row = [_value(config.get(key)) for key in FIELDS]
+        row += [_cell(ws, quote['prices'].get(item, 0), number_format=MONEY_FORMAT) for item in PRICE_ITEMS]
+        row += [_cell(ws, quote['totals'][key], number_format=MONEY_FORMAT) for key in EXPORT_TOTALS]
+        row.append(len(quote['line_items']))
+        ws.append(row)
+        for line_item in quote['line_items']:
+            items_ws.append([config.get('quote_number'), line_item['name'],
+                             _cell(items_ws, line_item['price'], number_format=MONEY_FORMAT)])
+        count += 1
+
+    wb.save(fileobj)
+    return count
@@ -0,0 +1,257 @@
+"""Field registry for the quote form.
+
+Every widget in app.py that belongs to a quote has a session-state key equal
+to its variable name. SECTIONS lists those keys with their labels, grouped
+like the sidebar and tabs, so the store, export and document code can walk a
+full quote without knowing the form layout.
+"""
+
+SECTIONS = [
+    ('Quote Information', [
+        ('quote_number', 'Quote #'),
+        ('quote_date', 'Date'),
+        ('dealer', 'Dealer'),
+        ('contact', 'Contact'),
+        ('model', 'Model'),
+        ('discount_percent', 'Discount %'),
+    ]),
+    ('Trailer Body Specification', [
+        ('full_body_polish', 'Full Body Polish'),
+        ('trailer_length', 'Trailer Length'),
+        ('trailer_width', 'Trailer Width'),
+        ('wall_height', 'Trailer Wall Height'),
+        ('board_height', 'Board Height'),
+        ('box_height', 'Box Height'),
+        ('wall_panels', 'Wall Panels'),
+        ('inner_wall', 'Inner Wall'),
+        ('side_placement', 'Side Placement'),
+        ('body_hold_down', 'Body Hold Down'),
+        ('box_liner', 'Box Liner'),
+        ('top_rail', 'Top Rail'),
+        ('floor', 'Floor'),
+        ('crossmember', 'Crossmember(s)'),
+        ('tow_motor', 'Tow Motor Package'),
+        ('vibrator', 'Vibrator'),
+        ('rear_steps', 'Rear Side Wall Steps'),
+        ('bulkhead_type', 'Trailer Bulkhead Type'),
+        ('shovel_holder', 'Shovel Holder'),
+        ('hoist', 'Recommended Hoist'),
+        ('hose', "9' Hydraulic Hose"),
+        ('man_door', 'Man Door'),
+        ('bulkhead_steps', 'Bulkhead Steps'),
+        ('tailgate_slope', 'Tailgate Slope'),
+        ('tailgate_type', 'Tailgate Type'),
+        ('rear_seal', 'Rear Tailgate Seal'),
+        ('gate_operation', 'Gate Operation'),
+        ('winder_locks', 'Winder Locks'),
+        ('angle_top', 'Angle on Top of Gate'),
+        ('spreader_chains', 'Spreader Chains'),
+        ('gate_steps', 'Gate Steps'),
+        ('coal_chute', 'Coal/Grain Chute'),
+        ('sock_adaptor', 'Sock Adaptor'),
+        ('tarp_hooks', 'Tarp Hooks'),
+    ]),
+    ('Chassis Specification', [
+        ('chassis_model', 'Chassis Model'),
+        ('wear_pad', 'Wear Pad'),
+        ('cylinder_pin', 'Cylinder Pin'),
+        ('chassis_type', 'Chassis'),
+        ('chassis_length', 'Chassis Length'),
+        ('gooseneck', 'Gooseneck'),
+        ('rear_overhang', 'Rear Overhang'),
+        ('king_pin_setting', 'King Pin Setting'),
+        ('fifth_wheel', 'Fifth Wheel Pick Up Plate'),
+        ('king_pin_height', 'King Pin Height'),
+        ('hoist_mount', 'Hoist and Mount Style'),
+        ('front_mudflaps', 'Front Mudflaps'),
+        ('steer_mudflap', 'Steer Axle Mudflap'),
+        ('ride_mudflap', 'Ride Axle Mudflap'),
+        ('center_splash', 'Center Splash Panel'),
+        ('rear_mudflaps', 'Rear Mudflaps'),
+        ('fenders_front', 'Fenders on Front'),
+        ('load_indicator', 'Load Level Indicator'),
+        ('tire_carrier', 'Tire Carrier'),
+        ('tire_carrier_price', 'Tire Carrier Price (TBD)'),
+        ('air_tanks', 'Air Tanks'),
+        ('tow_hooks', 'Tow Hooks'),
+        ('landing_gear', 'Landing Gear'),
+        ('shims', 'Shims'),
+        ('enclosure', 'Enclosure for Switches'),
+        ('air_gauge', 'Air Gauge/System'),
+    ]),
+    ('Axle Configuration', [
+        ('brakes_type', 'Brakes'),
+        ('suspension_control', 'Suspension Control'),
+        ('abs', 'ABS'),
+        ('suspension_hangers', 'Suspension Hangers'),
+        ('qty_ride', 'Quantity of Ride Only Axles'),
+        ('ride_spacing', 'Axles Spacing'),
+        ('ride_suspension', 'Suspension for Ride Axles'),
+        ('ride_axle', 'Axle'),
+        ('ride_brakes', 'Brakes (Ride)'),
+        ('ride_hubs', 'Hubs and Drums'),
+        ('ride_lubrication', 'Axles Lubrication'),
+        ('ride_slacks', 'Slacks'),
+        ('qty_lift', 'Quantity of Lift Axles'),
+        ('lift_spacing', 'Axles Spacing (Lift)'),
+        ('lift_option', 'Lift'),
+        ('lift_axle', 'Axle (Lift)'),
+        ('lift_position', 'Position'),
+        ('qty_steer', 'Quantity of Steer Axles'),
+        ('steer_spacing', 'Steer Axle Spacing'),
+        ('steer_suspension', 'Suspension for Steer/Lift Axle'),
+        ('steer_axles', 'Steer Axles'),
+        ('steer_brakes', 'Brakes (Steer)'),
+        ('lift_kit', 'Lift Kit'),
+        ('lift_control', 'Lift Control'),
+        ('steer_hubs', 'Hubs and Drums (Steer)'),
+        ('proportioning', 'Proportioning Valve'),
+    ]),
+    ('Rims and Tires', [
+        ('tire_size', 'Tire Size Selection'),
+        ('ride_tire_type', 'Ride Tire Selection'),
+        ('steer_tire_type', 'Steer Tire Selection'),
+        ('ride_rim_selection', 'Ride Rim Selection'),
+        ('ride_tires_model', 'Tires (Ride)'),
+        ('steer_rim_selection', 'Steer Rim Selection'),
+        ('steer_tires_model', 'Tires (Steer)'),
+        ('tire_inflation', 'Tire Inflation System'),
+        ('chrome_hats', 'Chrome Top Hats'),
+    ]),
+    ('Lights', [
+        ('light_type', 'Light Type'),
+        ('light_panel', 'Light Panel'),
+        ('license_plate', 'License Plate Panel'),
+        ('light_shield', 'Light Shield'),
+        ('marker_bottom', 'Marker Lights Bottom Rail'),
+        ('additional_markers', 'Additional Marker Lights - Each Side'),
+        ('backup_lights', 'Back Up Lights'),
+        ('tarp_shield_lights', 'Tarp Shield Lights'),
+        ('mid_turns', 'Mid Turns'),
+        ('auxiliary_cable', 'Auxillary Cable'),
+        ('rear_pocket', 'Rear Pocket Lights'),
+    ]),
+    ('Paint', [
+        ('chassis_finish', 'Chassis Finish'),
+        ('paint_color', 'Paint Color'),
+        ('sideboard_color', 'Side Board Color'),
+        ('document_holder', 'Document Holder'),
+        ('special_notes', 'Special Notes'),
+        ('steel_galvanized', 'All Steel Parts Galvanized'),
+    ]),
+    ('Additional Items', [
+        ('alcoa_rims_add', 'ALCOA Rims Additional'),
+        ('grain_sock_add', 'Grain Sock'),
+    ]),
+]
+
+FIELD_LABELS = {key: label for _, fields in SECTIONS for key, label in fields}
+
+# Every session-state key that makes up a quote, in form order
+FIELDS = list(FIELD_LABELS)
+
+# Quote header fields, stored in their own indexed columns
+HEADER_FIELDS = ['quote_number', 'quote_date', 'dealer', 'contact', 'model']
+
+# Fixed choices of every selectbox whose options don't come from the price
+# catalog; app.py builds the widgets from these, imports validate against them
+OPTIONS = {
+    'model': ['End Dump 4x', 'End Dump 3x', 'End Dump 5x'],
+    'full_body_polish': ['STANDARD', 'YES', 'NO'],
+    'trailer_width': ['96 INCHES', '102 INCHES', '104 INCHES'],
+    'wall_panels': ['6061  2.25" PANELS', '6061  3.0" PANELS'],
+    'inner_wall': ['1/8 Inner wall', '3/16 Inner wall', 'NONE'],
+    'side_placement': ['OUTSET SMOOTH SIDE PANEL', 'INSET PANEL'],
+    'body_hold_down': ['NO', 'YES'],
+    'box_liner': ['NONE', 'YES'],
+    'top_rail': ['6061 ALUMINUM EXTRUSION - POLISHED', 'PAINTED'],
+    'crossmember': [
+        '4 INCH EXTRUDED C CHANNELS - STANDARD (12" CENTER)',
+        '4 INCH EXTRUDED C CHANNELS (10" CENTER)',
+    ],
+    'vibrator': ['NONE', 'YES'],
+    'bulkhead_type': ['3/16" 5083 ALUMINUM - RADIUS CORNERS', '1/4" 5083 ALUMINUM - RADIUS CORNERS'],
+    'hoist': ['HYVA', 'WESTEEL'],
+    'hose': ['1" X 108" HOSE W/WING FITTING (4-WIRE HOSE)'],
+    'tailgate_type': ['OVERSLUNG ONLY', 'UNDERSLUNG'],
+    'rear_seal': ['STANDARD RUBBER W/ ALL TRAILERS'],
+    'winder_locks': ['4 (2 BOTTOM, 1 EACH SIDE @ 45 Degree Angle)', '6 LOCKS'],
+    'angle_top': ['NONE', 'YES'],
+    'spreader_chains': ['NONE', 'YES'],
+    'gate_steps': ['NONE', 'YES'],
+    'tarp_hooks': ['NONE', 'YES'],
+    'chassis_model': ['3 Axle', '4 Axle', '5 Axle'],
+    'wear_pad': ['YES, 5/16 INCH FRAME RUBBER ILO CM PADS', 'NO'],
+    'cylinder_pin': ['STANDARD/ YES, 1 SOLID PIN', '2 PINS'],
+    'fifth_wheel': ['5/16" , GALVANIZED'],
+    'hoist_mount': ['DOUBLE 3" X 6" X 3/8"'],
+    'front_mudflaps': ['BOX CORNERS', 'FULL WIDTH'],
+    'steer_mudflap': ['FRONT AND REAR', 'NONE'],
+    'center_splash': ['NONE', 'YES'],
+    'rear_mudflaps': ['FULL WIDTH', 'STANDARD'],
+    'fenders_front': ['NONE', 'YES'],
+    'load_indicator': ['NO', 'YES'],
+    'tire_carrier': ['YES', 'NONE'],
+    'air_tanks': ['ALUMINUM', 'STEEL'],
+    'tow_hooks': ['YES, IN REAR PIVOTS', 'NO'],
+    'shims': ['STAINLESS STEEL', 'GALVANIZED'],
+    'enclosure': ['YES - STAINLESS STEEL (STANDARD)'],
+    'air_gauge': ['YES, IN FRONT (45 Degree Angle)'],
+    'suspension_control': ['ELECTRIC W/ MANUAL BALL VALVE IN CONTROL BOX (Electric on Aux cord)'],
+    'abs': ['2S1M MERITOR/WABCO'],
+    'suspension_hangers': ['GALVANIZED', 'PAINTED'],
+    'ride_suspension': ['HEND. INTRAAX AAT-30K W/HXL-3'],
+    'ride_axle': ['HENDRICKSON INTRAAX'],
+    'ride_brakes': ['DRUMS, 7 IN XL, W/ 30-30 CHAMBERS'],
+    'ride_hubs': ['CAST W/STEEL HUB HP 10 STUD TP, LS, 7 IN'],
+    'ride_lubrication': ['HXL, SYNTHETIC SEMI-FLUID GREASE 3 YEAR'],
+    'ride_slacks': ['AUTOMATIC'],
+    'lift_option': ['HEND. INTRAAX AAT WITH UBL-102 LIFT', 'HEND. INTRAAX AAL WITH UBL-102 HIGH LIFT'],
+    'lift_axle': ['HENDRICKSON INTRAAX'],
+    'lift_position': ['1 -FRONT', '2 -MIDDLE', '3 -MIDDLE', '4 -REAR'],
+    'steer_suspension': ['IMT DEXTER 25K'],
+    'steer_axles': ['IMT DEXTER'],
+    'steer_brakes': ['DRUMS, 7 IN XL, W/ 30-30 CHAMBERS'],
+    'lift_kit': ['INTEGRATED WITH AXLE'],
+    'lift_control': ['REVERSE-A-MATIC'],
+    'steer_hubs': ['CAST W/STEEL HUB HP 10 STUD TP, LS, 7 IN'],
+    'proportioning': ['YES', 'NO'],
+    'tire_size': ['22.5', '24.5'],
+    'ride_tire_type': ['DUAL TIRES', 'SINGLE TIRES'],
+    'steer_tire_type': ['DUAL TIRES', 'SINGLE TIRES'],
+    'ride_tires_model': ['CONTINENTAL HSR3 11R22.5 16 PLY', 'CONTINENTAL HSR3 11R24.5 16 PLY'],
+    'steer_tires_model': ['CONTINENTAL HSR3 11R22.5 16 PLY', 'CONTINENTAL HSR3 11R24.5 16 PLY'],
+    'tire_inflation': ['NONE', 'YES'],
+    'chrome_hats': ['NONE', 'YES'],
+    'light_panel': ['(3) LARGE - (3) LARGE', '(2) LARGE - (2) LARGE'],
+    'license_plate': ['STANDARD WITH 5 SMALL LIGHTS'],
+    'light_shield': ['LIGHT SHIELD STANDARD'],
+    'marker_bottom': ['(5) EACH SIDE', '(6) EACH SIDE', '(7) EACH SIDE'],
+    'backup_lights': ['NONE', 'YES'],
+    'tarp_shield_lights': ['NONE', 'YES'],
+    'mid_turns': ['(1) PAIR LED (UNDER THE BOX)', 'NONE'],
+    'auxiliary_cable': ['7 WAY (ISO) (GLADHANDS 7 WAY SOCKETS MOUNTED ON D/S AREA)'],
+    'rear_pocket': ['NONE', 'YES'],
+    'chassis_finish': ['NOT POLISHED', 'POLISHED'],
+    'paint_color': ['GALVANIZED', 'BLACK', 'WHITE', 'RED', 'BLUE'],
+    'sideboard_color': ['BLACK', 'GALVANIZED', 'WHITE', 'RED'],
+    'document_holder': ['STANDARD (ROUND) HOLDER', 'RECTANGULAR'],
+}
+
+# Checkbox fields, True/False
+FLAG_FIELDS = ['steel_galvanized']
+
+# (min, max) of every number input; None is unbounded
+NUMBER_RANGES = {
+    'discount_percent': (0.0, 100.0),
+    'tire_carrier_price': (0, None),
+    'qty_ride': (0, 5),
+    'ride_spacing': (60, 100),
+    'qty_lift': (0, 3),
+    'lift_spacing': (60, 100),
+    'qty_steer': (0, 2),
+    'steer_spacing': (80, 120),
+    'additional_markers': (0, 50),
+    'alcoa_rims_add': (0, None),
+    'grain_sock_add': (0, None),
+}
@@ -0,0 +1,272 @@
+"""Bulk pricing of uploaded configuration spreadsheets.
+
+A CSV or XLSX holds one trailer per row, with columns named by the form's
+field keys (``trailer_length``, ``qty_lift`` ...) or their labels ("Trailer
+Length"). Rows are read ``CHUNK_ROWS`` at a time; each chunk is validated
+against the selectbox options (``quote_fields.OPTIONS`` and the catalog
+groups), the number ranges, the checkboxes and the catalog's compatibility
+rules, then priced in one pass by ``pricing.price_frame``. Blank cells
+take the form defaults, including the Summary tab's ALCOA rims and grain
+sock additions; ``discount_percent`` and ``line_items_total`` columns are
+honoured per row, ``line_items_total`` checked like the number fields
+(a number, 0 or more).
+
+Results are streamed chunk by chunk to CSV, or to a write-only workbook, so
+memory is bounded by the chunk size however long the file is.
+"""
+import csv
+import io
+
+import numpy as np
+import pandas as pd
+from openpyxl import Workbook, load_workbook
+
+from catalog import DEFAULT_CATALOG
+from money import cents_array, from_cents, to_cents
+from pricing import OPTION_GROUPS, PRICE_ITEMS, price_frame
+from quote_fields import FIELD_LABELS, FLAG_FIELDS, NUMBER_RANGES, OPTIONS
+
+CHUNK_ROWS = 5000
+# Example problems kept for the summary; every problem is in the results file
+MAX_REPORTED_ERRORS = 50
+
+# Columns added by price_chunk; dropped from uploads, so a results file can be re-priced
+RESULT_COLUMNS = (['row', 'status', 'errors'] + [f"price_{item}" for item in PRICE_ITEMS]
+                  + ['subtotal', 'discount_amount', 'discounted_price', 'additional_items_total', 'final_total'])
+
+# Number columns checked like the form's number inputs: its fields plus the custom items' total
+IMPORT_RANGES = dict(NUMBER_RANGES, line_items_total=(0.0, None))
+IMPORT_LABELS = dict(FIELD_LABELS, line_items_total="Line Items Total")
+
+FLAG_VALUES = {'YES': True, 'Y': True, 'TRUE': True, '1': True,
+               'NO': False, 'N': False, 'FALSE': False, '0': False}
+
+
+def _header_map():
+    names = {key.lower(): key for key in FIELD_LABELS}
+    names.update({label.strip().lower(): key for key, label in FIELD_LABELS.items()})
+    names.update({'line_items_total': 'line_items_total', 'line items total': 'line_items_total'})
+    return names
+
+
+HEADER_NAMES = _header_map()
+
+
+def _field_name(column):
+    text = str(column).strip()
+    return HEADER_NAMES.get(text.lower(), text)
+
+
+def _cell_text(value):
+    # Spreadsheet cells come back as 22.5, 72.0 or ' YES '; options are compared as text
+    if value is None or (isinstance(value, float) and np.isnan(value)):
+        return np.nan
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    text = str(value).strip()
+    return text if text else np.nan
+
+
+def _frame(rows, columns, start):
+    df = pd.DataFrame(rows, columns=columns, dtype=object)
+    df.index = pd.RangeIndex(start, start + len(df))
+    return _unique_columns(df)
+
+
+def _unique_columns(df):
+    # A field given twice (key and label) counts once, the first column wins
+    return df.loc[:, ~df.columns.duplicated()]
+
+
+def read_chunks(fileobj, filename, chunksize=CHUNK_ROWS):
+    """Yield the rows of a CSV/XLSX upload as DataFrames of field-named columns.
+
+    The index is the 1-based data row number (the header is row 0).
+    """
+    start = 1
+    if filename.lower().endswith(('.xlsx', '.xlsm')):
+        wb = load_workbook(fileobj, read_only=True, data_only=True)
+        try:
+            rows = wb.active.iter_rows(values_only=True)
+            header = next(rows, None)
+            if header is None:
+                return
+            columns = [_field_name(name) for name in header]
+            batch = []
+            for row in rows:
+                if any(value is not None for value in row):
+                    batch.append(row)
+                if len(batch) == chunksize:
+                    yield _frame(batch, columns, start)
+                    start += len(batch)
+                    batch = []
+            if batch:
+                yield _frame(batch, columns, start)
+        finally:
+            wb.close()
+        return
+
+    if isinstance(fileobj, (bytes, bytearray)):
+        fileobj = io.BytesIO(fileobj)
+    reader = pd.read_csv(fileobj, dtype=str, keep_default_na=False, na_values=[''],
+                         chunksize=chunksize, skipinitialspace=True)
+    for chunk in reader:
+        chunk.columns = [_field_name(name) for name in chunk.columns]
+        chunk.index = pd.RangeIndex(start, start + len(chunk))
+        start += len(chunk)
+        yield _unique_columns(chunk.astype(object))
+
+
+def allowed_options(catalog=None):
+    """``{field: {text: option}}`` for every selectbox field."""
+    catalog = catalog or DEFAULT_CATALOG
+    allowed = {field: {str(option): option for option in options} for field, options in OPTIONS.items()}
+    for field, group in OPTION_GROUPS.items():
+        allowed[field] = {str(option): option for option in catalog.options(group)}
+    return allowed
+
+
+def validate(df, catalog=None, allowed=None):
+    """Coerce a chunk to widget values in place; returns each row's problems ('' if none)."""
+    allowed = allowed or allowed_options(catalog)
+    errors = pd.Series('', index=df.index, dtype=object)
+
+    def flag(bad, messages):
+        nonlocal errors
+        if bad.any():
+            errors = errors.where(~bad, errors + messages.where(bad, '') + '; ')
+
+    for field in df.columns:
+        label = IMPORT_LABELS.get(field, field)
+        if field in allowed:
+            text = df[field].map(_cell_text)
+            values = text.map(allowed[field])
+            bad = text.notna() & values.isna()
+            flag(bad, f"{label}: '" + text.astype(str) + "' is not an option")
+            df[field] = values.where(~bad, text)
+        elif field in IMPORT_RANGES:
+            low, high = IMPORT_RANGES[field]
+            numbers = pd.to_numeric(df[field], errors='coerce')
+            # 'nan' parses to NaN and 'inf' to infinity; neither is an amount
+            bad = (df[field].notna() & numbers.isna()) | np.isinf(numbers)
+            if low is not None:
+                bad |= numbers < low
+            if high is not None:
+                bad |= numbers > high
+            if isinstance(low, int):
+                bad |= numbers.notna() & (numbers % 1 != 0)
+            flag(bad, pd.Series(f"{label}: must be a number in {range_text(low, high)}", index=df.index))
+            df[field] = numbers.where(~bad, df[field])
+        elif field in FLAG_FIELDS:
+            text = df[field].map(_cell_text)
+            values = text.str.upper().map(FLAG_VALUES)
+            bad = text.notna() & values.isna()
+            flag(bad, pd.Series(f"{label}: must be YES or NO", index=df.index))
+            df[field] = values
+    return errors.str.rstrip('; ')
+
+
+def range_text(low, high):
+    """A number range as the error messages show it: ``0-100`` or ``0 or more``."""
+    if high is None:
+        return f"{low:g} or more"
+    return f"{low:g}-{high:g}"
+
+
+def price_chunk(df, catalog=None, allowed=None):
+    """Validate and price one chunk.
+
+    Returns the row number, status and problems, the input columns, one
+    ``price_<item>`` column per price item and the totals; invalid rows
+    have blank prices.
+    """
+    df = df.drop(columns=[name for name in RESULT_COLUMNS if name in df.columns])
+    errors = validate(df, catalog, allowed)
+    rule_errors = (catalog or DEFAULT_CATALOG).rules.validate_frame(df)
+    errors = (errors + '; ' + rule_errors).str.strip('; ')
+    valid = errors == ''
+
+    # Price items share names with their fields (trailer_length ...), so they get a prefix
+    priced = price_frame(df[valid], catalog).rename(columns={item: f"price_{item}" for item in PRICE_ITEMS})
+    result = df.copy()
+    result.insert(0, 'row', df.index)
+    result.insert(1, 'status', np.where(valid, 'OK', 'INVALID'))
+    result.insert(2, 'errors', errors)
+    return pd.concat([result, priced.reindex(df.index)], axis=1)
+
+
+class CsvResults:
+    def __init__(self, fileobj):
+        self.fileobj = fileobj
+        self.header = True
+
+    def write(self, df):
+        self.fileobj.write(df.to_csv(index=False, header=self.header, quoting=csv.QUOTE_MINIMAL).encode())
+        self.header = False
+
+    def close(self):
+        pass
+
+
+class XlsxResults:
+    def __init__(self, fileobj):
+        self.fileobj = fileobj
+        self.wb = Workbook(write_only=True)
+        self.ws = self.wb.create_sheet("Priced Quotes")
+        self.header = True
+
+    def write(self, df):
+        if self.header:
+            self.ws.freeze_panes = 'D2'
+            self.ws.append([FIELD_LABELS.get(name, name) for name in df.columns])
+            self.header = False
+        for row in df.astype(object).where(df.notna(), None).itertuples(index=False):
+            self.ws.append(row)
+
+    def close(self):
+        self.wb.save(self.fileobj)
+
+
+RESULT_WRITERS = {'csv': CsvResults, 'xlsx': XlsxResults}
+
+
+def import_quotes(fileobj, filename, out, out_format='csv', catalog=None, chunksize=CHUNK_ROWS,
+                  progress=None):
+    """Price every row of an upload, streaming the results to ``out`` (binary).
+
+    ``progress(rows_done)`` is called after each chunk. Returns a summary:
+    row counts, the sum of the valid rows' final totals and up to
+    ``MAX_REPORTED_ERRORS`` ``(row, errors)`` examples.
+    """
+    allowed = allowed_options(catalog)
+    writer = RESULT_WRITERS[out_format](out)
+    summary = {'rows': 0, 'valid': 0, 'invalid': 0, 'final_total': 0.0, 'errors': []}
+    columns = None
+    for chunk in read_chunks(fileobj, filename, chunksize):
+        result = price_chunk(chunk, catalog, allowed)
+        # Later chunks are written in the first chunk's column order
+        if columns is None:
+            columns = list(result.columns)
+        result = result.reindex(columns=columns)
+        writer.write(result)
+
+        valid = result['status'] == 'OK'
+        summary['rows'] += len(result)
+        summary['valid'] += int(valid.sum())
+        summary['invalid'] += int((~valid).sum())
+        # Summed in cents; a float sum over many rows drifts
+        summary['final_total'] = from_cents(to_cents(summary['final_total'])
+                                            + int(cents_array(result.loc[valid, 'final_total']).sum()))
+        room = MAX_REPORTED_ERRORS - len(summary['errors'])
+        if room > 0:
+            invalid = result.loc[~valid, ['row', 'errors']].head(room)
+            summary['errors'] += list(invalid.itertuples(index=False, name=None))
+        if progress:
+            progress(summary['rows'])
+    writer.close()
+    return summary
+
+
+def template_csv():
+    """An empty upload template: every field key as a header row."""
+    return (','.join(list(FIELD_LABELS) + ['line_items_total']) + '\n').encode()
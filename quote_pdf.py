@@ -0,0 +1,248 @@
+"""PDF quote documents.
+
+``render_quote_pdf`` lays out one quote: the header from the sidebar, every
+spec section, the itemized pricing, the Summary totals and the signature
+block. The static part of the document (fonts, paragraph and table styles,
+escaped section titles and field labels, the page header/footer) is built
+once per process by ``get_template`` and reused for every quote.
+
+``render_batch`` renders many quotes across a process pool, each worker
+building the template once in its initializer. Run
+``python quote_pdf.py [count] [workers]`` for a quotes/second benchmark.
+"""
+import functools
+import io
+import itertools
+import multiprocessing
+import os
+import sys
+import time
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+
+from reportlab.lib import colors
+from reportlab.lib.pagesizes import LETTER
+from reportlab.lib.styles import ParagraphStyle, getSampleStyleSheet
+from reportlab.lib.units import inch
+from reportlab.lib.utils import simpleSplit
+from reportlab.platypus import KeepTogether, Paragraph, SimpleDocTemplate, Spacer, Table, TableStyle
+from xml.sax.saxutils import escape
+
+from pricing import PRICE_ITEM_FIELDS, PRICE_ITEMS
+from quote_fields import SECTIONS
+
+TITLE = "Trailer Quotation"
+MARGIN = 0.6 * inch
+FONT = 'Helvetica'
+BOLD_FONT = 'Helvetica-Bold'
+FONT_SIZE = 8
+# Horizontal cell padding, taken off the column width when wrapping text
+CELL_PADDING = 6
+# Quotes rendered per render_batch call while building a zip
+ZIP_BATCH = 256
+
+
+def _wrap(text, width, font=FONT):
+    # Plain strings split with simpleSplit are far cheaper for Table cells than Paragraphs
+    return '\n'.join(simpleSplit(text, font, FONT_SIZE, width - 2 * CELL_PADDING))
+
+
+class QuoteTemplate:
+    """Everything about the PDF that does not depend on the quote."""
+
+    def __init__(self):
+        sheet = getSampleStyleSheet()
+        self.title = ParagraphStyle('QuoteTitle', parent=sheet['Title'], fontSize=18, spaceAfter=6)
+        self.section = ParagraphStyle('QuoteSection', parent=sheet['Heading3'], textColor=colors.white,
+                                      backColor=colors.HexColor('#1F4E78'), borderPadding=(2, 4, 2, 4),
+                                      spaceBefore=8, spaceAfter=4)
+
+        width = LETTER[0] - 2 * MARGIN
+        self.spec_widths = [width * 0.2, width * 0.3] * 2
+        self.price_widths = [width * 0.3, width * 0.5, width * 0.2]
+        self.signature_widths = [width * 0.5] * 2
+        grid = [
+            ('FONT', (0, 0), (-1, -1), FONT, FONT_SIZE),
+            ('GRID', (0, 0), (-1, -1), 0.25, colors.grey),
+            ('VALIGN', (0, 0), (-1, -1), 'TOP'),
+            ('TOPPADDING', (0, 0), (-1, -1), 2),
+            ('BOTTOMPADDING', (0, 0), (-1, -1), 2),
+        ]
+        self.spec_grid = TableStyle(grid + [
+            ('FONT', (0, 0), (0, -1), BOLD_FONT, FONT_SIZE),
+            ('FONT', (2, 0), (2, -1), BOLD_FONT, FONT_SIZE),
+        ])
+        self.price_grid = TableStyle(grid + [
+            ('FONT', (0, 0), (-1, 0), BOLD_FONT, FONT_SIZE),
+            ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#DDEBF7')),
+            ('ALIGN', (-1, 0), (-1, -1), 'RIGHT'),
+        ])
+        self.totals_grid = TableStyle([
+            ('FONT', (0, 0), (-1, -1), FONT, 9),
+            ('FONT', (0, -1), (-1, -1), BOLD_FONT, 10),
+            ('LINEABOVE', (0, -1), (-1, -1), 1, colors.black),
+            ('ALIGN', (1, 0), (1, -1), 'RIGHT'),
+        ])
+        # Section titles and wrapped field labels are static; only values change per quote
+        self.sections = [
+            (escape(title), [(key, _wrap(label, self.spec_widths[0], BOLD_FONT)) for key, label in fields])
+            for title, fields in SECTIONS
+        ]
+    def on_page(self, canvas, doc):
+        canvas.saveState()
+        canvas.setFont('Helvetica-Bold', 9)
+        canvas.drawString(MARGIN, LETTER[1] - 0.4 * inch, TITLE.upper())
+        canvas.setFont('Helvetica', 8)
+        canvas.drawRightString(LETTER[0] - MARGIN, 0.4 * inch, f"Page {doc.page}")
+        canvas.restoreState()
+
+
+@functools.lru_cache(maxsize=None)
+def get_template():
+    return QuoteTemplate()
+
+
+def _text(value):
+    if isinstance(value, bool):
+        value = "YES" if value else "NO"
+    return "" if value is None else str(value)
+
+
+def _money(value):
+    return f"${value:,.2f}"
+
+
+def _spec_table(template, fields, config):
+    value_width = template.spec_widths[1]
+    cells = [(label, _wrap(_text(config.get(key)), value_width)) for key, label in fields]
+    # Two label/value pairs per row
+    rows = []
+    for i in range(0, len(cells), 2):
+        pair = cells[i:i + 2]
+        row = [cell for item in pair for cell in item]
+        rows.append(row + [''] * (4 - len(row)))
+    return Table(rows, colWidths=template.spec_widths, style=template.spec_grid)
+
+
+def quote_story(quote, template=None):
+    """The flowables for one quote."""
+    template = template or get_template()
+    config = quote['config']
+    prices = quote['prices']
+    totals = quote['totals']
+
+    story = [Paragraph(f"{TITLE} #{escape(_text(config.get('quote_number')))}", template.title)]
+    for title, fields in template.sections:
+        story.append(Paragraph(title, template.section))
+        story.append(_spec_table(template, fields, config))
+
+    story.append(Paragraph("Itemized Pricing", template.section))
+    item_width, selection_width, _ = template.price_widths
+    rows = [["Item", "Selection", "Price"]]
+    for item in PRICE_ITEMS:
+        price = prices.get(item, 0)
+        if price > 0:
+            rows.append([item.replace('_', ' ').title(),
+                         _wrap(_text(config.get(PRICE_ITEM_FIELDS[item])), selection_width),
+                         _money(price)])
+    for line_item in quote['line_items']:
+        rows.append([_wrap(_text(line_item['name']), item_width), "Custom item", _money(line_item['price'])])
+    story.append(Table(rows, colWidths=template.price_widths, style=template.price_grid, repeatRows=1))
+
+    discount_percent = config.get('discount_percent', 0)
+    summary = [
+        ["Base Price", _money(totals['subtotal'])],
+        [f"Discount ({discount_percent}%)", f"-{_money(totals['discount_amount'])}"],
+        ["Discounted Price", _money(totals['discounted_price'])],
+        ["Additional Items", _money(totals['additional_items_total'])],
+        ["TOTAL PRICE", _money(totals['final_total'])],
+    ]
+    story.append(KeepTogether([
+        Paragraph("Final Pricing", template.section),
+        Table(summary, colWidths=template.price_widths[1:], style=template.totals_grid, hAlign='RIGHT'),
+        Spacer(1, 0.5 * inch),
+        Table([["Customer Signature:", "Sales Representative:"], ["_" * 40, "_" * 40]],
+              colWidths=template.signature_widths),
+    ]))
+    return story
+
+
+def render_quote_pdf(quote):
+    """One quote (a ``QuoteStore.get``-shaped dict) as PDF bytes."""
+    template = get_template()
+    buffer = io.BytesIO()
+    doc = SimpleDocTemplate(buffer, pagesize=LETTER, leftMargin=MARGIN, rightMargin=MARGIN,
+                            topMargin=MARGIN, bottomMargin=MARGIN,
+                            title=f"{TITLE} {quote['config'].get('quote_number') or ''}".strip())
+    doc.build(quote_story(quote, template), onFirstPage=template.on_page, onLaterPages=template.on_page)
+    return buffer.getvalue()
+
+
+def _init_worker():
+    get_template()
+
+
+def render_batch(quotes, workers=None, chunksize=8):
+    """Render quotes in parallel; returns PDF bytes in input order.
+
+    ``workers=1`` renders in-process, which is faster for a handful of quotes.
+    """
+    quotes = list(quotes)
+    if workers == 1 or len(quotes) <= 1:
+        return [render_quote_pdf(quote) for quote in quotes]
+    context = multiprocessing.get_context('spawn')  # no fork from a threaded server
+    with ProcessPoolExecutor(max_workers=workers, mp_context=context, initializer=_init_worker) as pool:
+        return list(pool.map(render_quote_pdf, quotes, chunksize=chunksize))
+
+
+def pdf_filename(quote):
+    return f"Quote-{quote['config'].get('quote_number') or quote.get('id', 'draft')}.pdf"
+
+
+def render_zip(quotes, workers=None, batch_size=ZIP_BATCH):
+    """Render quotes in parallel into a zip of PDFs, returned as bytes.
+
+    ``quotes`` is consumed ``batch_size`` at a time, so only one batch of
+    quotes and their PDFs is held besides the zip itself.
+    """
+    quotes = iter(quotes)
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_DEFLATED) as archive:
+        while batch := list(itertools.islice(quotes, batch_size)):
+            for quote, pdf in zip(batch, render_batch(batch, workers)):
+                archive.writestr(pdf_filename(quote), pdf)
+    return buffer.getvalue()
+
+
+def benchmark(count=200, workers=None):
+    """Quotes/second for a serial and a process-pool render of ``count`` sample quotes."""
+    from pricing import DEFAULT_CONFIG, price_quote
+    from quote_fields import FIELDS
+
+    quotes = []
+    for i in range(count):
+        config = {key: "SAMPLE" for key in FIELDS}
+        config.update(DEFAULT_CONFIG)
+        config.update(quote_number=f"BENCH-{i:05d}", discount_percent=4.0, additional_markers=i % 50)
+        prices, totals = price_quote(config)
+        quotes.append({'config': config, 'prices': prices, 'totals': totals, 'line_items': []})
+
+    get_template()
+    start = time.perf_counter()
+    render_batch(quotes, workers=1)
+    serial = count / (time.perf_counter() - start)
+
+    start = time.perf_counter()
+    render_batch(quotes, workers=workers)
+    parallel = count / (time.perf_counter() - start)
+    return {'quotes': count, 'workers': workers or os.cpu_count(),
+            'serial_qps': round(serial, 1), 'parallel_qps': round(parallel, 1)}
+
+
+if __name__ == '__main__':
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    workers = int(sys.argv[2]) if len(sys.argv) > 2 else None
+    result = benchmark(count, workers)
+    print(f"{result['quotes']} quotes, {result['workers']} workers")
+    print(f"serial:   {result['serial_qps']:8.1f} quotes/s")
+    print(f"parallel: {result['parallel_qps']:8.1f} quotes/s")
@@ -0,0 +1,353 @@
+"""SQLite persistence for saved quotes.
+
+One row per Quote #, holding the full form configuration, the itemized
+prices, the totals and the custom line items as JSON, with the header fields
+(quote number, dealer, date, model) in their own indexed columns so searches
+over tens of thousands of quotes never scan the JSON.
+
+Every save that changes a quote also appends a revision. A revision stores
+only what changed since the previous one (config fields, prices and totals
+that differ, the line items if they changed); every ``KEYFRAME_EVERY``-th
+revision is a full copy, so rebuilding any revision applies at most
+``KEYFRAME_EVERY - 1`` deltas to the keyframe before it.
+"""
+import contextlib
+import datetime
+import json
+import sqlite3
+import threading
+from collections.abc import Mapping
+
+import quote_analytics
+from quote_config import FIELD_KINDS, QuoteConfig
+
+DB_FILE = 'quotes.db'
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS quotes (
+    id INTEGER PRIMARY KEY,
+    quote_number TEXT NOT NULL COLLATE NOCASE UNIQUE,
+    quote_date TEXT,
+    dealer TEXT COLLATE NOCASE,
+    contact TEXT,
+    model TEXT,
+    discount_percent REAL,
+    subtotal REAL,
+    final_total REAL,
+    config TEXT NOT NULL,
+    prices TEXT NOT NULL,
+    totals TEXT NOT NULL,
+    line_items TEXT NOT NULL,
+    saved_at TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS quotes_dealer ON quotes (dealer, quote_date);
+CREATE INDEX IF NOT EXISTS quotes_date ON quotes (quote_date);
+CREATE INDEX IF NOT EXISTS quotes_model ON quotes (model, quote_date);
+CREATE TABLE IF NOT EXISTS quote_revisions (
+    quote_id INTEGER NOT NULL REFERENCES quotes (id),
+    revision INTEGER NOT NULL,
+    saved_at TEXT NOT NULL,
+    final_total REAL,
+    changes INTEGER NOT NULL,
+    keyframe INTEGER NOT NULL,
+    delta TEXT NOT NULL,
+    PRIMARY KEY (quote_id, revision)
+) WITHOUT ROWID;
+"""
+
+KEYFRAME_EVERY = 10
+# The parts of a quote that are versioned; config, prices and totals diff key by key
+DICT_PARTS = ('config', 'prices', 'totals')
+
+# Columns returned by search(), enough for a result list without the JSON
+SUMMARY_COLUMNS = ['id', 'quote_number', 'quote_date', 'dealer', 'contact', 'model', 'final_total', 'saved_at']
+
+
+def _encode(value):
+    # QuoteConfig (a mapping) as an object, dates and the like as text
+    return dict(value) if isinstance(value, Mapping) else str(value)
+
+
+def _json(value):
+    return json.dumps(value, default=_encode, separators=(',', ':'))
+
+
+_MISSING = object()
+
+
+def _normalized(quote):
+    # What the quote looks like once stored: dates as strings, tuples as lists
+    return {part: json.loads(_json(quote[part])) for part in DICT_PARTS + ('line_items',)}
+
+
+def quote_delta(old, new):
+    """What changed from ``old`` to ``new`` (both normalized), and how many values."""
+    delta = {}
+    changes = 0
+    for part in DICT_PARTS:
+        before, after = old[part], new[part]
+        changed = {key: value for key, value in after.items() if before.get(key, _MISSING) != value}
+        removed = [key for key in before if key not in after]
+        if changed:
+            delta[part] = changed
+        if removed:
+            delta.setdefault('removed', {})[part] = removed
+        changes += len(changed) + len(removed)
+    if old['line_items'] != new['line_items']:
+        delta['line_items'] = new['line_items']
+        changes += 1
+    return delta, changes
+
+
+def apply_delta(quote, delta):
+    """``quote`` (normalized) with ``delta`` applied, as a new dict."""
+    quote = {part: dict(quote[part]) for part in DICT_PARTS} | {'line_items': quote['line_items']}
+    for part in DICT_PARTS:
+        quote[part].update(delta.get(part, {}))
+        for key in delta.get('removed', {}).get(part, ()):
+            quote[part].pop(key, None)
+    if 'line_items' in delta:
+        quote['line_items'] = delta['line_items']
+    return quote
+
+
+def diff_quotes(old, new):
+    """Side-by-side differences between two quotes.
+
+    Returns ``{'config': [(field, old, new)], 'prices': [(item, old, new)],
+    'totals': [(name, old, new)], 'line_items': (old, new) or None}``;
+    a value absent on one side is None.
+    """
+    old, new = _normalized(old), _normalized(new)
+    diff = {}
+    for part in DICT_PARTS:
+        keys = list(old[part]) + [key for key in new[part] if key not in old[part]]
+        diff[part] = [(key, old[part].get(key), new[part].get(key))
+                      for key in keys if old[part].get(key) != new[part].get(key)]
+    diff['line_items'] = None if old['line_items'] == new['line_items'] else (old['line_items'], new['line_items'])
+    return diff
+
+
+def _like_escape(text):
+    # A typed '%' or '_' matches itself, not any text
+    return text.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+
+
+def decode_config(config):
+    """Turn a stored configuration back into widget values, as a QuoteConfig."""
+    if not config.keys() <= FIELD_KINDS.keys():
+        # Fields since dropped from the form are ignored
+        config = {key: value for key, value in config.items() if key in FIELD_KINDS}
+    return QuoteConfig(config)
+
+
+class QuoteStore:
+    def __init__(self, path=DB_FILE):
+        self.path = path
+        # Streamlit serves sessions from several threads; one connection, one lock
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._lock = threading.Lock()
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.executescript(SCHEMA)
+            quote_analytics.create_rollups(self._conn)
+
+    def close(self):
+        self._conn.close()
+
+    @contextlib.contextmanager
+    def transaction(self):
+        """The store's connection, held for this thread; committed on exit, rolled back on error."""
+        with self._lock, self._conn:
+            yield self._conn
+
+    def save(self, config, prices, totals, line_items=()):
+        """Insert or replace the quote for ``config['quote_number']``. Returns its id.
+
+        A new revision is recorded unless nothing changed since the last save.
+        """
+        quote_number = str(config.get('quote_number') or '').strip()
+        if not quote_number:
+            raise ValueError("A quote needs a Quote # before it can be saved")
+        quote_date = config.get('quote_date')
+        row = {
+            'quote_number': quote_number,
+            'quote_date': str(quote_date) if quote_date else None,
+            'dealer': config.get('dealer'),
+            'contact': config.get('contact'),
+            'model': config.get('model'),
+            'discount_percent': config.get('discount_percent'),
+            'subtotal': totals['subtotal'],
+            'final_total': totals['final_total'],
+            'config': _json(config),
+            'prices': _json(prices),
+            'totals': _json(totals),
+            'line_items': _json(list(line_items)),
+            'saved_at': datetime.datetime.now().isoformat(timespec='seconds'),
+        }
+        columns = ', '.join(row)
+        placeholders = ', '.join(f':{name}' for name in row)
+        updates = ', '.join(f'{name} = excluded.{name}' for name in row if name != 'quote_number')
+        with self._lock, self._conn:
+            previous = self._conn.execute(
+                "SELECT * FROM quotes WHERE quote_number = ?", (quote_number,)
+            ).fetchone()
+            self._conn.execute(
+                f"INSERT INTO quotes ({columns}) VALUES ({placeholders}) "
+                f"ON CONFLICT (quote_number) DO UPDATE SET {updates}",
+                row,
+            )
+            quote_id = self._conn.execute(
+                "SELECT id FROM quotes WHERE quote_number = ?", (quote_number,)
+            ).fetchone()['id']
+            self._add_revision(quote_id, previous, row)
+            # The dashboard's rollups move with the quote
+            if previous is not None:
+                quote_analytics.record(self._conn, previous, -1)
+            quote_analytics.record(self._conn, row, 1)
+            return quote_id
+
+    def _add_revision(self, quote_id, previous, row):
+        # Called inside save()'s transaction; rows hold the JSON-encoded parts
+        current = {part: json.loads(row[part]) for part in DICT_PARTS + ('line_items',)}
+        last = self._conn.execute(
+            "SELECT MAX(revision) FROM quote_revisions WHERE quote_id = ?", (quote_id,)
+        ).fetchone()[0] or 0
+        if previous is None:
+            self._insert_revision(quote_id, 1, row['saved_at'], current, len(current['config']), keyframe=True)
+            return
+        old = {part: json.loads(previous[part]) for part in DICT_PARTS + ('line_items',)}
+        if last == 0:
+            # Saved before revisions existed: its stored state becomes revision 1
+            last = 1
+            self._insert_revision(quote_id, 1, previous['saved_at'], old, len(old['config']), keyframe=True)
+        delta, changes = quote_delta(old, current)
+        if not changes:
+            return
+        revision = last + 1
+        if (revision - 1) % KEYFRAME_EVERY == 0:
+            self._insert_revision(quote_id, revision, row['saved_at'], current, changes, keyframe=True)
+        else:
+            self._insert_revision(quote_id, revision, row['saved_at'], delta, changes, keyframe=False)
+
+    def _insert_revision(self, quote_id, revision, saved_at, delta, changes, keyframe):
+        final_total = delta.get('totals', {}).get('final_total')
+        self._conn.execute(
+            "INSERT INTO quote_revisions (quote_id, revision, saved_at, final_total, changes, keyframe, delta) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (quote_id, revision, saved_at, final_total, changes, int(keyframe), _json(delta)),
+        )
+
+    def revisions(self, quote_number):
+        """Revision summaries for a Quote #, oldest first."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT r.revision, r.saved_at, r.final_total, r.changes FROM quote_revisions r "
+                "JOIN quotes q ON q.id = r.quote_id WHERE q.quote_number = ? ORDER BY r.revision",
+                (quote_number,),
+            ).fetchall()
+        revisions = [dict(row) for row in rows]
+        # Deltas only carry the total when it changed
+        final_total = None
+        for revision in revisions:
+            if revision['final_total'] is None:
+                revision['final_total'] = final_total
+            final_total = revision['final_total']
+        return revisions
+
+    def get_revision(self, quote_number, revision):
+        """The config, prices, totals and line items of one revision, or None."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT r.revision, r.delta, r.keyframe FROM quote_revisions r JOIN quotes q ON q.id = r.quote_id "
+                "WHERE q.quote_number = ? AND r.revision <= ? AND r.revision >= ("
+                "  SELECT MAX(k.revision) FROM quote_revisions k"
+                "  WHERE k.quote_id = r.quote_id AND k.keyframe AND k.revision <= ?"
+                ") ORDER BY r.revision",
+                (quote_number, revision, revision),
+            ).fetchall()
+        if not rows or rows[-1]['revision'] != revision:
+            return None
+        quote = None
+        for row in rows:
+            delta = json.loads(row['delta'])
+            quote = delta if row['keyframe'] else apply_delta(quote, delta)
+        quote['config'] = decode_config(quote['config'])
+        return quote
+
+    def search(self, quote_number=None, dealer=None, model=None, date_from=None, date_to=None, limit=50):
+        """Newest-first quote summaries. Quote # and dealer match by prefix."""
+        where, params = self._where(quote_number, dealer, model, date_from, date_to)
+        sql = (f"SELECT {', '.join(SUMMARY_COLUMNS)} FROM quotes {where} "
+               f"ORDER BY quote_date DESC, id DESC LIMIT ?")
+        with self._lock:
+            rows = self._conn.execute(sql, params + [limit]).fetchall()
+        return [dict(row) for row in rows]
+
+    def _where(self, quote_number=None, dealer=None, model=None, date_from=None, date_to=None):
+        clauses, params = [], []
+        if quote_number:
+            clauses.append("quote_number LIKE ? ESCAPE '\\'")
+            params.append(f"{_like_escape(quote_number)}%")
+        if dealer:
+            clauses.append("dealer LIKE ? ESCAPE '\\'")
+            params.append(f"{_like_escape(dealer)}%")
+        if model:
+            clauses.append("model = ?")
+            params.append(model)
+        if date_from:
+            clauses.append("quote_date >= ?")
+            params.append(str(date_from))
+        if date_to:
+            clauses.append("quote_date <= ?")
+            params.append(str(date_to))
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        return where, params
+
+    def get(self, quote_id):
+        """Full quote by id: header columns plus decoded config, prices, totals and line items."""
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM quotes WHERE id = ?", (quote_id,)).fetchone()
+        return None if row is None else self._decode(row)
+
+    def _decode(self, row):
+        quote = dict(row)
+        quote['config'] = decode_config(json.loads(quote['config']))
+        for name in ('prices', 'totals', 'line_items'):
+            quote[name] = json.loads(quote[name])
+        return quote
+
+    def iter_quotes(self, quote_ids=None, batch_size=200, **filters):
+        """Yield full quotes for ``quote_ids`` (or every search match), a batch at a time.
+
+        Only one batch is held in memory, so this feeds bulk exports and
+        repricing of the whole store.
+        """
+        if quote_ids is None:
+            where, params = self._where(**filters)
+            with self._lock:
+                quote_ids = [row['id'] for row in self._conn.execute(
+                    f"SELECT id FROM quotes {where} ORDER BY quote_date DESC, id DESC", params
+                )]
+        quote_ids = list(quote_ids)
+        for start in range(0, len(quote_ids), batch_size):
+            batch = quote_ids[start:start + batch_size]
+            placeholders = ', '.join('?' * len(batch))
+            with self._lock:
+                rows = self._conn.execute(f"SELECT * FROM quotes WHERE id IN ({placeholders})", batch).fetchall()
+            by_id = {row['id']: row for row in rows}
+            for quote_id in batch:
+                if quote_id in by_id:
+                    yield self._decode(by_id[quote_id])
+
+    def get_by_number(self, quote_number):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT id FROM quotes WHERE quote_number = ?", (quote_number,)
+            ).fetchone()
+        return None if row is None else self.get(row['id'])
+
+    def count(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM quotes").fetchone()[0]
@@ -0,0 +1,355 @@
+"""Reprice every saved quote after a catalog change.
+
+A job prices all stored quotes against one catalog and records, per quote,
+the old and new final total with the new itemized prices and totals. The
+quotes are read ``BATCH_QUOTES`` at a time and priced by ``price_frame``
+in a pool of worker processes (JSON decoding included, so the parent only
+moves rows between SQLite and the pool). Each finished batch is committed
+together with the job's progress counters, which is the checkpoint: a job
+cut short by a crash or a restart is marked ``interrupted`` and resumes
+from the quotes it has not priced yet when it is started again with the
+same catalog (``Catalog.digest``).
+
+Nothing in ``quotes`` changes until ``apply`` writes the new prices back
+through ``QuoteStore.save``, which records a revision for each quote. A job
+notes the revision each quote was priced from, and ``apply`` leaves alone
+the quotes saved again since.
+
+``python reprice.py [--workers N] [--threshold 100]`` runs a job against
+the workbook in the foreground.
+"""
+import argparse
+import concurrent.futures
+import datetime
+import json
+import logging
+import multiprocessing
+import os
+import sqlite3
+import sys
+import threading
+import time
+
+from pricing import PRICE_ITEM_INPUTS, PRICE_ITEMS, line_items_total, price_frame
+from quote_config import QuoteConfig
+from quote_fields import FIELDS
+from quote_store import DB_FILE, decode_config
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS reprice_jobs (
+    id INTEGER PRIMARY KEY,
+    catalog_digest TEXT NOT NULL,
+    catalog_version INTEGER,
+    status TEXT NOT NULL,
+    total INTEGER NOT NULL,
+    done INTEGER NOT NULL DEFAULT 0,
+    changed INTEGER NOT NULL DEFAULT 0,
+    started_at TEXT NOT NULL,
+    finished_at TEXT,
+    error TEXT
+);
+CREATE TABLE IF NOT EXISTS reprice_results (
+    job_id INTEGER NOT NULL REFERENCES reprice_jobs (id),
+    quote_id INTEGER NOT NULL,
+    old_total REAL,
+    new_total REAL NOT NULL,
+    prices TEXT NOT NULL,
+    totals TEXT NOT NULL,
+    applied INTEGER NOT NULL DEFAULT 0,
+    revision INTEGER,
+    PRIMARY KEY (job_id, quote_id)
+) WITHOUT ROWID;
+"""
+
+BATCH_QUOTES = 2000
+# Final-total change (in dollars) reported by default
+DEFAULT_THRESHOLD = 100.0
+# Totals closer than this are unchanged
+CENT = 0.005
+
+# The latest revision of a row of quotes; NULL if saved before revisions existed
+CURRENT_REVISION = "(SELECT MAX(revision) FROM quote_revisions WHERE quote_id = quotes.id)"
+
+CHANGED_WHERE = "WHERE r.job_id = ? AND ABS(r.new_total - IFNULL(r.old_total, 0)) > ?"
+
+TOTAL_COLUMNS = ['subtotal', 'discount_amount', 'discounted_price', 'additional_items_total', 'final_total']
+
+# The quote fields price_frame reads: the price items' inputs and the Summary tab's inputs
+PRICED_FIELDS = [field for field in FIELDS
+                 if field in {name for inputs in PRICE_ITEM_INPUTS.values() for name in inputs}
+                 or field in ('discount_percent', 'alcoa_rims_add', 'grain_sock_add')]
+
+_worker_catalog = None
+
+
+def _init_worker(catalog):
+    global _worker_catalog
+    _worker_catalog = catalog
+
+
+def _json(value):
+    return json.dumps(value, separators=(',', ':'))
+
+
+def price_batch(rows, catalog=None):
+    """Reprice ``(quote_id, config JSON, line items JSON, old final total, revision)`` rows.
+
+    Returns ``(quote_id, old_total, new_total, prices JSON, totals JSON,
+    revision)`` per row. Runs in the worker processes, with the pool's
+    catalog.
+    """
+    catalog = catalog or _worker_catalog
+    df = QuoteConfig.to_frame([decode_config(json.loads(row[1])) for row in rows], PRICED_FIELDS)
+    df['line_items_total'] = [line_items_total(json.loads(row[2])) for row in rows]
+    priced = price_frame(df, catalog)
+    prices = priced[PRICE_ITEMS].to_numpy(dtype=float)
+    totals = priced[TOTAL_COLUMNS].to_numpy(dtype=float)
+    return [
+        (quote_id, old_total, float(row_totals[-1]),
+         _json(dict(zip(PRICE_ITEMS, row_prices.tolist()))), _json(dict(zip(TOTAL_COLUMNS, row_totals.tolist()))),
+         revision)
+        for (quote_id, _, _, old_total, revision), row_prices, row_totals in zip(rows, prices, totals)
+    ]
+
+
+def _now():
+    return datetime.datetime.now().isoformat(timespec='seconds')
+
+
+class RepriceRunner:
+    """Runs one repricing job at a time on a background thread."""
+
+    def __init__(self, path=DB_FILE, workers=None, batch_size=BATCH_QUOTES):
+        self.path = path
+        self.workers = workers or os.cpu_count() or 1
+        self.batch_size = batch_size
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.executescript(SCHEMA)
+            # Results tables made before jobs noted the revisions they priced
+            columns = {row['name'] for row in self._conn.execute("PRAGMA table_info(reprice_results)")}
+            if 'revision' not in columns:
+                self._conn.execute("ALTER TABLE reprice_results ADD COLUMN revision INTEGER")
+            # Nothing runs yet in this process: a 'running' job was cut short
+            self._conn.execute("UPDATE reprice_jobs SET status = 'interrupted' WHERE status = 'running'")
+
+    def close(self):
+        self._conn.close()
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def job(self, job_id):
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM reprice_jobs WHERE id = ?", (job_id,)).fetchone()
+        return None if row is None else dict(row)
+
+    def latest(self):
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM reprice_jobs ORDER BY id DESC LIMIT 1").fetchone()
+        return None if row is None else dict(row)
+
+    def _open_job(self, catalog):
+        # Resume the last unfinished job for these prices, or start a new one
+        with self._lock, self._conn:
+            row = self._conn.execute(
+                "SELECT id FROM reprice_jobs WHERE catalog_digest = ? AND status IN ('interrupted', 'cancelled') "
+                "AND id = (SELECT MAX(id) FROM reprice_jobs)",
+                (catalog.digest,),
+            ).fetchone()
+            total = self._conn.execute("SELECT COUNT(*) FROM quotes").fetchone()[0]
+            if row is not None:
+                job_id = row['id']
+                self._conn.execute(
+                    "UPDATE reprice_jobs SET status = 'running', finished_at = NULL, error = NULL, "
+                    "total = done + (SELECT COUNT(*) FROM quotes WHERE id NOT IN "
+                    "(SELECT quote_id FROM reprice_results WHERE job_id = ?)) WHERE id = ?",
+                    (job_id, job_id),
+                )
+                logger.info("resuming reprice job %d", job_id)
+                return job_id
+            cursor = self._conn.execute(
+                "INSERT INTO reprice_jobs (catalog_digest, catalog_version, status, total, started_at) "
+                "VALUES (?, ?, 'running', ?, ?)",
+                (catalog.digest, catalog.version, total, _now()),
+            )
+            return cursor.lastrowid
+
+    def start(self, catalog):
+        """Reprice in the background; returns the job id (the running one if busy)."""
+        if self.running:
+            return self.latest()['id']
+        job_id = self._open_job(catalog)
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, args=(job_id, catalog), name=f"reprice-{job_id}",
+                                        daemon=True)
+        self._thread.start()
+        return job_id
+
+    def run(self, catalog, progress=None):
+        """Reprice in the foreground; ``progress(done, total)`` after each batch."""
+        job_id = self._open_job(catalog)
+        self._stop.clear()
+        self._run(job_id, catalog, progress)
+        return job_id
+
+    def cancel(self):
+        """Stop after the batches in flight; the job can be resumed later."""
+        self._stop.set()
+
+    def _pending_batches(self, job_id):
+        with self._lock:
+            quote_ids = [row[0] for row in self._conn.execute(
+                "SELECT id FROM quotes WHERE id NOT IN (SELECT quote_id FROM reprice_results WHERE job_id = ?) "
+                "ORDER BY id", (job_id,)
+            )]
+        for start in range(0, len(quote_ids), self.batch_size):
+            batch = quote_ids[start:start + self.batch_size]
+            placeholders = ', '.join('?' * len(batch))
+            with self._lock:
+                rows = self._conn.execute(
+                    f"SELECT id, config, line_items, final_total, {CURRENT_REVISION} FROM quotes "
+                    f"WHERE id IN ({placeholders})", batch
+                ).fetchall()
+            yield [tuple(row) for row in rows]
+
+    def _checkpoint(self, job_id, results):
+        changed = sum(1 for _, old, new, *_ in results if old is None or abs(new - old) > CENT)
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO reprice_results "
+                "(job_id, quote_id, old_total, new_total, prices, totals, revision) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                [(job_id,) + result for result in results],
+            )
+            self._conn.execute(
+                "UPDATE reprice_jobs SET done = done + ?, changed = changed + ? WHERE id = ?",
+                (len(results), changed, job_id),
+            )
+
+    def _finish(self, job_id, status, error=None):
+        with self._lock, self._conn:
+            self._conn.execute(
+                "UPDATE reprice_jobs SET status = ?, finished_at = ?, error = ? WHERE id = ?",
+                (status, _now(), error, job_id),
+            )
+
+    def _run(self, job_id, catalog, progress=None):
+        batches = self._pending_batches(job_id)
+        try:
+            if self.workers == 1:
+                results = (price_batch(rows, catalog) for rows in batches)
+                self._consume(job_id, results, progress)
+            else:
+                context = multiprocessing.get_context('spawn')  # no fork from a threaded server
+                with concurrent.futures.ProcessPoolExecutor(self.workers, mp_context=context,
+                                                            initializer=_init_worker, initargs=(catalog,)) as pool:
+                    self._consume(job_id, self._map(pool, batches), progress)
+        except Exception as exc:
+            logger.exception("reprice job %d failed", job_id)
+            self._finish(job_id, 'failed', str(exc))
+            return
+        self._finish(job_id, 'cancelled' if self._stop.is_set() else 'done')
+
+    def _map(self, pool, batches):
+        # At most two batches per worker in flight, so memory stays bounded
+        in_flight = set()
+        for rows in batches:
+            if self._stop.is_set():
+                break
+            in_flight.add(pool.submit(price_batch, rows))
+            if len(in_flight) >= self.workers * 2:
+                finished, in_flight = concurrent.futures.wait(in_flight, return_when='FIRST_COMPLETED')
+                for future in finished:
+                    yield future.result()
+        for future in concurrent.futures.as_completed(in_flight):
+            yield future.result()
+
+    def _consume(self, job_id, results, progress):
+        for batch in results:
+            self._checkpoint(job_id, batch)
+            if progress:
+                job = self.job(job_id)
+                progress(job['done'], job['total'])
+            if self._stop.is_set():
+                break
+
+    def changes(self, job_id, threshold=DEFAULT_THRESHOLD, limit=None):
+        """Quotes whose final total moved by more than ``threshold``, biggest change first."""
+        sql = ("SELECT q.id, q.quote_number, q.dealer, q.model, r.old_total, r.new_total, "
+               "r.new_total - r.old_total AS change, r.applied FROM reprice_results r "
+               f"JOIN quotes q ON q.id = r.quote_id {CHANGED_WHERE} "
+               "ORDER BY ABS(r.new_total - IFNULL(r.old_total, 0)) DESC")
+        params = [job_id, max(threshold, CENT)]
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(limit)
+        with self._lock:
+            return [dict(row) for row in self._conn.execute(sql, params)]
+
+    def count_changes(self, job_id, threshold=DEFAULT_THRESHOLD):
+        with self._lock:
+            return self._conn.execute(f"SELECT COUNT(*) FROM reprice_results r {CHANGED_WHERE}",
+                                      (job_id, max(threshold, CENT))).fetchone()[0]
+
+    def apply(self, job_id, store):
+        """Save the new prices of every quote whose total changed by a cent or more; returns how many.
+
+        The report threshold of ``changes`` does not apply here. Quotes saved
+        again since the job priced them (a newer revision) are left alone:
+        the new prices are for a configuration they no longer have.
+        """
+        with self._lock:
+            pending = self._conn.execute(
+                f"SELECT r.quote_id, r.revision FROM reprice_results r {CHANGED_WHERE} AND NOT r.applied",
+                (job_id, CENT),
+            ).fetchall()
+        applied = 0
+        for quote_id, revision in pending:
+            with self._lock:
+                row = self._conn.execute(
+                    f"SELECT {CURRENT_REVISION}, r.prices, r.totals FROM quotes "
+                    "JOIN reprice_results r ON r.quote_id = quotes.id WHERE r.job_id = ? AND r.quote_id = ?",
+                    (job_id, quote_id),
+                ).fetchone()
+            if row is None or row[0] != revision:
+                continue
+            quote = store.get(quote_id)
+            store.save(quote['config'], json.loads(row['prices']), json.loads(row['totals']), quote['line_items'])
+            with self._lock, self._conn:
+                self._conn.execute("UPDATE reprice_results SET applied = 1 WHERE job_id = ? AND quote_id = ?",
+                                   (job_id, quote_id))
+            applied += 1
+        return applied
+
+
+def main(argv=None):
+    from catalog import DEFAULT_CATALOG, EXCEL_FILE, load_catalog
+
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('db', nargs='?', default=DB_FILE)
+    parser.add_argument('--workers', type=int, default=None, help="worker processes (default: one per CPU)")
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD)
+    args = parser.parse_args(argv)
+
+    catalog = load_catalog(EXCEL_FILE) if os.path.exists(EXCEL_FILE) else DEFAULT_CATALOG
+    runner = RepriceRunner(args.db, workers=args.workers)
+    start = time.perf_counter()
+    job_id = runner.run(catalog, progress=lambda done, total: print(f"\r{done:,}/{total:,}", end='', flush=True))
+    elapsed = time.perf_counter() - start
+    job = runner.job(job_id)
+    print(f"\njob {job_id} {job['status']}: {job['done']:,} quotes in {elapsed:.1f} s, {job['changed']:,} changed")
+    for change in runner.changes(job_id, args.threshold, limit=20):
+        print(f"{change['quote_number']}: ${change['old_total'] or 0:,.2f} -> ${change['new_total']:,.2f}")
+    return 0 if job['status'] == 'done' else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,305 @@
+"""Compatibility rules between quote form fields.
+
+A rule reads "when IF FIELD is IF VALUE, THEN FIELD must ...", either one of
+a list of options or, for numbers, within MIN..MAX. THEN FIELD may be a sum
+of number fields such as ``qty_ride+qty_lift+qty_steer``. Rules can also
+be workbook rows (the sheet format is in ``catalog``); ``ALLOWED`` separates
+options with ``|``, and a workbook rule replaces the built-in rule for the
+same IF FIELD/IF VALUE/THEN FIELD.
+
+``compile_rules`` turns the rows into dict lookups once per catalog load:
+filtering a selectbox is a few hash hits per rerun, and ``validate_frame``
+checks a whole DataFrame of configurations with one vectorized pass per
+rule group.
+"""
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from quote_fields import FIELD_LABELS, OPTIONS
+
+SEPARATOR = '|'
+AXLE_FIELDS = 'qty_ride+qty_lift+qty_steer'
+
+
+def _option_rules(if_field, then_field, mapping):
+    return [(if_field, if_value, then_field, allowed, None, None, None) for if_value, allowed in mapping.items()]
+
+
+# (if_field, if_value, then_field, allowed options or None, min, max, message)
+DEFAULT_RULES = tuple(
+    # The sidebar model and the chassis model describe the same axle count
+    _option_rules('model', 'chassis_model', {
+        "End Dump 3x": ["3 Axle"],
+        "End Dump 4x": ["4 Axle"],
+        "End Dump 5x": ["5 Axle"],
+    })
+    + [('chassis_model', f"{n} Axle", AXLE_FIELDS, None, None, n,
+        f"A {n} Axle chassis takes at most {n} ride, lift and steer axles")
+       for n in (3, 4, 5)]
+    # A lift axle in position N needs at least N axles under the trailer
+    + [('lift_position', position, AXLE_FIELDS, None, n, None,
+        f"Lift axle position {position.split()[0]} needs at least {n} axles")
+       for n, position in enumerate(OPTIONS['lift_position'], start=1)]
+    # Tires follow the tire size
+    + _option_rules('tire_size', 'ride_tires_model', {
+        "22.5": ["CONTINENTAL HSR3 11R22.5 16 PLY"],
+        "24.5": ["CONTINENTAL HSR3 11R24.5 16 PLY"],
+    })
+    + _option_rules('tire_size', 'steer_tires_model', {
+        "22.5": ["CONTINENTAL HSR3 11R22.5 16 PLY"],
+        "24.5": ["CONTINENTAL HSR3 11R24.5 16 PLY"],
+    })
+)
+
+# Form defaults of the fields the built-in rules read, for blank values
+FIELD_DEFAULTS = {
+    'model': OPTIONS['model'][0],
+    'chassis_model': OPTIONS['chassis_model'][1],
+    'qty_ride': 1,
+    'qty_lift': 1,
+    'qty_steer': 1,
+    'lift_position': OPTIONS['lift_position'][0],
+    'tire_size': OPTIONS['tire_size'][0],
+    'ride_tires_model': OPTIONS['ride_tires_model'][0],
+    'steer_tires_model': OPTIONS['steer_tires_model'][0],
+}
+
+
+def _key(value):
+    # Rules compare as text; 1.0 from Excel and 1 from a number input are the same
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    return str(value).strip()
+
+
+def _number(value):
+    if value is None or value == '' or pd.isna(value):
+        return None
+    return float(value)
+
+
+class RuleSet:
+    """Compiled rules: option tables per dependent field and limits per trigger value."""
+
+    def __init__(self, rules=(), defaults=None):
+        self.defaults = dict(FIELD_DEFAULTS if defaults is None else defaults)
+        latest = {}
+        for if_field, if_value, then_field, allowed, low, high, message in rules:
+            latest[(if_field, _key(if_value), then_field)] = (allowed, low, high, message)
+
+        # then_field -> {if_field: {if_key: frozenset of allowed keys}}
+        self._allowed = {}
+        # if_field -> {if_key: [(fields, low, high, message)]}
+        self._limits = {}
+        for (if_field, if_key, then_field), (allowed, low, high, message) in latest.items():
+            if allowed:
+                self._allowed.setdefault(then_field, {}).setdefault(if_field, {})[if_key] = (
+                    frozenset(_key(value) for value in allowed), message)
+            if low is not None or high is not None:
+                fields = tuple(name.strip() for name in then_field.split('+'))
+                self._limits.setdefault(if_field, {}).setdefault(if_key, []).append(
+                    (fields, low, high, message))
+        self.count = len(latest)
+        # Every field some rule reads; changing one can change another field's options
+        self.fields = sorted(
+            set(self._allowed) | set(self._limits)
+            | {if_field for tables in self._allowed.values() for if_field in tables}
+            | {field for limits in self._limits.values()
+               for rules in limits.values() for fields, *_ in rules for field in fields}
+        )
+
+    def __len__(self):
+        return self.count
+
+    def _value(self, config, field):
+        value = config.get(field)
+        return self.defaults.get(field) if value is None else value
+
+    def _limit_ok(self, config, fields, low, high):
+        total = sum(float(self._value(config, field) or 0) for field in fields)
+        return (low is None or total >= low) and (high is None or total <= high)
+
+    def options(self, field, options, config):
+        """The options of ``field`` allowed by the current values in ``config``.
+
+        Falls back to every option if the rules would leave none, so the
+        widget stays usable and ``violations`` reports the conflict.
+        """
+        tables = self._allowed.get(field)
+        limits = self._limits.get(field)
+        if not tables and not limits:
+            return options
+        allowed = options
+        for if_field, table in (tables or {}).items():
+            rule = table.get(_key(self._value(config, if_field)))
+            if rule is not None:
+                allowed = [option for option in allowed if _key(option) in rule[0]]
+        if limits:
+            allowed = [option for option in allowed
+                       if all(self._limit_ok(config, fields, low, high)
+                              for fields, low, high, _ in limits.get(_key(option), ()))]
+        return allowed or options
+
+    def field_groups(self):
+        """The fields each rule reads together, one tuple per rule group."""
+        groups = [(if_field, then_field) for then_field, tables in self._allowed.items() for if_field in tables]
+        groups += [(if_field,) + fields for if_field, limits in self._limits.items()
+                   for rules in limits.values() for fields, *_ in rules]
+        return sorted(set(groups))
+
+    def violations(self, config, fields=None):
+        """Messages for every rule the configuration breaks.
+
+        With ``fields``, only the rules reading nothing but those fields.
+        """
+        within = set(fields) if fields is not None else None
+        problems = []
+        for then_field, tables in self._allowed.items():
+            value = _key(self._value(config, then_field))
+            for if_field, table in tables.items():
+                if within is not None and not {if_field, then_field} <= within:
+                    continue
+                rule = table.get(_key(self._value(config, if_field)))
+                if rule is not None and value not in rule[0]:
+                    problems.append(rule[1] or _option_message(if_field, self._value(config, if_field), then_field, value))
+        for if_field, limits in self._limits.items():
+            for fields, low, high, message in limits.get(_key(self._value(config, if_field)), ()):
+                if within is not None and not {if_field, *fields} <= within:
+                    continue
+                if not self._limit_ok(config, fields, low, high):
+                    problems.append(message or _limit_message(if_field, self._value(config, if_field), fields, low, high))
+        return problems
+
+    def _column(self, df, field):
+        default = self.defaults.get(field)
+        if field in df.columns:
+            return df[field].where(df[field].notna(), default)
+        return pd.Series(default, index=df.index, dtype=object)
+
+    def validate_frame(self, df):
+        """Rule problems of every row of a DataFrame of configurations ('' if none)."""
+        errors = pd.Series('', index=df.index, dtype=object)
+        keys = {}
+
+        def key_column(field):
+            if field not in keys:
+                keys[field] = self._column(df, field).map(_key)
+            return keys[field]
+
+        def flag(bad, message):
+            nonlocal errors
+            if bad.any():
+                errors = errors.where(~bad, errors + message + '; ')
+
+        for then_field, tables in self._allowed.items():
+            value = key_column(then_field)
+            for if_field, table in tables.items():
+                condition = key_column(if_field)
+                for if_key, (allowed, message) in table.items():
+                    bad = (condition == if_key) & ~value.isin(allowed)
+                    flag(bad, message or _option_message(if_field, if_key, then_field, None))
+
+        for if_field, limits in self._limits.items():
+            condition = key_column(if_field)
+            for if_key, rules in limits.items():
+                applies = condition == if_key
+                if not applies.any():
+                    continue
+                for fields, low, high, message in rules:
+                    total = sum(pd.to_numeric(self._column(df, field), errors='coerce').fillna(0).to_numpy(dtype=float)
+                                for field in fields)
+                    bad = applies & ((total < (low if low is not None else -np.inf))
+                                     | (total > (high if high is not None else np.inf)))
+                    flag(bad, message or _limit_message(if_field, if_key, fields, low, high))
+        return errors.str.rstrip('; ')
+
+
+def _label(field):
+    return FIELD_LABELS.get(field, field)
+
+
+def _option_message(if_field, if_value, then_field, value):
+    if value is None:
+        return f"{_label(then_field)} doesn't match {_label(if_field)} {if_value}"
+    return f"{_label(then_field)} {value} doesn't match {_label(if_field)} {if_value}"
+
+
+def _limit_message(if_field, if_value, fields, low, high):
+    bounds = ' and '.join(part for part in (
+        f"at least {low:g}" if low is not None else '', f"at most {high:g}" if high is not None else '') if part)
+    return f"{' + '.join(_label(field) for field in fields)} must be {bounds} with {_label(if_field)} {if_value}"
+
+
+def rules_from_sheet(df):
+    """Extract rule rows from one workbook sheet, or [] if it has no rule columns."""
+    columns = {str(col).strip().upper(): col for col in df.columns}
+    if not {'IF FIELD', 'IF VALUE', 'THEN FIELD'} <= set(columns):
+        return []
+
+    def cell(record, name):
+        value = record[columns[name]] if name in columns else None
+        return None if value is None or (not isinstance(value, str) and pd.isna(value)) else value
+
+    rules = []
+    for record in df.to_dict('records'):
+        if_field, if_value, then_field = (cell(record, name) for name in ('IF FIELD', 'IF VALUE', 'THEN FIELD'))
+        if if_field is None or if_value is None or then_field is None:
+            continue
+        allowed = cell(record, 'ALLOWED')
+        allowed = [part.strip() for part in str(allowed).split(SEPARATOR)] if allowed is not None else None
+        rules.append((str(if_field).strip(), if_value, str(then_field).strip(), allowed,
+                      _number(cell(record, 'MIN')), _number(cell(record, 'MAX')), cell(record, 'MESSAGE')))
+    return rules
+
+
+def compile_rules(sheets=()):
+    """Build a RuleSet from the workbook sheets layered over DEFAULT_RULES."""
+    rules = list(DEFAULT_RULES)
+    for df in sheets:
+        rules.extend(rules_from_sheet(df))
+    return RuleSet(rules)
+
+
+DEFAULT_RULESET = RuleSet(DEFAULT_RULES)
+
+
+def check_store(path='quotes.db', batch_size=2000, rules=None):
+    """Validate every saved quote; returns ``(checked, [(quote_number, problems)], quotes/second)``."""
+    from quote_config import QuoteConfig
+    from quote_store import QuoteStore
+
+    rules = rules or DEFAULT_RULESET
+    store = QuoteStore(path)
+    start = time.perf_counter()
+    checked = 0
+    failures = []
+    batch = []
+
+    def flush():
+        nonlocal checked
+        df = QuoteConfig.to_frame([quote['config'] for quote in batch])
+        for quote, problems in zip(batch, rules.validate_frame(df)):
+            if problems:
+                failures.append((quote['config'].get('quote_number'), problems))
+        checked += len(batch)
+        batch.clear()
+
+    for quote in store.iter_quotes(batch_size=batch_size):
+        batch.append(quote)
+        if len(batch) == batch_size:
+            flush()
+    if batch:
+        flush()
+    store.close()
+    elapsed = time.perf_counter() - start
+    return checked, failures, checked / elapsed if elapsed else 0.0
+
+
+if __name__ == '__main__':
+    checked, failures, rate = check_store(sys.argv[1] if len(sys.argv) > 1 else 'quotes.db')
+    for quote_number, problems in failures[:20]:
+        print(f"{quote_number}: {problems}")
+    print(f"{checked} quotes checked, {len(failures)} with rule problems ({rate:,.0f} quotes/s)")
@@ -0,0 +1,149 @@
+"""The cent rounding policy of ``money``, and single quotes against the batch path."""
+import decimal
+import random
+
+import pandas as pd
+import pytest
+
+from catalog import DEFAULT_CATALOG
+from money import cents_array, percent_of, percent_of_array, to_cents
+from pricing import (DEFAULT_ALCOA_RIMS_ADD, DEFAULT_CONFIG, DEFAULT_GRAIN_SOCK_ADD, OPTION_GROUPS, PRICE_ITEMS,
+                     calculate_totals, line_items_total, price_frame, price_quote)
+from quote_fields import NUMBER_RANGES, OPTIONS
+
+CENT = decimal.Decimal('0.01')
+
+
+def exact(amount):
+    # The policy in Decimal, from the printed amount
+    return decimal.Decimal(repr(float(amount))).quantize(CENT, decimal.ROUND_HALF_UP)
+
+
+def exact_cents(amount):
+    return int(exact(amount) * 100)
+
+
+@pytest.mark.parametrize('amount, cents', [
+    (1.005, 101),
+    (2.675, 268),
+    (0.125, 13),
+    (0.005, 1),
+    (499.995, 50000),
+    (1.00499999, 100),
+    (1.004999999999, 100),
+    (0.0, 0),
+    (-1.005, -101),
+    (-0.005, -1),
+    (-2.675, -268),
+    (-1.00499999, -100),
+])
+def test_to_cents_rounds_half_away_from_zero(amount, cents):
+    assert to_cents(amount) == cents
+    assert cents_array([amount]).tolist() == [cents]
+
+
+def test_to_cents_matches_decimal():
+    rng = random.Random(0)
+    amounts = []
+    for _ in range(20000):
+        cents = rng.randrange(-10 ** 9, 10 ** 9)
+        amounts += [cents / 100, (2 * cents + 1) / 200, (2 * cents + 1) / 200 - 1e-9,
+                    round(rng.uniform(-1e5, 1e5), 3), rng.uniform(-1e5, 1e5)]
+    assert [to_cents(amount) for amount in amounts] == [exact_cents(amount) for amount in amounts]
+    assert cents_array(amounts).tolist() == [to_cents(amount) for amount in amounts]
+
+
+@pytest.mark.parametrize('cents, percent, discount', [
+    (10000, 12.125, 1213),
+    (10000, 12.1249, 1212),
+    (10000, 33.335, 3334),
+    (10000, 0.005, 1),
+    (10000, 0.0049, 0),
+    (333, 12.125, 40),
+    (-10000, 12.125, -1213),
+    (10000, -2.375, -238),
+])
+def test_percent_to_the_hundredth(cents, percent, discount):
+    assert percent_of(cents, percent) == discount
+    assert percent_of_array([cents], [percent]).tolist() == [discount]
+
+
+def test_calculate_totals_negative_amounts():
+    totals = calculate_totals({'base': 1000.005, 'credit': -100.005}, 0, alcoa_rims_add=-0.005,
+                              line_items=[{'price': -49.995}])
+    assert totals['subtotal'] == 900.0
+    assert totals['additional_items_total'] == -50.01
+    assert totals['final_total'] == 849.99
+
+
+def random_quote(rng, catalog):
+    # A config over the whole option space, with amounts that land on half cents
+    config = {}
+    for field, default in DEFAULT_CONFIG.items():
+        if field in OPTION_GROUPS:
+            config[field] = rng.choice(list(catalog.options(OPTION_GROUPS[field])) or [default])
+        elif field in OPTIONS:
+            config[field] = rng.choice(OPTIONS[field])
+        elif NUMBER_RANGES.get(field, (0, None))[1] is not None:
+            low, high = NUMBER_RANGES[field]
+            config[field] = rng.randint(low, high)
+    config['tire_carrier_price'] = rng.randrange(0, 300000) / 200
+    summary = {
+        'discount_percent': rng.choice([0.0, 2.5, 4.0, 7.5, 12.125, 33.335, rng.randrange(0, 100000) / 1000]),
+        'alcoa_rims_add': rng.randrange(0, 500000) / 200,
+        'grain_sock_add': rng.choice([0, 500, 499.995]),
+        'line_items': [{'price': rng.randrange(-20000, 200000) / 200} for _ in range(rng.randint(0, 3))],
+    }
+    return config, summary
+
+
+def decimal_totals(prices, summary):
+    subtotal = sum(exact(price) for price in prices.values())
+    discount = (subtotal * exact(summary['discount_percent']) / 100).quantize(CENT, decimal.ROUND_HALF_UP)
+    additional = (exact(summary['alcoa_rims_add']) + exact(summary['grain_sock_add'])
+                  + sum(exact(item['price']) for item in summary['line_items']))
+    return {'subtotal': subtotal, 'discount_amount': discount, 'discounted_price': subtotal - discount,
+            'additional_items_total': additional, 'final_total': subtotal - discount + additional}
+
+
+@pytest.fixture(scope='module')
+def quotes():
+    rng = random.Random(0)
+    return [random_quote(rng, DEFAULT_CATALOG) for _ in range(2000)]
+
+
+def test_single_quotes_and_batch_agree_to_the_cent(quotes):
+    single = [price_quote(config, summary['discount_percent'], summary['alcoa_rims_add'],
+                          summary['grain_sock_add'], summary['line_items'])
+              for config, summary in quotes]
+    df = pd.DataFrame([dict(config, discount_percent=summary['discount_percent'],
+                            alcoa_rims_add=summary['alcoa_rims_add'], grain_sock_add=summary['grain_sock_add'],
+                            line_items_total=line_items_total(summary['line_items']))
+                       for config, summary in quotes])
+    batch = price_frame(df)
+    for (prices, totals), (_, priced) in zip(single, batch.iterrows()):
+        for column in PRICE_ITEMS:
+            assert to_cents(prices[column]) == to_cents(priced[column]), column
+        for column, amount in totals.items():
+            assert to_cents(amount) == to_cents(priced[column]), column
+
+
+def test_totals_match_decimal(quotes):
+    for config, summary in quotes:
+        prices, totals = price_quote(config, summary['discount_percent'], summary['alcoa_rims_add'],
+                                     summary['grain_sock_add'], summary['line_items'])
+        assert calculate_totals(prices, summary['discount_percent'], summary['alcoa_rims_add'],
+                                summary['grain_sock_add'], summary['line_items']) == totals
+        expected = decimal_totals(prices, summary)
+        assert {column: to_cents(totals[column]) for column in expected} == \
+            {column: int(amount * 100) for column, amount in expected.items()}
+
+
+def test_missing_summary_inputs_take_the_form_defaults():
+    # A stored config without the Summary tab's fields prices the same on every path
+    config = {'trailer_length': "40'", 'qty_lift': 1}
+    prices, totals = price_quote(config)
+    priced = price_frame(pd.DataFrame([config])).iloc[0]
+    assert totals['additional_items_total'] == DEFAULT_ALCOA_RIMS_ADD + DEFAULT_GRAIN_SOCK_ADD
+    for column, amount in totals.items():
+        assert to_cents(amount) == to_cents(priced[column]), column
@@ -0,0 +1,71 @@
+"""Request validation of the pricing API: what bulk import rejects, the API rejects too."""
+import json
+import types
+
+import pytest
+
+from catalog import DEFAULT_CATALOG
+from pricing_api import PricingAPI, RequestError
+
+
+@pytest.fixture(scope='module')
+def api():
+    # A fixed catalog in place of the workbook watcher
+    return PricingAPI(watcher=types.SimpleNamespace(catalog=DEFAULT_CATALOG))
+
+
+def quote(body):
+    # Through json as a request body would be, NaN and Infinity included
+    return json.loads(body)
+
+
+def test_whole_numbers_price(api):
+    # 1.0 is as whole as 1; a JSON encoder may send either
+    result = api.price(quote('{"config": {"qty_lift": 1.0, "tire_carrier_price": 150}}'))
+    assert result['prices']['tire_carrier'] == 150
+    assert result['prices'] == api.price(quote('{"config": {"qty_lift": 1, "tire_carrier_price": 150}}'))['prices']
+
+
+@pytest.mark.parametrize('config', [
+    '{"qty_lift": 1.5}',
+    '{"tire_carrier_price": 123.45}',
+    '{"additional_markers": 10.5}',
+    '{"tire_carrier_price": Infinity}',
+    '{"tire_carrier_price": -Infinity}',
+    '{"discount_percent": NaN}',
+    '{"alcoa_rims_add": NaN}',
+    '{"grain_sock_add": Infinity}',
+])
+def test_invalid_numbers_are_422(api, config):
+    with pytest.raises(RequestError) as exc:
+        api.price(quote(f'{{"config": {config}}}'))
+    assert exc.value.status == 422
+
+
+@pytest.mark.parametrize('body', [
+    '{"config": {}, "discount_percent": NaN}',
+    '{"config": {}, "alcoa_rims_add": Infinity}',
+])
+def test_invalid_summary_inputs_are_422(api, body):
+    with pytest.raises(RequestError) as exc:
+        api.price(quote(body))
+    assert exc.value.status == 422
+
+
+@pytest.mark.parametrize('price', ['NaN', 'Infinity', '-Infinity', '-5'])
+def test_invalid_line_item_is_422(api, price):
+    with pytest.raises(RequestError) as exc:
+        api.price(quote(f'{{"config": {{}}, "line_items": [{{"name": "Tarp", "price": {price}}}]}}'))
+    assert exc.value.status == 422
+
+
+def test_line_items_add_to_the_total(api):
+    plain = api.price(quote('{"config": {}}'))['totals']['final_total']
+    body = '{"config": {}, "line_items": [{"name": "Tarp", "price": 450.5}, {"name": "Free", "price": 0}]}'
+    assert api.price(quote(body))['totals']['final_total'] == plain + 450.5
+
+
+def test_batch_reports_invalid_quotes_in_place(api):
+    results = api.price_batch(quote('[{"config": {"qty_lift": 1.5}}, {"config": {}}]'))
+    assert 'errors' in results[0]
+    assert 'totals' in results[1]